@@ -0,0 +1,478 @@
+#!/usr/bin/env python3
+# /// script
+# requires-python = ">=3.10"
+# dependencies = ["click>=8.0"]
+# ///
+"""
+Repo Wiki Benchmarks - Time CLI commands and helper scripts on a synthetic monorepo.
+
+Usage:
+    uv run benchmarks/bench_repo_wiki.py run
+    uv run benchmarks/bench_repo_wiki.py run --files 20000 --components 200 --pages 2000
+    uv run benchmarks/bench_repo_wiki.py run --save-baseline
+    uv run benchmarks/bench_repo_wiki.py generate-repo /tmp/synthetic --files 5000
+"""
+
+import json
+import os
+import random
+import shutil
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime
+from functools import partial
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+import click
+
+ROOT = Path(__file__).resolve().parent.parent
+CLI_SCRIPT = ROOT / "scripts/repo_wiki_cli.py"
+LLM_SCRIPT = ROOT / "scripts/repo_wiki_llm.py"
+HELPER_DIR = ROOT / "repo-wiki/scripts"
+DEFAULT_BASELINE = ROOT / "benchmarks/baseline.json"
+
+# A metric this much worse than the baseline is reported as a regression
+DEFAULT_THRESHOLD = 1.25
+
+# External links in synthetic pages point here and are rewritten to a local server
+LINK_BASE = "https://docs.example.com/"
+
+GIT_ENV = {
+    "GIT_AUTHOR_NAME": "bench",
+    "GIT_AUTHOR_EMAIL": "bench@example.com",
+    "GIT_COMMITTER_NAME": "bench",
+    "GIT_COMMITTER_EMAIL": "bench@example.com",
+    "GIT_AUTHOR_DATE": "2026-01-01T00:00:00Z",
+    "GIT_COMMITTER_DATE": "2026-01-01T00:00:00Z",
+}
+
+WORDS = [
+    "auth", "config", "cache", "client", "server", "handler", "token", "session", "user",
+    "order", "payment", "queue", "worker", "route", "schema", "model", "store", "event",
+]
+
+
+def git(repo: Path, *args: str) -> str:
+    """Run a git command with deterministic identity and dates."""
+    return subprocess.check_output(
+        ["git", *args], cwd=repo, text=True, env={**os.environ, **GIT_ENV}
+    ).strip()
+
+
+def source_file(rng: random.Random, imports: list[str]) -> str:
+    """Render a small Python module with a few functions and classes."""
+    lines = [f"from {name} import {rng.choice(WORDS)}" for name in imports]
+    lines.append("")
+    for _ in range(rng.randint(2, 8)):
+        name = f"{rng.choice(WORDS)}_{rng.choice(WORDS)}"
+        if rng.random() < 0.3:
+            lines.append(f"class {name.title().replace('_', '')}:")
+            lines.append(f"    def run(self, {rng.choice(WORDS)}):")
+            lines.append(f"        return {rng.randint(0, 999)}")
+        else:
+            lines.append(f"def {name}({rng.choice(WORDS)}, {rng.choice(WORDS)}=None):")
+            lines.append(f'    """Handle {rng.choice(WORDS)} for {rng.choice(WORDS)}."""')
+            lines.append(f"    return {rng.choice(WORDS)}")
+        lines.append("")
+    return "\n".join(lines) + "\n"
+
+
+def generate_repo(
+    repo: Path,
+    files: int,
+    depth: int,
+    components: int,
+    pages: int,
+    citations: int,
+    links: int,
+    commits: int,
+    seed: int,
+) -> dict:
+    """Create a deterministic synthetic monorepo with docs, wiki state and git history."""
+    rng = random.Random(seed)
+    if repo.exists():
+        shutil.rmtree(repo)
+    repo.mkdir(parents=True)
+    git(repo, "init", "-q")
+
+    comp_names = [f"{WORDS[i % len(WORDS)]}{i}" for i in range(components)]
+    paths = []
+    for i in range(files):
+        comp = comp_names[i % components]
+        dirs = [f"d{rng.randint(0, 3)}" for _ in range(rng.randint(0, depth))]
+        name = "main.py" if i < components else f"{rng.choice(WORDS)}_{i}.py"
+        rel = Path("packages", comp, *dirs, name)
+        (repo / rel).parent.mkdir(parents=True, exist_ok=True)
+        imports = [rng.choice(WORDS) for _ in range(rng.randint(0, 3))]
+        (repo / rel).write_text(source_file(rng, imports))
+        paths.append(str(rel))
+    (repo / "pyproject.toml").write_text('[project]\nname = "synthetic"\n')
+
+    git(repo, "add", "-A")
+    git(repo, "commit", "-qm", "initial")
+    baseline_commit = git(repo, "rev-parse", "HEAD")
+
+    subprocess.run(
+        [sys.executable, str(CLI_SCRIPT), "init", str(repo)],
+        check=True,
+        stdout=subprocess.DEVNULL,
+    )
+
+    manifest_pages = {}
+    line_counts = {p: (repo / p).read_text().count("\n") for p in paths}
+    for i in range(pages):
+        comp = comp_names[i % components]
+        page = f"docs/components/{comp}.md" if i < components else f"docs/components/{comp}-{i}.md"
+        page_citations = []
+        body = [f"# {comp} {i}", "", "<!-- BEGIN:REPO_WIKI_MANAGED -->", "## Overview", ""]
+        footnotes = []
+        for n in range(1, citations + 1):
+            path = rng.choice(paths)
+            start = rng.randint(1, max(1, line_counts[path] - 2))
+            end = min(line_counts[path], start + rng.randint(0, 4))
+            body.append(f"The {rng.choice(WORDS)} handles {rng.choice(WORDS)}[^{n}].")
+            footnotes.append(f"[^{n}]: `{path}` L{start}-L{end}")
+            page_citations.append({"filepath": path, "start_line": start, "end_line": end})
+        # Every 50th external link is dead on the local link server
+        for n in range(links):
+            state = "dead" if (i * links + n) % 50 == 0 else "ok"
+            body.append(f"- [{rng.choice(WORDS)} reference]({LINK_BASE}{state}/{comp}/{i}-{n}#top)")
+        body += ["", *footnotes, "<!-- END:REPO_WIKI_MANAGED -->", "", "## Notes", ""]
+        (repo / page).parent.mkdir(parents=True, exist_ok=True)
+        (repo / page).write_text("\n".join(body))
+        manifest_pages[page] = {"citations": page_citations}
+
+    manifest_file = repo / ".repo_wiki/manifest.json"
+    manifest = json.loads(manifest_file.read_text())
+    manifest["pages"] = manifest_pages
+    manifest_file.write_text(json.dumps(manifest, indent=2))
+
+    state_file = repo / ".repo_wiki/state.json"
+    state = json.loads(state_file.read_text())
+    state["repo_remote_url"] = "https://github.com/example/synthetic"
+    state_file.write_text(json.dumps(state, indent=2))
+
+    for c in range(commits):
+        for path in rng.sample(paths, min(len(paths), 5)):
+            with open(repo / path, "a") as f:
+                f.write(f"# change {c}\n")
+        git(repo, "commit", "-qam", f"change {c}")
+
+    return {
+        "files": files,
+        "depth": depth,
+        "components": components,
+        "pages": pages,
+        "citations_per_page": citations,
+        "links_per_page": links,
+        "commits": commits,
+        "seed": seed,
+        "baseline_commit": baseline_commit,
+    }
+
+
+class LinkHandler(BaseHTTPRequestHandler):
+    """Keep-alive stand-in for external sites: /dead/... is 404, everything else 200."""
+
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, *args):
+        pass
+
+    def do_HEAD(self):
+        self.send_response(404 if self.path.startswith("/dead/") else 200)
+        self.send_header("Content-Length", "0")
+        self.end_headers()
+
+    do_GET = do_HEAD
+
+
+def start_link_server() -> str:
+    """Serve LinkHandler on a free local port in the background; returns its base URL."""
+    server = ThreadingHTTPServer(("127.0.0.1", 0), LinkHandler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return f"http://127.0.0.1:{server.server_address[1]}/"
+
+
+# Runs `python ARGS...` in the child and writes the child's own peak RSS (KiB) to
+# the file named by its first argument at exit. ru_maxrss from wait4 cannot be used:
+# Linux carries the high-water mark across fork+exec, so every child would report
+# at least the harness's RSS. VmHWM belongs to the address space exec creates.
+RSS_WRAPPER = """
+import atexit, os, runpy, sys
+
+def report(path=sys.argv[1]):
+    try:
+        with open("/proc/self/status") as f:
+            peak = next(int(line.split()[1]) for line in f if line.startswith("VmHWM:"))
+    except OSError:
+        import resource
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        peak = peak // 1024 if sys.platform == "darwin" else peak
+    with open(path, "w") as f:
+        f.write(str(peak))
+
+atexit.register(report)
+sys.argv = sys.argv[2:]
+if sys.argv[0] == "-c":
+    code = sys.argv[1]
+    sys.argv = ["-c", *sys.argv[2:]]
+    exec(compile(code, "<string>", "exec"), {"__name__": "__main__"})
+else:
+    sys.path[0] = os.path.dirname(os.path.abspath(sys.argv[0]))
+    runpy.run_path(sys.argv[0], run_name="__main__")
+"""
+
+
+def run_measured(args: list[str], cwd: Path) -> dict:
+    """Run a script in a child interpreter and collect time, peak RSS and reads."""
+    fd, rss_file = tempfile.mkstemp(prefix="repo-wiki-bench-rss-")
+    os.close(fd)
+    started = time.perf_counter()
+    proc = subprocess.Popen(
+        [sys.executable, "-c", RSS_WRAPPER, rss_file, *args],
+        cwd=cwd,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+    )
+
+    # Wait without reaping so the exited child's I/O counters are still readable (Linux)
+    io = {}
+    if hasattr(os, "waitid"):
+        os.waitid(os.P_PID, proc.pid, os.WEXITED | os.WNOWAIT)
+        try:
+            with open(f"/proc/{proc.pid}/io") as f:
+                io = dict(line.split(": ") for line in f.read().splitlines())
+        except OSError:
+            pass
+    proc.wait()
+    wall = time.perf_counter() - started
+    try:
+        peak_rss_kb = int(Path(rss_file).read_text() or 0) or None
+    finally:
+        os.unlink(rss_file)
+
+    return {
+        "seconds": round(wall, 4),
+        "peak_rss_kb": peak_rss_kb,
+        "read_calls": int(io["syscr"]) if "syscr" in io else None,
+        "read_bytes": int(io["rchar"]) if "rchar" in io else None,
+        "exit_code": proc.returncode,
+    }
+
+
+# The pre-commit hook suggested in CURSOR_GUIDE.md, with absolute paths
+PRE_COMMIT_HOOK = """#!/bin/sh
+if [ -d ".repo_wiki" ]; then
+  exec "{python}" "{cli}" validate .
+fi
+"""
+
+
+def time_pre_commit(repo: Path) -> dict:
+    """Time a `git commit` that runs the validate pre-commit hook, end to end.
+
+    Peak RSS and reads are not recorded: they would be git's, not the hook's.
+    """
+    hook = repo / ".git/hooks/pre-commit"
+    hook.parent.mkdir(parents=True, exist_ok=True)
+    hook.write_text(PRE_COMMIT_HOOK.format(python=sys.executable, cli=CLI_SCRIPT))
+    hook.chmod(0o755)
+    started = time.perf_counter()
+    proc = subprocess.run(
+        ["git", "commit", "--allow-empty", "-qm", "bench: pre-commit"],
+        cwd=repo,
+        env={**os.environ, **GIT_ENV},
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+    )
+    return {
+        "seconds": round(time.perf_counter() - started, 4),
+        "peak_rss_kb": None,
+        "read_calls": None,
+        "read_bytes": None,
+        "exit_code": proc.returncode,
+    }
+
+
+def benchmark_suite(repo: Path, link_server: str) -> list[tuple[str, list[str], Path]]:
+    """Commands to time, in dependency order: (name, argv, cwd)."""
+    scripts_dir = CLI_SCRIPT.parent
+    check_links = [
+        str(CLI_SCRIPT),
+        "validate",
+        str(repo),
+        "--external-links",
+        "--rewrite",
+        f"{LINK_BASE}={link_server}",
+        "--host-rate",
+        "0",
+    ]
+    return [
+        # Startup cost alone: cold --help and bare module imports
+        ("startup.cli --help", [str(CLI_SCRIPT), "--help"], repo),
+        ("startup.llm --help", [str(LLM_SCRIPT), "--help"], repo),
+        ("import.repo_wiki_cli", ["-c", "import repo_wiki_cli"], scripts_dir),
+        ("import.repo_wiki_llm", ["-c", "import repo_wiki_llm"], scripts_dir),
+        ("cli.index", [str(CLI_SCRIPT), "index", str(repo)], repo),
+        ("cli.detect", [str(CLI_SCRIPT), "detect", str(repo)], repo),
+        ("cli.validate", [str(CLI_SCRIPT), "validate", str(repo)], repo),
+        # The first run checks every link against the local server, the second hits the cache
+        ("cli.validate.links-cold", check_links, repo),
+        ("cli.validate.links-warm", check_links, repo),
+        ("cli.search-index", [str(CLI_SCRIPT), "search-index", str(repo)], repo),
+        ("llm.estimate", [str(LLM_SCRIPT), "estimate", str(repo)], repo),
+        (
+            "cli.pipeline",
+            [str(CLI_SCRIPT), "pipeline", str(repo), "--steps", "index,detect,validate"],
+            repo,
+        ),
+        ("helper.compute_page_impact", [str(HELPER_DIR / "compute_page_impact.py")], repo),
+        ("helper.detect_managed_blocks", [str(HELPER_DIR / "detect_managed_blocks.py")], repo),
+        ("helper.validate_citations", [str(HELPER_DIR / "validate_citations.py")], repo),
+        ("helper.generate_permalinks", [str(HELPER_DIR / "generate_permalinks.py")], repo),
+    ]
+
+
+def compare(report: dict, baseline: dict, threshold: float) -> list[str]:
+    """List metrics that regressed beyond the threshold.
+
+    Raises ValueError when the baseline was recorded on a differently shaped
+    repository, since its numbers are then not comparable.
+    """
+    if baseline.get("params") != report["params"]:
+        changed = sorted(
+            key
+            for key in set(report["params"]) | set(baseline.get("params") or {})
+            if report["params"].get(key) != (baseline.get("params") or {}).get(key)
+        )
+        raise ValueError(f"baseline was recorded with different parameters ({', '.join(changed)})")
+
+    regressions = []
+    for name, metrics in report["results"].items():
+        base = baseline.get("results", {}).get(name)
+        if not base:
+            continue
+        for key in ("seconds", "peak_rss_kb", "read_bytes"):
+            new, old = metrics.get(key), base.get(key)
+            if new and old and new > old * threshold:
+                regressions.append(f"{name}: {key} {old} -> {new} ({new / old:.2f}x)")
+    return regressions
+
+
+@click.group()
+def cli():
+    """Repo Wiki Benchmarks - Time commands on a synthetic monorepo."""
+    pass
+
+
+def repo_options(func):
+    """Shared synthetic repository parameters."""
+    options = [
+        click.option("--files", default=2000, show_default=True, help="Source files"),
+        click.option("--depth", default=3, show_default=True, help="Max directory depth"),
+        click.option("--components", default=20, show_default=True, help="Components"),
+        click.option("--pages", default=200, show_default=True, help="Docs pages"),
+        click.option("--citations", default=10, show_default=True, help="Citations per page"),
+        click.option("--links", default=5, show_default=True, help="External links per page"),
+        click.option("--commits", default=20, show_default=True, help="Commits after baseline"),
+        click.option("--seed", default=42, show_default=True, help="Random seed"),
+    ]
+    for option in reversed(options):
+        func = option(func)
+    return func
+
+
+@cli.command("generate-repo")
+@click.argument("repo_path", type=click.Path())
+@repo_options
+def generate_repo_command(repo_path: str, **params):
+    """Create a synthetic repository without running benchmarks."""
+    repo = Path(repo_path).resolve()
+    meta = generate_repo(repo, **params)
+    click.echo(f"✅ Synthetic repository created: {repo}")
+    click.echo(f"   {json.dumps(meta)}")
+
+
+@cli.command()
+@repo_options
+@click.option("--workdir", type=click.Path(), help="Where to create the synthetic repo (kept)")
+@click.option(
+    "--baseline",
+    type=click.Path(),
+    default=str(DEFAULT_BASELINE),
+    show_default=True,
+    help="Baseline results to compare against",
+)
+@click.option("--save-baseline", is_flag=True, help="Store these results as the new baseline")
+@click.option("--threshold", default=DEFAULT_THRESHOLD, show_default=True, help="Regression ratio")
+def run(workdir, baseline, save_baseline, threshold, **params):
+    """Generate a synthetic repo and benchmark every command against it."""
+    base_dir = Path(workdir).resolve() if workdir else Path(tempfile.mkdtemp(prefix="repo-wiki-bench-"))
+    repo = base_dir / "repo"
+
+    click.echo(f"Generating synthetic repository in: {repo}")
+    started = time.perf_counter()
+    meta = generate_repo(repo, **params)
+    click.echo(f"   Generated in {time.perf_counter() - started:.1f}s")
+
+    link_server = start_link_server()
+    results = {}
+    click.echo(f"\n{'Command':<32} {'Seconds':>9} {'Peak RSS':>10} {'Reads':>8} {'Read MB':>8}")
+    measurements = [
+        (name, partial(run_measured, args, cwd))
+        for name, args, cwd in benchmark_suite(repo, link_server)
+    ]
+    # Last, since the commit moves HEAD
+    measurements.append(("git.pre-commit", partial(time_pre_commit, repo)))
+    for name, measure in measurements:
+        metrics = measure()
+        results[name] = metrics
+        rss = f"{metrics['peak_rss_kb'] // 1024} MB" if metrics["peak_rss_kb"] else "-"
+        reads = metrics["read_calls"] if metrics["read_calls"] is not None else "-"
+        read_mb = f"{metrics['read_bytes'] / 1e6:.1f}" if metrics["read_bytes"] is not None else "-"
+        status = "" if metrics["exit_code"] == 0 else f"  (exit {metrics['exit_code']})"
+        click.echo(f"{name:<32} {metrics['seconds']:>9.3f} {rss:>10} {reads:>8} {read_mb:>8}{status}")
+
+    report = {
+        "recorded_at": datetime.utcnow().isoformat() + "Z",
+        "python": sys.version.split()[0],
+        "params": meta,
+        "results": results,
+    }
+    log_dir = repo / ".repo_wiki/logs"
+    log_dir.mkdir(parents=True, exist_ok=True)
+    log_file = log_dir / f"benchmark-{datetime.utcnow().strftime('%Y%m%dT%H%M%SZ')}.json"
+    log_file.write_text(json.dumps(report, indent=2))
+    click.echo(f"\n✅ Results saved to {log_file}")
+
+    baseline_file = Path(baseline)
+    regressions = []
+    if baseline_file.exists():
+        try:
+            regressions = compare(report, json.loads(baseline_file.read_text()), threshold)
+        except ValueError as e:
+            click.echo(f"⚠️  Not compared: {e}")
+        else:
+            if regressions:
+                click.echo(f"\n❌ Regressions vs baseline ({len(regressions)}):")
+                for regression in regressions:
+                    click.echo(f"   - {regression}")
+            else:
+                click.echo(f"✅ No regressions beyond {threshold}x baseline")
+
+    if save_baseline:
+        baseline_file.parent.mkdir(parents=True, exist_ok=True)
+        baseline_file.write_text(json.dumps(report, indent=2))
+        click.echo(f"✅ Baseline saved to {baseline_file}")
+
+    sys.exit(1 if regressions else 0)
+
+
+if __name__ == "__main__":
+    cli()
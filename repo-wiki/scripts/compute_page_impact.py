@@ -4,30 +4,26 @@ import json
 import sys
 from pathlib import Path
 
+from wiki_json import iter_citations
+
 def compute_page_impact():
     """Map changed files to impacted documentation pages."""
     
     with open(".repo_wiki/change_set.json") as f:
         changes = json.load(f)
     
-    with open(".repo_wiki/manifest.json") as f:
-        manifest = json.load(f)
-    
     impacted_pages = set()
     
-    changed_files = (
+    changed_files = set(
         changes.get("added", []) +
         changes.get("modified", []) +
         changes.get("deleted", [])
     )
     
-    for page_path, page_data in manifest.get("pages", {}).items():
-        citations = page_data.get("citations", [])
-        
-        for citation in citations:
-            if citation.get("filepath") in changed_files:
-                impacted_pages.add(page_path)
-                break
+    # Citations are streamed one page at a time, so the manifest is never loaded whole
+    for page_path, citation in iter_citations(".repo_wiki/manifest.json"):
+        if citation.get("filepath") in changed_files:
+            impacted_pages.add(page_path)
     
     print(f"Impacted pages: {len(impacted_pages)}\n")
     
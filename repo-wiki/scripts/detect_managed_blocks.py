@@ -1,34 +1,162 @@
 #!/usr/bin/env uv run python
-"""Find and parse managed block markers in documentation."""
-import re
+"""Find and parse managed block markers in documentation.
+
+Maintains .repo_wiki/managed_blocks.json with the byte offsets, line ranges
+and content hash of every managed block. Pages whose size and mtime match
+their index entry are not re-read. Blocks whose hash differs from the one
+recorded when the agent wrote them are reported as human-edited.
+"""
+import hashlib
+import json
+import os
 import sys
+import tempfile
+from contextlib import contextmanager
 from pathlib import Path
 
+try:
+    import fcntl
+except ImportError:  # Windows: writes stay atomic, but are not serialized
+    fcntl = None
+
+BEGIN_MARKER = b"<!-- BEGIN:REPO_WIKI_MANAGED -->"
+END_MARKER = b"<!-- END:REPO_WIKI_MANAGED -->"
+INDEX_PATH = ".repo_wiki/managed_blocks.json"
+
+
+# Must stay in sync with scan_blocks in scripts/repo_wiki_blocks.py: this
+# script runs standalone, and both write entries into the same index.
+def scan_blocks(data):
+    """Locate managed blocks with a linear marker scan (no backtracking regex)."""
+    blocks = []
+    pos = 0
+    line = 1
+    while True:
+        begin = data.find(BEGIN_MARKER, pos)
+        if begin == -1:
+            break
+        start = begin + len(BEGIN_MARKER)
+        end = data.find(END_MARKER, start)
+        if end == -1:
+            break
+
+        line += data.count(b"\n", pos, begin)
+        start_line = line
+        line += data.count(b"\n", begin, end)
+        blocks.append({
+            "start_offset": start,
+            "end_offset": end,
+            "start_line": start_line,
+            "end_line": line,
+            "content_hash": hashlib.sha256(data[start:end]).hexdigest(),
+        })
+        pos = end
+    return blocks
+
+
+def load_index():
+    try:
+        with open(INDEX_PATH) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {"schema_version": "1.0", "pages": {}}
+
+
+@contextmanager
+def locked_index():
+    """Hold the index's advisory lock (the same lock file the CLI uses)."""
+    Path(INDEX_PATH).parent.mkdir(parents=True, exist_ok=True)
+    with open(INDEX_PATH + ".lock", "a") as f:
+        if fcntl:
+            fcntl.flock(f, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            if fcntl:
+                fcntl.flock(f, fcntl.LOCK_UN)
+
+
+def is_fresh(entry, page):
+    """Whether an index entry still describes the page on disk."""
+    try:
+        st = os.stat(page)
+    except OSError:
+        return False
+    return bool(entry) and entry["size"] == st.st_size and entry["mtime_ns"] == st.st_mtime_ns
+
+
+def save_index(pages):
+    """Merge scanned entries into the index on disk under its lock.
+
+    An entry written meanwhile by `generate` is kept while it still matches the
+    page, since it carries the hashes of what was just written.
+    """
+    with locked_index():
+        index = load_index()
+        current = index.get("pages", {})
+        merged = {
+            page: current[page] if is_fresh(current.get(page), page) else entry
+            for page, entry in pages.items()
+        }
+        # Pages created after the scan started are kept, deleted ones dropped
+        for page, entry in current.items():
+            if page not in merged and os.path.exists(page):
+                merged[page] = entry
+        index["pages"] = merged
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(INDEX_PATH), prefix=".managed_blocks.")
+        try:
+            with os.fdopen(fd, "w") as f:
+                json.dump(index, f)
+            os.replace(tmp_path, INDEX_PATH)
+        except BaseException:
+            os.unlink(tmp_path)
+            raise
+    return merged
+
+
 def detect_managed_blocks():
     """Find all managed blocks in docs."""
-    
+
+    index = load_index()
+
+    old_pages = index.get("pages", {})
+    pages = {}
+    rescanned = 0
+
     docs_path = Path("docs")
-    results = []
-    
-    for md_file in docs_path.glob("**/*.md"):
-        with open(md_file, errors='ignore') as f:
-            content = f.read()
-        
-        pattern = r'<!-- BEGIN:REPO_WIKI_MANAGED -->(.*?)<!-- END:REPO_WIKI_MANAGED -->'
-        blocks = re.findall(pattern, content, re.DOTALL)
-        
-        if blocks:
-            results.append({
-                "file": str(md_file),
-                "block_count": len(blocks),
-                "total_lines": len(content.splitlines())
-            })
-    
-    print(f"Found managed blocks in {len(results)} files:\n")
-    
-    for result in results:
-        print(f"  {result['file']}: {result['block_count']} blocks")
-    
+    for md_file in sorted(docs_path.glob("**/*.md")):
+        page = str(md_file)
+        st = md_file.stat()
+        entry = old_pages.get(page)
+
+        if not entry or entry["size"] != st.st_size or entry["mtime_ns"] != st.st_mtime_ns:
+            blocks = scan_blocks(md_file.read_bytes())
+            old_blocks = (entry or {}).get("blocks", [])
+            for i, block in enumerate(blocks):
+                block["written_hash"] = old_blocks[i].get("written_hash") if i < len(old_blocks) else None
+            entry = {"size": st.st_size, "mtime_ns": st.st_mtime_ns, "blocks": blocks}
+            rescanned += 1
+
+        pages[page] = entry
+
+    pages = save_index(pages)
+
+    results = [(page, entry) for page, entry in pages.items() if entry["blocks"]]
+    print(f"Found managed blocks in {len(results)} files ({rescanned} rescanned):\n")
+
+    edited = []
+    for page, entry in results:
+        ranges = ", ".join(f"L{b['start_line']}-L{b['end_line']}" for b in entry["blocks"])
+        print(f"  {page}: {len(entry['blocks'])} blocks ({ranges})")
+        for block in entry["blocks"]:
+            if block.get("written_hash") and block["written_hash"] != block["content_hash"]:
+                edited.append(f"{page} L{block['start_line']}-L{block['end_line']}")
+
+    if edited:
+        print(f"\n⚠️  {len(edited)} managed blocks were edited by hand:")
+        for block in edited:
+            print(f"  - {block}")
+
     return 0
 
 if __name__ == "__main__":
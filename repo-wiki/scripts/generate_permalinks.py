@@ -1,56 +1,196 @@
 #!/usr/bin/env uv run python
-"""Convert local citations to remote permalinks using git remote URL."""
+"""Convert local citations to remote permalinks using git remote URL.
+
+Only pages that changed since the last run are rewritten (tracked by size and
+mtime in .repo_wiki/permalinks.json). Pages are processed across a worker pool
+and written through a temp file and an atomic rename, and only when a
+citation actually changed, so unchanged pages keep their mtime.
+"""
+import argparse
 import json
+import os
 import re
+import subprocess
 import sys
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
 
-def generate_permalinks():
+STATE_PATH = ".repo_wiki/permalinks.json"
+
+# Unlinked citations only: a citation already inside link text is preceded by "["
+CITATION_PATTERN = re.compile(r'(?<!\[)`([^`]+)`\s+L(\d+)[-–]L(\d+)')
+
+# Below this many pages a process pool costs more than it saves
+MIN_PAGES_FOR_POOL = 32
+
+
+def load_run_state():
+    """Load page stats recorded by the previous run."""
+    try:
+        with open(STATE_PATH) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def page_stat(md_file):
+    """Size and mtime used to tell whether a page changed since the last run."""
+    st = os.stat(md_file)
+    return [st.st_size, st.st_mtime_ns]
+
+
+def atomic_write(path, content):
+    """Write a file via a temp file in the same directory and an atomic rename."""
+    fd, tmp_name = tempfile.mkstemp(dir=os.path.dirname(path) or ".", prefix=".permalinks.")
+    try:
+        with os.fdopen(fd, 'w', encoding='utf-8', newline='') as f:
+            f.write(content)
+        os.replace(tmp_name, path)
+    except BaseException:
+        os.unlink(tmp_name)
+        raise
+
+
+def resolve_file_commits(filepaths, fallback):
+    """Map each file to the last commit that touched it with one streamed git log."""
+    commits = {}
+    pending = set(filepaths)
+    if not pending:
+        return commits
+
+    # Paths go to git on stdin, so large wikis stay under the argument size limit
+    proc = subprocess.Popen(
+        ["git", "--literal-pathspecs", "-c", "core.quotePath=false", "log",
+         "--format=%x00%H", "--name-only", "--stdin"],
+        stdin=subprocess.PIPE,
+        stdout=subprocess.PIPE,
+        stderr=subprocess.DEVNULL,
+        text=True,
+    )
+    # git reads all of stdin before it writes anything, so this cannot deadlock
+    try:
+        proc.stdin.write("--\n" + "".join(f"{path}\n" for path in sorted(pending)))
+        proc.stdin.close()
+    except BrokenPipeError:  # git failed to start (not a repository); use the fallback
+        pass
+    current = None
+    for line in proc.stdout:
+        line = line.rstrip("\n")
+        if line.startswith("\0"):
+            current = line[1:]
+        elif line in pending:
+            commits[line] = current
+            pending.discard(line)
+            if not pending:
+                break
+    proc.kill()
+    proc.wait()
+
+    for filepath in pending:
+        commits[filepath] = fallback
+    return commits
+
+
+def rewrite_page(job):
+    """Replace unlinked citations in one page; returns (page, updated)."""
+    md_file, remote_url, baseline_commit, file_commits = job
+
+    with open(md_file, encoding='utf-8', newline='') as f:
+        content = f.read()
+
+    def replace_with_permalink(match):
+        filepath = match.group(1)
+        start_line = match.group(2)
+        end_line = match.group(3)
+        commit = file_commits.get(filepath, baseline_commit)
+        permalink = f"{remote_url}/blob/{commit}/{filepath}#L{start_line}-L{end_line}"
+        return f"[{filepath}#L{start_line}-L{end_line}]({permalink})"
+
+    new_content = CITATION_PATTERN.sub(replace_with_permalink, content)
+
+    if new_content != content:
+        atomic_write(md_file, new_content)
+        return md_file, True
+    return md_file, False
+
+
+def generate_permalinks(argv=None):
     """Convert citations to permalinks."""
-    
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--all", action="store_true", help="Process every page, not only changed ones")
+    parser.add_argument(
+        "--pin-per-file",
+        action="store_true",
+        help="Pin each citation to the last commit that touched its file",
+    )
+    parser.add_argument("--workers", type=int, default=os.cpu_count(), help="Worker processes")
+    args = parser.parse_args(argv)
+
     with open(".repo_wiki/state.json") as f:
         state = json.load(f)
-    
+
     remote_url = state.get("repo_remote_url", "")
     baseline_commit = state.get("baseline_commit", "")
-    
+
     if not remote_url:
         print("⚠️  No remote URL configured")
         return 1
-    
+
     if remote_url.startswith("git@github.com:"):
         remote_url = remote_url.replace("git@github.com:", "https://github.com/")
     if remote_url.endswith(".git"):
         remote_url = remote_url[:-4]
-    
+
     print(f"Remote: {remote_url}")
-    print(f"Commit: {baseline_commit}")
-    
+    print(f"Commit: {'per file' if args.pin_per_file else baseline_commit}")
+
+    # A different remote or pinning mode invalidates every recorded page
+    settings = {
+        "remote_url": remote_url,
+        "baseline_commit": baseline_commit,
+        "pin_per_file": args.pin_per_file,
+    }
+    run_state = load_run_state()
+    recorded = {}
+    if run_state.get("settings") == settings and not args.all:
+        recorded = run_state.get("pages", {})
+
     docs_path = Path("docs")
+    md_files = sorted(str(p) for p in docs_path.glob("**/*.md"))
+    changed = [p for p in md_files if recorded.get(p) != page_stat(p)]
+
+    file_commits = {}
+    if args.pin_per_file and changed:
+        cited = set()
+        for md_file in changed:
+            with open(md_file, encoding='utf-8') as f:
+                cited.update(m.group(1) for m in CITATION_PATTERN.finditer(f.read()))
+        file_commits = resolve_file_commits(cited, baseline_commit)
+
+    jobs = [(p, remote_url, baseline_commit, file_commits) for p in changed]
+    if len(jobs) >= MIN_PAGES_FOR_POOL and args.workers > 1:
+        with ProcessPoolExecutor(max_workers=args.workers) as pool:
+            results = list(pool.map(rewrite_page, jobs, chunksize=16))
+    else:
+        results = [rewrite_page(job) for job in jobs]
+
     updated_count = 0
-    
-    for md_file in docs_path.glob("**/*.md"):
-        with open(md_file) as f:
-            content = f.read()
-        
-        pattern = r'`([^`]+)`\s+L(\d+)[-–]L(\d+)'
-        
-        def replace_with_permalink(match):
-            filepath = match.group(1)
-            start_line = match.group(2)
-            end_line = match.group(3)
-            permalink = f"{remote_url}/blob/{baseline_commit}/{filepath}#L{start_line}-L{end_line}"
-            return f"[{filepath}#L{start_line}-L{end_line}]({permalink})"
-        
-        new_content = re.sub(pattern, replace_with_permalink, content)
-        
-        if new_content != content:
-            with open(md_file, 'w') as f:
-                f.write(new_content)
+    for md_file, updated in results:
+        if updated:
             updated_count += 1
             print(f"✓ Updated {md_file}")
-    
-    print(f"\n✓ Generated permalinks in {updated_count} files")
+
+    pages = {p: recorded[p] for p in md_files if p in recorded}
+    pages.update({p: page_stat(p) for p in changed})
+    new_state = json.dumps({"settings": settings, "pages": pages})
+    if new_state != json.dumps(run_state):
+        Path(STATE_PATH).parent.mkdir(parents=True, exist_ok=True)
+        atomic_write(STATE_PATH, new_state)
+
+    print(f"\n✓ Generated permalinks in {updated_count} files "
+          f"({len(changed) - updated_count} checked and unchanged, "
+          f"{len(md_files) - len(changed)} skipped since the last run)")
     return 0
 
 if __name__ == "__main__":
@@ -1,43 +1,59 @@
 #!/usr/bin/env uv run python
 """Validate that all citations in the wiki point to valid files and line ranges."""
-import json
+import hashlib
 import os
 import sys
 
+from wiki_json import iter_citations, json_path
+
 def validate_citations():
     """Validate all citations in manifest."""
     errors = []
+    drifted = []
     
     manifest_path = ".repo_wiki/manifest.json"
-    if not os.path.exists(manifest_path):
+    if not os.path.exists(json_path(manifest_path)):
         print("❌ manifest.json not found")
         return 1
     
-    with open(manifest_path) as f:
-        manifest = json.load(f)
-    
-    pages = manifest.get("pages", {})
+    cached_path, lines = None, []
     
-    for page_path, page_data in pages.items():
-        citations = page_data.get("citations", [])
+    # Citations are streamed one page at a time, so the manifest is never loaded whole
+    for page_path, citation in iter_citations(manifest_path):
+        filepath = citation.get("filepath", "")
+        start_line = citation.get("start_line", 0)
+        end_line = citation.get("end_line", 0)
+        
+        if not os.path.exists(filepath):
+            errors.append(f"{page_path}: File not found: {filepath}")
+            continue
+        
+        # Consecutive citations usually share a file; keep only the last one in memory
+        if filepath != cached_path:
+            with open(filepath, 'rb') as f:
+                lines = f.read().splitlines(keepends=True)
+            cached_path = filepath
+        line_count = len(lines)
         
-        for citation in citations:
-            filepath = citation.get("filepath", "")
-            start_line = citation.get("start_line", 0)
-            end_line = citation.get("end_line", 0)
-            
-            if not os.path.exists(filepath):
-                errors.append(f"{page_path}: File not found: {filepath}")
-                continue
-            
-            with open(filepath, errors='ignore') as f:
-                line_count = sum(1 for _ in f)
-            
-            if start_line < 1 or start_line > line_count:
-                errors.append(f"{page_path}: Invalid start line {start_line} in {filepath}")
-            
-            if end_line < start_line or end_line > line_count:
-                errors.append(f"{page_path}: Invalid end line {end_line} in {filepath}")
+        if start_line < 1 or start_line > line_count:
+            errors.append(f"{page_path}: Invalid start line {start_line} in {filepath}")
+            continue
+        
+        if end_line < start_line or end_line > line_count:
+            errors.append(f"{page_path}: Invalid end line {end_line} in {filepath}")
+            continue
+        
+        # range_hash records the cited lines at generation time
+        range_hash = citation.get("range_hash")
+        if range_hash:
+            current = hashlib.sha256(b"".join(lines[start_line - 1:end_line])).hexdigest()
+            if current != range_hash:
+                drifted.append(f"{page_path}: {filepath} L{start_line}-L{end_line} changed since generation")
+    
+    if drifted:
+        print(f"⚠️  {len(drifted)} citations point at code that changed:")
+        for warning in drifted:
+            print(f"  - {warning}")
     
     if errors:
         print(f"❌ Found {len(errors)} citation errors:")
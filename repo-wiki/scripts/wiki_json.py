@@ -0,0 +1,147 @@
+"""Lazy reader for large .repo_wiki JSON documents (manifest.json, code_index.json).
+
+Reads plain or gzipped (`<file>.gz`) documents and yields one section member
+at a time, skipping other sections member by member, so memory stays
+bounded by the largest single entry instead of the whole document.
+"""
+import gzip
+import json
+import os
+import re
+
+GZIP_MAGIC = b"\x1f\x8b"
+READ_CHUNK = 1 << 16
+
+_DECODER = json.JSONDecoder()
+_WHITESPACE = re.compile(r"[ \t\r\n]*")
+
+
+def json_path(path):
+    """The file holding a JSON document: `path`, or `path.gz` if only that exists."""
+    if not os.path.exists(path) and os.path.exists(path + ".gz"):
+        return path + ".gz"
+    return path
+
+
+def open_json(path):
+    """Open a JSON document for reading as text, transparently un-gzipping it."""
+    real = json_path(path)
+    with open(real, 'rb') as f:
+        magic = f.read(2)
+    if magic == GZIP_MAGIC:
+        return gzip.open(real, 'rt', encoding='utf-8')
+    return open(real, encoding='utf-8')
+
+
+# Must stay in sync with LazyJsonReader and iter_json_items in
+# scripts/repo_wiki_store.py. The skill scripts run standalone with only the
+# standard library, so they cannot import the CLI's store module.
+class LazyJsonReader:
+    """Walks a JSON document from a text stream, decoding only what is asked for."""
+
+    def __init__(self, stream):
+        self.stream = stream
+        self.buf = ""
+        self.pos = 0
+        self.eof = False
+
+    def _fill(self):
+        chunk = self.stream.read(READ_CHUNK)
+        if not chunk:
+            self.eof = True
+            return False
+        self.buf = self.buf[self.pos:] + chunk
+        self.pos = 0
+        return True
+
+    def peek(self):
+        while True:
+            self.pos = _WHITESPACE.match(self.buf, self.pos).end()
+            if self.pos < len(self.buf) or not self._fill():
+                return self.buf[self.pos:self.pos + 1]
+
+    def expect(self, char):
+        if self.peek() != char:
+            raise ValueError(f"expected {char!r} at offset {self.pos}")
+        self.pos += 1
+
+    def value(self):
+        self.peek()
+        while True:
+            try:
+                value, end = _DECODER.raw_decode(self.buf, self.pos)
+                # A number cut off by the buffer end ("12" of "12.5e3") may continue
+                if self.eof or (end < len(self.buf) and self.buf[end] not in ".eE"):
+                    self.pos = end
+                    return value
+            except json.JSONDecodeError:
+                if self.eof:
+                    raise
+            self._fill()
+
+    def skip(self):
+        # Members are decoded and dropped one at a time, which is faster than
+        # scanning brackets in Python and still never holds the whole section
+        char = self.peek()
+        if char == "{":
+            for _ in self.members():
+                self.value()
+        elif char == "[":
+            for _ in self.elements():
+                self.value()
+        else:
+            self.value()
+
+    def members(self):
+        self.expect("{")
+        if self.peek() == "}":
+            self.pos += 1
+            return
+        while True:
+            key = self.value()
+            self.expect(":")
+            yield key
+            char = self.peek()
+            self.pos += 1
+            if char == "}":
+                return
+            if char != ",":
+                raise ValueError(f"expected ',' or '}}' at offset {self.pos}")
+
+    def elements(self):
+        self.expect("[")
+        if self.peek() == "]":
+            self.pos += 1
+            return
+        while True:
+            yield
+            char = self.peek()
+            self.pos += 1
+            if char == "]":
+                return
+            if char != ",":
+                raise ValueError(f"expected ',' or ']' at offset {self.pos}")
+
+
+def iter_json_items(path, key):
+    """Yield (name, value) pairs of an object section, or the values of an array section."""
+    with open_json(path) as f:
+        reader = LazyJsonReader(f)
+        for name in reader.members():
+            if name != key:
+                reader.skip()
+                continue
+            if reader.peek() == "{":
+                for member in reader.members():
+                    yield member, reader.value()
+            elif reader.peek() == "[":
+                for _ in reader.elements():
+                    yield reader.value()
+            return
+
+
+def iter_citations(manifest_path):
+    """Yield (page, citation) for every citation in a manifest."""
+    for page, entry in iter_json_items(manifest_path, "pages"):
+        for citation in entry.get("citations", []):
+            yield page, citation
@@ -0,0 +1,134 @@
+"""
+Repo Wiki Blocks - Managed-block offset index.
+
+Records the byte offsets, line ranges and content hash of every
+<!-- BEGIN/END:REPO_WIKI_MANAGED --> block per page in
+.repo_wiki/managed_blocks.json. Entries are trusted while the page's size and
+mtime match, so updaters can splice at known offsets without re-parsing, and
+a block whose hash differs from the one recorded at write time was edited by
+a human.
+"""
+
+import hashlib
+import json
+from collections.abc import Iterable
+from pathlib import Path
+
+from repo_wiki_store import update_json
+
+BEGIN_MARKER = b"<!-- BEGIN:REPO_WIKI_MANAGED -->"
+END_MARKER = b"<!-- END:REPO_WIKI_MANAGED -->"
+
+BLOCK_INDEX = ".repo_wiki/managed_blocks.json"
+
+
+# Must stay in sync with scan_blocks in repo-wiki/scripts/detect_managed_blocks.py,
+# the standalone copy that writes entries into the same index.
+def scan_blocks(data: bytes) -> list[dict]:
+    """Locate managed blocks with a linear marker scan.
+
+    Offsets delimit the block's inner content (between the markers); lines
+    are the 1-based lines holding the BEGIN and END markers.
+    """
+    blocks = []
+    pos = 0
+    line = 1
+    while True:
+        begin = data.find(BEGIN_MARKER, pos)
+        if begin == -1:
+            break
+        start = begin + len(BEGIN_MARKER)
+        end = data.find(END_MARKER, start)
+        if end == -1:
+            break
+
+        line += data.count(b"\n", pos, begin)
+        start_line = line
+        line += data.count(b"\n", begin, end)
+        blocks.append(
+            {
+                "start_offset": start,
+                "end_offset": end,
+                "start_line": start_line,
+                "end_line": line,
+                "content_hash": hashlib.sha256(data[start:end]).hexdigest(),
+            }
+        )
+        pos = end
+    return blocks
+
+
+def load_block_index(repo: Path) -> dict:
+    """Load the managed-block index, or an empty one."""
+    try:
+        with open(repo / BLOCK_INDEX) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {"schema_version": "1.0", "pages": {}}
+
+
+def save_block_index(repo: Path, index: dict, pages: Iterable[str] | None = None) -> None:
+    """Persist the managed-block index next to the manifest.
+
+    With `pages`, only those entries are merged into the index on disk, so
+    entries written by concurrent runs are kept.
+    """
+
+    def merge(current: dict) -> dict | None:
+        if pages is None:
+            return index
+        for page in pages:
+            current["pages"][page] = index["pages"][page]
+        return None
+
+    update_json(repo / BLOCK_INDEX, merge, {"schema_version": "1.0", "pages": {}}, None)
+
+
+def is_fresh(entry: dict | None, page_file: Path) -> bool:
+    """Whether an index entry still describes the page on disk."""
+    if not entry:
+        return False
+    try:
+        st = page_file.stat()
+    except OSError:
+        return False
+    return entry["size"] == st.st_size and entry["mtime_ns"] == st.st_mtime_ns
+
+
+def index_page(page_file: Path, data: bytes, previous: dict | None, written: bool) -> dict:
+    """Build an index entry for a page.
+
+    `written` marks content the agent just wrote, so its hashes become the
+    reference for detecting later human edits; otherwise the written hashes
+    are carried over from the previous entry.
+    """
+    st = page_file.stat()
+    blocks = scan_blocks(data)
+    old_blocks = (previous or {}).get("blocks", [])
+    for i, block in enumerate(blocks):
+        if written:
+            block["written_hash"] = block["content_hash"]
+        elif i < len(old_blocks):
+            block["written_hash"] = old_blocks[i].get("written_hash")
+        else:
+            block["written_hash"] = None
+    return {"size": st.st_size, "mtime_ns": st.st_mtime_ns, "blocks": blocks}
+
+
+def human_edited(block: dict) -> bool:
+    """Whether a block's content differs from what the agent last wrote."""
+    return bool(block.get("written_hash")) and block["written_hash"] != block["content_hash"]
+
+
+def splice_at_offsets(data: bytes, entry: dict, new_content: bytes) -> bytes | None:
+    """Replace the first indexed block's content, or None if the offsets are stale."""
+    if not entry.get("blocks"):
+        return None
+    block = entry["blocks"][0]
+    start, end = block["start_offset"], block["end_offset"]
+    if (
+        data[start - len(BEGIN_MARKER) : start] != BEGIN_MARKER
+        or data[end : end + len(END_MARKER)] != END_MARKER
+    ):
+        return None
+    return data[:start] + new_content + data[end:]
@@ -0,0 +1,149 @@
+"""
+Repo Wiki Churn - Per-file change history from one streamed `git log` pass.
+
+`index` calls refresh_churn, which reads `git log --name-only -z` as a stream
+and keeps, per file, the number of commits touching it, the time of the last
+one and an exponentially decayed churn score (recent commits weigh more). The
+result is cached by commit in .repo_wiki/cache/churn.json, so later runs only
+read the commits made since the cached head; a rewritten history triggers a
+full rescan. Scores are relative to the newest commit's time, so they do not
+change between runs on the same commit.
+"""
+
+import math
+import subprocess
+from pathlib import Path
+
+from repo_wiki_store import read_json, write_json
+
+CHURN_CACHE = ".repo_wiki/cache/churn.json"
+
+# A commit's weight halves every HALF_LIFE_DAYS before the newest commit
+HALF_LIFE_DAYS = 90.0
+
+# Marks commit header records in the NUL-separated log stream
+HEADER_MARK = "\x01"
+READ_CHUNK = 1 << 16
+
+
+def git_output(repo: Path, *args: str) -> str | None:
+    """Output of a git command, or None if it fails."""
+    try:
+        return subprocess.check_output(
+            ["git", *args], cwd=repo, text=True, stderr=subprocess.DEVNULL
+        ).strip()
+    except (subprocess.CalledProcessError, FileNotFoundError):
+        return None
+
+
+def iter_log(repo: Path, revision: str):
+    """Stream (commit, timestamp, files) for every commit reachable from `revision`."""
+    process = subprocess.Popen(
+        ["git", "log", "--name-only", "-z", "--no-renames", f"--format={HEADER_MARK}%H %ct", revision],
+        cwd=repo,
+        stdout=subprocess.PIPE,
+        stderr=subprocess.DEVNULL,
+    )
+    commit, timestamp, files = None, 0, []
+    pending = b""
+    try:
+        while True:
+            chunk = process.stdout.read(READ_CHUNK)
+            if not chunk:
+                break
+            records = (pending + chunk).split(b"\0")
+            pending = records.pop()
+            for raw in records:
+                record = raw.decode("utf-8", errors="surrogateescape")
+                if record.startswith("\n"):
+                    record = record[1:]
+                if record.startswith(HEADER_MARK):
+                    if commit:
+                        yield commit, timestamp, files
+                    sha, _, ts = record[1:].partition(" ")
+                    commit, timestamp, files = sha, int(ts or 0), []
+                elif record:
+                    files.append(record)
+        if commit:
+            yield commit, timestamp, files
+    finally:
+        process.stdout.close()
+        process.wait()
+
+
+def decay(age_seconds: float) -> float:
+    """Weight of a commit made `age_seconds` before the reference time."""
+    return math.pow(0.5, max(0.0, age_seconds) / (HALF_LIFE_DAYS * 86400))
+
+
+def refresh_churn(repo: Path) -> dict:
+    """Bring the churn cache up to HEAD and return it.
+
+    Returns an empty history outside a git repository.
+    """
+    cache_file = repo / CHURN_CACHE
+    empty = {"head": "", "reference_time": 0, "commits": 0, "files": {}}
+    head = git_output(repo, "rev-parse", "HEAD")
+    if not head:
+        return empty
+
+    cached = read_json(cache_file, None) or empty
+    if cached.get("head") == head:
+        return cached
+
+    old_head = cached.get("head")
+    if old_head and git_output(repo, "merge-base", "--is-ancestor", old_head, head) is not None:
+        revision, churn = f"{old_head}..{head}", cached
+    else:
+        revision, churn = head, dict(empty, files={})
+
+    new_commits = list(iter_log(repo, revision))
+    reference_time = max([ts for _, ts, _ in new_commits] + [churn["reference_time"]])
+
+    # Re-base existing scores on the new reference time, then add the new commits
+    files = churn["files"]
+    shift = decay(reference_time - churn["reference_time"]) if churn["reference_time"] else 1.0
+    for entry in files.values():
+        entry[2] = entry[2] * shift
+    for _, timestamp, paths in new_commits:
+        weight = decay(reference_time - timestamp)
+        for path in paths:
+            entry = files.setdefault(path, [0, 0, 0.0])
+            entry[0] += 1
+            entry[1] = max(entry[1], timestamp)
+            entry[2] += weight
+    for entry in files.values():
+        entry[2] = round(entry[2], 4)
+
+    churn = {
+        "head": head,
+        "reference_time": reference_time,
+        "commits": churn["commits"] + len(new_commits),
+        "files": files,
+    }
+    write_json(cache_file, churn, indent=None)
+    return churn
+
+
+def load_churn(repo: Path) -> dict:
+    """The cached churn history, without touching git."""
+    return read_json(repo / CHURN_CACHE, {}) or {}
+
+
+def path_churn(churn: dict, prefix: str) -> dict[str, list]:
+    """Entries [commits, last_commit_time, score] of the files under a path."""
+    files = churn.get("files", {})
+    prefix = prefix.strip("/")
+    if not prefix or prefix == ".":
+        return files
+    prefix += "/"
+    return {path: entry for path, entry in files.items() if path.startswith(prefix)}
+
+
+def summarize_churn(entries: dict[str, list]) -> dict:
+    """Aggregate file entries into file-level change count, last change and score."""
+    return {
+        "changes": sum(e[0] for e in entries.values()),
+        "last_changed": max((e[1] for e in entries.values()), default=0),
+        "score": round(sum(e[2] for e in entries.values()), 4),
+    }
@@ -11,19 +11,62 @@ Usage:
     uv run scripts/repo_wiki_cli.py index /path/to/repo
     uv run scripts/repo_wiki_cli.py detect /path/to/repo
     uv run scripts/repo_wiki_cli.py validate /path/to/repo
+    uv run scripts/repo_wiki_cli.py search-index /path/to/repo
+    uv run scripts/repo_wiki_cli.py pipeline /path/to/repo --steps init,index
+    uv run scripts/repo_wiki_cli.py batch '/srv/services/*' --workers 8
+    uv run scripts/repo_wiki_cli.py serve /path/to/repo --socket /tmp/repo-wiki.sock
+    uv run scripts/repo_wiki_cli.py --trace index /path/to/repo
+    uv run scripts/repo_wiki_cli.py summarize /path/to/repo
 """
 
 import json
 import os
 import re
+import signal
 import subprocess
 import sys
+import threading
+import time
+from contextlib import redirect_stderr, redirect_stdout
 from datetime import datetime
 from pathlib import Path
 from typing import Any
 
 import click
 
+# Sibling modules are importable both as a script and via the package entry point
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+from repo_wiki_churn import HALF_LIFE_DAYS, path_churn, refresh_churn, summarize_churn  # noqa: E402
+from repo_wiki_discovery import (  # noqa: E402
+    detect_tech_stack,
+    find_components,
+    owning_component,
+    walk_repository,
+)
+from repo_wiki_retrieval import update_retrieval_index  # noqa: E402
+from repo_wiki_store import (  # noqa: E402
+    SHARED_CACHE_ENV,
+    atomic_write,
+    compress_state,
+    iter_json_items,
+    json_path,
+    read_json,
+    read_text,
+    write_json,
+    write_json_if_changed,
+    write_json_stream,
+    write_text_if_changed,
+)
+from repo_wiki_trace import (  # noqa: E402
+    COUNTERS,
+    LATENCIES,
+    TRACER,
+    span,
+    start_tracing,
+    summarize_traces,
+)
+from repo_wiki_validate import check_page  # noqa: E402
 
 # Default ignore patterns
 DEFAULT_IGNORE_PATTERNS = [
@@ -43,184 +86,221 @@ DEFAULT_IGNORE_PATTERNS = [
 ]
 
 
-def get_git_info(repo_path: Path) -> dict:
-    """Get git repository information."""
-    try:
-        commit = subprocess.check_output(
-            ["git", "rev-parse", "HEAD"],
-            cwd=repo_path,
-            text=True,
-            stderr=subprocess.DEVNULL,
-        ).strip()
-    except subprocess.CalledProcessError:
-        commit = ""
+MANAGED_BEGIN = "<!-- BEGIN:REPO_WIKI_MANAGED -->"
+MANAGED_END = "<!-- END:REPO_WIKI_MANAGED -->"
 
-    try:
-        remote = subprocess.check_output(
-            ["git", "config", "--get", "remote.origin.url"],
-            cwd=repo_path,
-            text=True,
-            stderr=subprocess.DEVNULL,
-        ).strip()
-    except subprocess.CalledProcessError:
-        remote = ""
+# Per-page search entries, reused while a page's size and mtime are unchanged
+SEARCH_CACHE = ".repo_wiki/cache/search_pages.json"
+SEARCH_INDEX = ".repo_wiki/search_index.json"
 
-    return {"commit": commit, "remote": remote}
+# mkdocs hook registered in mkdocs.yml by init. While a prebuilt index exists it
+# stops the search plugin from indexing each page during the build and publishes
+# the prebuilt file instead; hooks run after plugins
+SEARCH_HOOK = ".repo_wiki/mkdocs_search_hook.py"
+SEARCH_HOOK_SOURCE = '''"""Serve the search index prebuilt by `repo_wiki_cli.py search-index`.
 
+The search plugin stays configured (the theme only shows search with it), but
+its per-page indexing is unregistered, so builds do not re-tokenize every
+page. Without a prebuilt index the plugin works as usual.
+"""
 
-def detect_tech_stack(repo_path: Path) -> dict:
-    """Detect technology stack from file markers."""
-    tech = {}
-
-    markers = {
-        "package.json": "nodejs",
-        "requirements.txt": "python",
-        "pyproject.toml": "python",
-        "go.mod": "go",
-        "Cargo.toml": "rust",
-        "pom.xml": "java-maven",
-        "build.gradle": "java-gradle",
-        "Gemfile": "ruby",
-        "composer.json": "php",
-    }
+import shutil
+from pathlib import Path
 
-    framework_markers = {
-        "next.config.js": "nextjs",
-        "next.config.ts": "nextjs",
-        "next.config.mjs": "nextjs",
-        "angular.json": "angular",
-        "vue.config.js": "vue",
-        "nuxt.config.js": "nuxt",
-        "svelte.config.js": "svelte",
-        "Dockerfile": "docker",
-        "docker-compose.yml": "docker-compose",
-        "docker-compose.yaml": "docker-compose",
-        ".github/workflows": "github-actions",
-        "terraform": "terraform",
-        "helm": "helm",
-    }
+PREBUILT = Path(__file__).resolve().parent / "search_index.json"
+SEARCH_PLUGINS = ("search", "material/search")
 
-    for marker, tech_name in markers.items():
-        if (repo_path / marker).exists():
-            tech[tech_name] = True
-
-    for marker, tech_name in framework_markers.items():
-        if (repo_path / marker).exists():
-            tech[tech_name] = True
-
-    return tech
-
-
-def find_components(repo_path: Path) -> list[dict]:
-    """Find component directories."""
-    components = []
-    component_dirs = ["src", "lib", "packages", "apps", "app", "components", "modules"]
-
-    for base_dir in component_dirs:
-        base_path = repo_path / base_dir
-        if base_path.exists() and base_path.is_dir():
-            for item in base_path.iterdir():
-                if item.is_dir() and not item.name.startswith("."):
-                    file_count = sum(1 for _ in item.rglob("*") if _.is_file())
-                    components.append(
-                        {
-                            "name": item.name,
-                            "path": str(item.relative_to(repo_path)),
-                            "file_count": file_count,
-                        }
-                    )
-
-    return components
-
-
-def find_entrypoints(repo_path: Path) -> list[str]:
-    """Find main entry files."""
-    entrypoints = []
-    patterns = [
-        "main.py",
-        "main.ts",
-        "main.js",
-        "main.go",
-        "index.ts",
-        "index.js",
-        "app.py",
-        "app.ts",
-        "app.js",
-        "server.py",
-        "server.ts",
-        "server.js",
-    ]
 
-    for pattern in patterns:
-        for match in repo_path.rglob(pattern):
-            rel_path = str(match.relative_to(repo_path))
-            if not any(
-                ignore in rel_path
-                for ignore in ["node_modules", "dist", "build", "__pycache__", ".next"]
-            ):
-                entrypoints.append(rel_path)
-
-    return entrypoints[:10]  # Limit to 10
-
-
-def find_config_files(repo_path: Path) -> list[str]:
-    """Find configuration files."""
-    configs = []
-    config_patterns = [
-        "*.config.js",
-        "*.config.ts",
-        "*.config.mjs",
-        "tsconfig.json",
-        "jest.config.*",
-        "vite.config.*",
-        "webpack.config.*",
-        ".env.example",
-        "config.yml",
-        "config.yaml",
-        "config.json",
-    ]
+def on_config(config, **kwargs):
+    if not PREBUILT.exists():
+        return
+    plugins = config["plugins"]
+    search = [plugins[name] for name in SEARCH_PLUGINS if name in plugins]
+    handlers = plugins.events["page_context"]
+    handlers[:] = [h for h in handlers if getattr(h, "__self__", None) not in search]
+
+
+def on_post_build(config, **kwargs):
+    if PREBUILT.exists():
+        target = Path(config["site_dir"]) / "search" / "search_index.json"
+        target.parent.mkdir(parents=True, exist_ok=True)
+        shutil.copyfile(PREBUILT, target)
+'''
+
+# Same tokenizer settings as the mkdocs search plugin defaults
+SEARCH_SEPARATOR = r"[\s\-]+"
+SUGGEST_PREFIX_LENGTHS = range(2, 7)
+SUGGEST_LIMIT = 5
+
+# Steps of the in-process pipeline, in execution order
+PIPELINE_STEPS = ("init", "index", "detect", "generate", "validate", "permalinks")
+
+# Steps batch mode runs per repository; init only acts on uninitialized ones
+BATCH_STEPS = {"init", "index", "detect", "validate"}
+DEFAULT_BATCH_CACHE = "~/.cache/repo-wiki"
+DEFAULT_API_CONCURRENCY = 8
+
+# validate --external-links: cache TTL, links checked at once, requests/s per host
+DEFAULT_LINK_TTL_HOURS = 24.0
+DEFAULT_LINK_CONCURRENCY = 32
+DEFAULT_HOST_RATE = 10.0
+
+# Loopback port of the serve daemon's JSON-RPC endpoint
+DEFAULT_SERVE_PORT = 8765
+
+# Standalone helper scripts, present in a source checkout
+HELPER_DIR = Path(__file__).resolve().parent.parent / "repo-wiki/scripts"
+
+
+def page_location(rel_path: str) -> str:
+    """Site URL of a docs page, matching mkdocs use_directory_urls."""
+    location = rel_path[:-3]
+    if location == "index":
+        return ""
+    if location.endswith("/index"):
+        return location[: -len("index")]
+    return location + "/"
+
+
+def slugify(title: str) -> str:
+    """Heading anchor as generated by the mkdocs toc extension."""
+    slug = re.sub(r"[^\w\s-]", "", title).strip().lower()
+    return re.sub(r"[-\s]+", "-", slug)
+
+
+def searchable_text(markdown: str) -> str:
+    """Strip markdown syntax that should not be indexed."""
+    text = re.sub(r"<!--.*?-->", " ", markdown, flags=re.DOTALL)
+    text = re.sub(r"\[\^[^\]]+\]:?", " ", text)
+    text = re.sub(r"!?\[([^\]]*)\]\([^)]*\)", r"\1", text)
+    text = re.sub(r"[`*_>#|]", " ", text)
+    return re.sub(r"\s+", " ", text).strip()
+
+
+def register_search_hook(mkdocs_file: Path) -> bool:
+    """Add SEARCH_HOOK to the hooks of an existing mkdocs.yml.
+
+    Returns whether the file was changed. A flow-style `hooks: [...]` list is
+    left for the user to edit.
+    """
+    lines = (read_text(mkdocs_file) or "").splitlines(keepends=True)
+    if any(SEARCH_HOOK in line for line in lines):
+        return False
+    for i, line in enumerate(lines):
+        if line.startswith("hooks:"):
+            if line.rstrip() != "hooks:":
+                return False
+            following = lines[i + 1] if i + 1 < len(lines) else ""
+            indent = following[: len(following) - len(following.lstrip())]
+            if not following.lstrip().startswith("- "):
+                indent = "  "
+            lines.insert(i + 1, f"{indent}- {SEARCH_HOOK}\n")
+            break
+    else:
+        if lines and not lines[-1].endswith("\n"):
+            lines[-1] += "\n"
+        lines.append(f"\nhooks:\n  - {SEARCH_HOOK}\n")
+    write_text_if_changed(mkdocs_file, "".join(lines))
+    return True
+
+
+def build_search_entries(rel_path: str, content: str) -> list[dict]:
+    """Build the page and per-section search entries for a docs page.
+
+    Only the managed block is indexed when the page has one.
+    """
+    if content.startswith("---"):
+        close = content.find("\n---", 3)
+        if close != -1:
+            content = content[close + 4 :]
+
+    title_match = re.search(r"^#\s+(.+)$", content, re.MULTILINE)
+    title = title_match.group(1).strip() if title_match else Path(rel_path).stem
+
+    begin = content.find(MANAGED_BEGIN)
+    end = content.find(MANAGED_END, begin + 1)
+    if begin != -1 and end != -1:
+        content = content[begin + len(MANAGED_BEGIN) : end]
+
+    location = page_location(rel_path)
+    parts = re.split(r"^(#{1,6})\s+(.+?)\s*$", content, flags=re.MULTILINE)
+    entries = [{"location": location, "title": title, "text": searchable_text(parts[0])}]
+    for level, heading, body in zip(parts[1::3], parts[2::3], parts[3::3]):
+        if len(level) == 1:
+            entries[0]["text"] = (entries[0]["text"] + " " + searchable_text(body)).strip()
+            continue
+        entries.append(
+            {
+                "location": f"{location}#{slugify(heading)}",
+                "title": heading,
+                "text": searchable_text(body),
+            }
+        )
+    return entries
 
-    # Direct files
-    direct_configs = [
-        "package.json",
-        "requirements.txt",
-        "pyproject.toml",
-        "Dockerfile",
-        "docker-compose.yml",
-        ".gitignore",
-    ]
 
-    for config in direct_configs:
-        if (repo_path / config).exists():
-            configs.append(config)
+def build_suggestions(docs: list[dict]) -> dict[str, list[str]]:
+    """Map short prefixes to the most frequent indexed terms for search.suggest."""
+    counts: dict[str, int] = {}
+    for doc in docs:
+        for term in re.split(SEARCH_SEPARATOR, f"{doc['title']} {doc['text']}".lower()):
+            term = term.strip(".,:;()[]{}\"'")
+            if len(term) >= 3 and term.isascii() and term[0].isalpha():
+                counts[term] = counts.get(term, 0) + 1
+
+    by_prefix: dict[str, list[str]] = {}
+    for term in sorted(counts, key=lambda t: (-counts[t], t)):
+        for n in SUGGEST_PREFIX_LENGTHS:
+            if n >= len(term):
+                break
+            bucket = by_prefix.setdefault(term[:n], [])
+            if len(bucket) < SUGGEST_LIMIT:
+                bucket.append(term)
+    return dict(sorted(by_prefix.items()))
 
-    return configs
 
+def get_git_info(repo_path: Path) -> dict:
+    """Get git repository information."""
+    try:
+        with span("git", args="rev-parse HEAD"):
+            commit = subprocess.check_output(
+                ["git", "rev-parse", "HEAD"],
+                cwd=repo_path,
+                text=True,
+                stderr=subprocess.DEVNULL,
+            ).strip()
+    except subprocess.CalledProcessError:
+        commit = ""
 
-def count_files_by_extension(repo_path: Path) -> dict[str, int]:
-    """Count files by extension."""
-    counts: dict[str, int] = {}
+    try:
+        with span("git", args="config --get remote.origin.url"):
+            remote = subprocess.check_output(
+                ["git", "config", "--get", "remote.origin.url"],
+                cwd=repo_path,
+                text=True,
+                stderr=subprocess.DEVNULL,
+            ).strip()
+    except subprocess.CalledProcessError:
+        remote = ""
 
-    for file in repo_path.rglob("*"):
-        if file.is_file():
-            rel_path = str(file.relative_to(repo_path))
-            if any(
-                ignore in rel_path
-                for ignore in ["node_modules", "dist", "build", ".git", "__pycache__"]
-            ):
-                continue
-            ext = file.suffix or "(no extension)"
-            counts[ext] = counts.get(ext, 0) + 1
+    return {"commit": commit, "remote": remote}
 
-    # Sort by count and return top 10
-    sorted_counts = dict(sorted(counts.items(), key=lambda x: -x[1])[:10])
-    return sorted_counts
+
+def finish_trace() -> None:
+    """Write the run's trace when the command exits."""
+    trace_file = TRACER.finish()
+    if trace_file:
+        click.echo(f"   📈 Trace saved to {trace_file}")
 
 
 @click.group()
-def cli():
+@click.option("--trace", is_flag=True, help="Record per-phase spans in .repo_wiki/logs")
+@click.option("--profile", is_flag=True, help="Also dump a cProfile file (implies --trace)")
+@click.pass_context
+def cli(ctx: click.Context, trace: bool, profile: bool):
     """Repo Wiki CLI - Mechanical operations for wiki generation."""
-    pass
+    if start_tracing(ctx.invoked_subcommand or "cli", trace, profile):
+        ctx.call_on_close(finish_trace)
 
 
 @cli.command()
@@ -228,6 +308,7 @@ def cli():
 def init(repo_path: str):
     """Initialize wiki structure in a repository."""
     repo = Path(repo_path).resolve()
+    TRACER.bind_repo(repo)
     click.echo(f"Initializing wiki structure in: {repo}")
 
     # Get git info
@@ -260,10 +341,16 @@ def init(repo_path: str):
         "ignore_patterns": DEFAULT_IGNORE_PATTERNS,
     }
 
-    state_file = repo / ".repo_wiki/state.json"
-    with open(state_file, "w") as f:
-        json.dump(state, f, indent=2)
-    click.echo(f"  Created: .repo_wiki/state.json")
+    # Files whose content is unchanged apart from timestamps are left alone
+    written, skipped = 0, 0
+    if write_json_if_changed(
+        repo / ".repo_wiki/state.json", state, volatile=("created_at", "last_updated_at")
+    ):
+        written += 1
+        click.echo(f"  Created: .repo_wiki/state.json")
+    else:
+        skipped += 1
+        click.echo(f"  Unchanged: .repo_wiki/state.json")
 
     # Create manifest.json
     manifest = {
@@ -273,10 +360,18 @@ def init(repo_path: str):
         "pages": {},
     }
 
-    manifest_file = repo / ".repo_wiki/manifest.json"
-    with open(manifest_file, "w") as f:
-        json.dump(manifest, f, indent=2)
-    click.echo(f"  Created: .repo_wiki/manifest.json")
+    if write_json_if_changed(
+        repo / ".repo_wiki/manifest.json",
+        manifest,
+        volatile=("generated_at",),
+        indent=None,
+        compress=compress_state(),
+    ):
+        written += 1
+        click.echo(f"  Created: .repo_wiki/manifest.json")
+    else:
+        skipped += 1
+        click.echo(f"  Unchanged: .repo_wiki/manifest.json")
 
     # Create mkdocs.yml
     mkdocs_config = f"""site_name: {repo.name} Documentation
@@ -310,16 +405,31 @@ markdown_extensions:
 
 plugins:
   - search
+
+# Builds use the index prebuilt by `search-index` instead of indexing every page
+hooks:
+  - {SEARCH_HOOK}
 """
 
     mkdocs_file = repo / "mkdocs.yml"
     if not mkdocs_file.exists():
-        with open(mkdocs_file, "w") as f:
-            f.write(mkdocs_config)
+        write_text_if_changed(mkdocs_file, mkdocs_config)
+        written += 1
         click.echo(f"  Created: mkdocs.yml")
+    elif register_search_hook(mkdocs_file):
+        written += 1
+        click.echo(f"  Updated: mkdocs.yml (registered {SEARCH_HOOK})")
     else:
+        skipped += 1
         click.echo(f"  Skipped: mkdocs.yml (already exists)")
 
+    if write_text_if_changed(repo / SEARCH_HOOK, SEARCH_HOOK_SOURCE):
+        written += 1
+        click.echo(f"  Created: {SEARCH_HOOK}")
+    else:
+        skipped += 1
+        click.echo(f"  Unchanged: {SEARCH_HOOK}")
+
     # Create placeholder index.md
     index_content = f"""---
 generated_by: repo-wiki-agent
@@ -355,11 +465,14 @@ This wiki is maintained by repo-wiki agent skills.
 
     index_file = repo / "docs/index.md"
     if not index_file.exists():
-        with open(index_file, "w") as f:
-            f.write(index_content)
+        write_text_if_changed(index_file, index_content)
+        written += 1
         click.echo(f"  Created: docs/index.md")
+    else:
+        skipped += 1
+        click.echo(f"  Skipped: docs/index.md (already exists)")
 
-    click.echo(f"\n✅ Wiki structure initialized!")
+    click.echo(f"\n✅ Wiki structure initialized! ({written} files written, {skipped} unchanged)")
     click.echo(f"   Next: Run 'index' command or use /wiki-init in Cursor to generate content")
 
 
@@ -368,6 +481,7 @@ This wiki is maintained by repo-wiki agent skills.
 def index(repo_path: str):
     """Build code index for a repository."""
     repo = Path(repo_path).resolve()
+    TRACER.bind_repo(repo)
     click.echo(f"Indexing repository: {repo}")
 
     # Ensure .repo_wiki exists
@@ -377,11 +491,25 @@ def index(repo_path: str):
         sys.exit(1)
 
     git_info = get_git_info(repo)
-    tech_stack = detect_tech_stack(repo)
-    components = find_components(repo)
-    entrypoints = find_entrypoints(repo)
-    configs = find_config_files(repo)
-    file_counts = count_files_by_extension(repo)
+    # One walk feeds the statistics, component tree and retrieval index
+    with span("walk") as s:
+        walk = walk_repository(repo)
+        s["files"] = walk["total_files"]
+    with span("walk.components") as s:
+        components = find_components(walk)
+        tech_stack = detect_tech_stack(walk, components)
+        s["components"] = len(components)
+    file_counts = walk["by_extension"]
+    entrypoints = walk["entrypoints"]
+    configs = walk["configuration_files"]
+    with span("git.log") as s:
+        churn = refresh_churn(repo)
+        s["files"] = len(churn["files"])
+    for component in components:
+        component["churn"] = summarize_churn(path_churn(churn, component["path"]))
+    with span("retrieval.index") as s:
+        retrieval = update_retrieval_index(repo, walk["indexed_files"])
+        s["files"] = retrieval["indexed"]
 
     # Build index
     code_index = {
@@ -394,24 +522,51 @@ def index(repo_path: str):
             "total_files": sum(file_counts.values()),
         },
         "technology_stack": tech_stack,
+        "workspaces": walk["workspaces"],
         "components": components,
         "entrypoints": entrypoints,
         "configuration_files": configs,
+        "churn": {
+            "head": churn["head"],
+            "commits": churn["commits"],
+            "half_life_days": HALF_LIFE_DAYS,
+        },
     }
 
-    # Save index
+    # Save index compactly, components streamed last
     index_file = repo / ".repo_wiki/code_index.json"
-    with open(index_file, "w") as f:
-        json.dump(code_index, f, indent=2)
+    with span("write", path=".repo_wiki/code_index.json") as s:
+        write_json_stream(
+            index_file,
+            {k: v for k, v in code_index.items() if k != "components"},
+            arrays={"components": components},
+            compress=compress_state(),
+        )
+        s["bytes"] = json_path(index_file).stat().st_size
 
     click.echo(f"\n📊 Index Results:")
     click.echo(f"   Total files: {code_index['statistics']['total_files']}")
     click.echo(f"   Technology: {', '.join(tech_stack.keys()) or 'Unknown'}")
-    click.echo(f"   Components: {len(components)}")
+    projects = sum(1 for c in components if c["kind"] == "project")
+    click.echo(f"   Components: {len(components)} ({projects} projects)")
+    if walk["workspaces"]:
+        click.echo(
+            "   Workspaces: "
+            + ", ".join(f"{w['path']} ({w['type']})" for w in walk["workspaces"])
+        )
     click.echo(f"   Entrypoints: {len(entrypoints)}")
     click.echo(f"   Config files: {len(configs)}")
+    click.echo(
+        f"   Retrieval index: {retrieval['files']} files, {retrieval['chunks']} chunks "
+        f"({retrieval['indexed']} indexed, {retrieval['removed']} removed"
+        f"{', rebuilt' if retrieval['rebuilt'] else ''})"
+    )
+    hottest = max(components, key=lambda c: c["churn"]["score"], default=None)
+    if hottest and hottest["churn"]["score"]:
+        click.echo(f"   History: {churn['commits']} commits (hottest: {hottest['name']})")
 
     click.echo(f"\n✅ Code index saved to .repo_wiki/code_index.json")
+    return code_index
 
 
 @cli.command()
@@ -419,6 +574,7 @@ def index(repo_path: str):
 def detect(repo_path: str):
     """Detect changes since last wiki update."""
     repo = Path(repo_path).resolve()
+    TRACER.bind_repo(repo)
     click.echo(f"Detecting changes in: {repo}")
 
     # Load state
@@ -448,11 +604,13 @@ def detect(repo_path: str):
 
     # Get diff
     try:
-        diff_output = subprocess.check_output(
-            ["git", "diff", "--name-status", f"{last_commit}..{current_commit}"],
-            cwd=repo,
-            text=True,
-        )
+        with span("git", args="diff --name-status") as s:
+            diff_output = subprocess.check_output(
+                ["git", "diff", "--name-status", f"{last_commit}..{current_commit}"],
+                cwd=repo,
+                text=True,
+            )
+            s["bytes"] = len(diff_output)
     except subprocess.CalledProcessError as e:
         click.echo(f"❌ Git diff failed: {e}")
         sys.exit(1)
@@ -475,13 +633,26 @@ def detect(repo_path: str):
         elif status.startswith("R"):
             changes["renamed"].append({"old": parts[1], "new": parts[2]})
 
-    # Identify affected components
+    # Identify affected components: the deepest indexed component owning each path
+    code_index_file = repo / ".repo_wiki/code_index.json"
+    components = (
+        list(iter_json_items(code_index_file, "components"))
+        if json_path(code_index_file).exists()
+        else []
+    )
+    touched = changes["added"] + changes["modified"] + changes["deleted"]
+    touched += [path for rename in changes["renamed"] for path in (rename["old"], rename["new"])]
     affected_components = set()
-    for file_list in [changes["added"], changes["modified"], changes["deleted"]]:
-        for filepath in file_list:
-            parts = Path(filepath).parts
-            if len(parts) >= 2 and parts[0] in ["src", "lib", "packages", "app", "apps"]:
-                affected_components.add(parts[1])
+    for filepath in touched:
+        if components:
+            component = owning_component(components, filepath)
+            if component:
+                affected_components.add(component["name"])
+            continue
+        # Without an index, fall back to the conventional top-level folders
+        parts = Path(filepath).parts
+        if len(parts) >= 2 and parts[0] in ["src", "lib", "packages", "app", "apps"]:
+            affected_components.add(parts[1])
 
     # Identify impacted pages
     impacted_pages = set()
@@ -513,9 +684,7 @@ def detect(repo_path: str):
     }
 
     # Save change set
-    change_file = repo / ".repo_wiki/change_set.json"
-    with open(change_file, "w") as f:
-        json.dump(change_set, f, indent=2)
+    write_json(repo / ".repo_wiki/change_set.json", change_set)
 
     click.echo(f"\n📊 Changes Detected:")
     click.echo(f"   Added: {len(changes['added'])} files")
@@ -526,14 +695,73 @@ def detect(repo_path: str):
     click.echo(f"   Impacted pages: {len(impacted_pages)}")
 
     click.echo(f"\n✅ Change set saved to .repo_wiki/change_set.json")
+    return change_set
 
 
 @cli.command()
 @click.argument("repo_path", type=click.Path(exists=True))
-def validate(repo_path: str):
+@click.option("--external-links", is_flag=True, help="Also check http(s) links in pages")
+@click.option(
+    "--rewrite",
+    "rewrite_pairs",
+    multiple=True,
+    metavar="FROM=TO",
+    help="Check URLs starting with FROM against TO instead (repeatable)",
+)
+@click.option(
+    "--rewrite-map",
+    type=click.Path(exists=True, dir_okay=False),
+    help='JSON file of URL prefix rewrites, {"FROM": "TO"}',
+)
+@click.option(
+    "--link-ttl",
+    type=float,
+    default=DEFAULT_LINK_TTL_HOURS,
+    show_default=True,
+    help="Hours a cached link result stays valid",
+)
+@click.option(
+    "--link-concurrency",
+    type=click.IntRange(min=1),
+    default=DEFAULT_LINK_CONCURRENCY,
+    show_default=True,
+    help="Links checked at once",
+)
+@click.option(
+    "--host-rate",
+    type=click.FloatRange(min=0),
+    default=DEFAULT_HOST_RATE,
+    show_default=True,
+    help="Requests per second per host (0 for no limit)",
+)
+def validate(
+    repo_path: str,
+    external_links: bool,
+    rewrite_pairs: tuple[str, ...],
+    rewrite_map: str | None,
+    link_ttl: float,
+    link_concurrency: int,
+    host_rate: float,
+):
     """Validate wiki documentation."""
     repo = Path(repo_path).resolve()
+    TRACER.bind_repo(repo)
     click.echo(f"Validating wiki in: {repo}")
+    if external_links:
+        # The link checker pulls in asyncio and ssl, so it loads only when asked for
+        from repo_wiki_links import (
+            check_links,
+            describe,
+            extract_external_links,
+            is_broken,
+            is_unknown,
+            parse_rewrites,
+        )
+
+        try:
+            rewrites = parse_rewrites(rewrite_pairs, rewrite_map)
+        except ValueError as e:
+            raise click.BadParameter(str(e), param_hint="--rewrite")
 
     docs_dir = repo / "docs"
     if not docs_dir.exists():
@@ -551,54 +779,48 @@ def validate(repo_path: str):
     total_citations = 0
     valid_citations = 0
 
+    # Line counts are shared across pages, so each cited file is read once
+    line_counts: dict[str, int] = {}
+    # Pages citing each external URL, checked once after all pages are read
+    external: dict[str, list[str]] = {}
     for md_file in md_files:
-        with open(md_file, errors="ignore") as f:
-            content = f.read()
-
         rel_path = md_file.relative_to(repo)
-
-        # Check managed blocks
-        begin_count = content.count("<!-- BEGIN:REPO_WIKI_MANAGED -->")
-        end_count = content.count("<!-- END:REPO_WIKI_MANAGED -->")
-        if begin_count != end_count:
-            errors.append(f"{rel_path}: Mismatched managed blocks (BEGIN: {begin_count}, END: {end_count})")
-
-        # Check citations
-        citation_pattern = r"`([^`]+)`\s+L(\d+)-L?(\d+)"
-        citations = re.findall(citation_pattern, content)
-
-        for filepath, start_line, end_line in citations:
-            total_citations += 1
-            target_file = repo / filepath
-
-            if not target_file.exists():
-                errors.append(f"{rel_path}: Citation references missing file: {filepath}")
-            else:
-                try:
-                    line_count = sum(1 for _ in open(target_file, errors="ignore"))
-                    start = int(start_line)
-                    end = int(end_line)
-
-                    if start > line_count or end > line_count:
-                        errors.append(
-                            f"{rel_path}: Citation {filepath} L{start}-L{end} invalid "
-                            f"(file has {line_count} lines)"
-                        )
-                    else:
-                        valid_citations += 1
-                except Exception as e:
-                    warnings.append(f"{rel_path}: Could not validate {filepath}: {e}")
-
-        # Check internal links
-        link_pattern = r"\[([^\]]+)\]\(([^)]+\.md)\)"
-        links = re.findall(link_pattern, content)
-
-        for link_text, link_target in links:
-            if link_target.startswith("http"):
-                continue
-            target_path = md_file.parent / link_target
-            if not target_path.exists():
-                warnings.append(f"{rel_path}: Broken link to '{link_target}'")
+        with span("validate.page", page=str(rel_path)) as page_span:
+            with open(md_file, errors="ignore") as f:
+                content = f.read()
+            result = check_page(repo, md_file, content, line_counts)
+            page_span["bytes"] = len(content)
+            page_span["citations"] = len(result["citations"])
+
+        errors.extend(result["errors"])
+        warnings.extend(result["warnings"])
+        total_citations += len(result["citations"])
+        valid_citations += result["valid_citations"]
+        if external_links:
+            for url in extract_external_links(content):
+                external.setdefault(url, []).append(str(rel_path))
+
+    link_stats = None
+    if external_links and external:
+        with span("validate.external_links", urls=len(external)) as links_span:
+            results, link_stats = check_links(
+                repo, set(external), rewrites, link_ttl, link_concurrency, host_rate
+            )
+            links_span.update(link_stats)
+        for url in sorted(external):
+            result = results[url]
+            if is_broken(result):
+                pages = external[url]
+                more = f" (and {len(pages) - 1} more pages)" if len(pages) > 1 else ""
+                target = f" via {result['checked']}" if result["checked"] != url else ""
+                warnings.append(
+                    f"{pages[0]}: Broken external link {url}{target} ({describe(result)}){more}"
+                )
+            elif is_unknown(result):
+                warnings.append(
+                    f"{external[url][0]}: Could not check external link {url} "
+                    f"({describe(result)}, rate limited)"
+                )
 
     # Check mkdocs.yml
     mkdocs_file = repo / "mkdocs.yml"
@@ -606,7 +828,7 @@ def validate(repo_path: str):
         try:
             import yaml
 
-            with open(mkdocs_file) as f:
+            with span("validate.mkdocs"), open(mkdocs_file) as f:
                 yaml.safe_load(f)
             click.echo("   mkdocs.yml: Valid YAML")
         except ImportError:
@@ -620,6 +842,17 @@ def validate(repo_path: str):
     click.echo(f"\n📊 Validation Results:")
     click.echo(f"   Pages: {len(md_files)}")
     click.echo(f"   Citations: {valid_citations}/{total_citations} valid")
+    if link_stats is not None:
+        broken = sum(1 for url in external if is_broken(results[url]))
+        unknown = sum(1 for url in external if is_unknown(results[url]))
+        unchecked = f", {unknown} unknown" if unknown else ""
+        click.echo(
+            f"   External links: {len(external) - broken - unknown}/{len(external)} reachable"
+            f"{unchecked} ({link_stats['checked']} checked over "
+            f"{link_stats['connections']} connections, {link_stats['cached']} cached)"
+        )
+    elif external_links:
+        click.echo("   External links: none found")
 
     if errors:
         click.echo(f"\n❌ Errors ({len(errors)}):")
@@ -646,5 +879,497 @@ def validate(repo_path: str):
         sys.exit(0)
 
 
+@cli.command("search-index")
+@click.argument("repo_path", type=click.Path(exists=True))
+@click.option(
+    "--output",
+    default=SEARCH_INDEX,
+    show_default=True,
+    help="Where to write the index, relative to the repository",
+)
+def search_index(repo_path: str, output: str):
+    """Incrementally build a prebuilt search index for the wiki.
+
+    The output uses the mkdocs search plugin's search/search_index.json
+    format (lunr config plus per-page and per-section docs), with an extra
+    "suggest" map of prefix tokens. Only pages whose size or mtime changed
+    since the last run are re-read. At the default output path, the mkdocs
+    hook set up by init publishes it as the site's search/search_index.json.
+    """
+    repo = Path(repo_path).resolve()
+    TRACER.bind_repo(repo)
+    click.echo(f"Building search index for: {repo}")
+
+    docs_dir = repo / "docs"
+    if not docs_dir.exists():
+        click.echo("❌ No docs/ directory found.")
+        sys.exit(1)
+
+    cache_file = repo / SEARCH_CACHE
+    cache: dict = read_json(cache_file, {}) or {}
+
+    pages = {}
+    reindexed = 0
+    for md_file in sorted(docs_dir.rglob("*.md")):
+        rel_path = md_file.relative_to(docs_dir).as_posix()
+        st = md_file.stat()
+        entry = cache.get(rel_path)
+        if not entry or entry["size"] != st.st_size or entry["mtime_ns"] != st.st_mtime_ns:
+            with span("search.page", page=rel_path, bytes=st.st_size):
+                with open(md_file, errors="ignore") as f:
+                    entries = build_search_entries(rel_path, f.read())
+            entry = {"size": st.st_size, "mtime_ns": st.st_mtime_ns, "entries": entries}
+            reindexed += 1
+        pages[rel_path] = entry
+
+    write_json(cache_file, pages, indent=None)
+
+    docs = [doc for entry in pages.values() for doc in entry["entries"]]
+    with span("search.suggest", files=len(pages)):
+        suggest = build_suggestions(docs)
+    search_index_data = {
+        "config": {"lang": ["en"], "separator": SEARCH_SEPARATOR, "pipeline": ["stopWordFilter"]},
+        "docs": docs,
+        "suggest": suggest,
+    }
+
+    atomic_write(
+        repo / output, lambda f: json.dump(search_index_data, f, separators=(",", ":"))
+    )
+
+    click.echo(f"\n📊 Search Index:")
+    click.echo(f"   Pages: {len(pages)} ({reindexed} reindexed)")
+    click.echo(f"   Entries: {len(docs)}")
+    click.echo(f"\n✅ Search index saved to {output}")
+    mkdocs_file = repo / "mkdocs.yml"
+    if mkdocs_file.exists() and SEARCH_HOOK not in (read_text(mkdocs_file) or ""):
+        click.echo(f"   ⚠️  mkdocs.yml does not list {SEARCH_HOOK}; run 'init' to register it")
+
+
+def run_permalinks(repo: Path) -> int:
+    """Run the generate_permalinks.py helper in this process."""
+    if not (HELPER_DIR / "generate_permalinks.py").exists():
+        click.echo("   ⏭️  Skipped: generate_permalinks.py not found (not a source checkout)")
+        return 0
+    # Permalinks point at the hosted repository, so a local-only clone has none
+    if not (read_json(repo / ".repo_wiki/state.json", {}) or {}).get("repo_remote_url"):
+        click.echo("   ⏭️  Skipped: no git remote configured")
+        return 0
+    if str(HELPER_DIR) not in sys.path:
+        sys.path.insert(0, str(HELPER_DIR))
+    from generate_permalinks import generate_permalinks
+
+    # The helper resolves .repo_wiki/ and docs/ relative to the working directory
+    cwd = os.getcwd()
+    os.chdir(repo)
+    try:
+        return generate_permalinks([])
+    finally:
+        os.chdir(cwd)
+
+
+def parse_steps(steps: str) -> set[str]:
+    """Parse a comma-separated --steps value."""
+    selected = {step.strip() for step in steps.split(",") if step.strip()}
+    unknown = selected - set(PIPELINE_STEPS)
+    if unknown:
+        raise click.BadParameter(f"unknown step(s): {', '.join(sorted(unknown))}", param_hint="--steps")
+    return selected
+
+
+def run_pipeline(ctx: click.Context, repo: Path, selected: set[str]) -> list[tuple[str, int, float]]:
+    """Run the selected steps in order until one fails; returns (step, exit code, seconds)."""
+    fresh = False
+    change_set = None
+
+    def run_init() -> None:
+        nonlocal fresh
+        if (repo / ".repo_wiki/state.json").exists():
+            click.echo("   ⏭️  Skipped: wiki already initialized")
+            return
+        ctx.invoke(init, repo_path=str(repo))
+        fresh = True
+
+    def run_detect() -> None:
+        nonlocal change_set
+        if fresh:
+            click.echo("   ⏭️  Skipped: wiki was just initialized at HEAD")
+            return
+        change_set = ctx.invoke(detect, repo_path=str(repo))
+
+    def run_generate() -> None:
+        changed = "detect" in selected and not fresh
+        if changed and not (change_set and change_set["impacted_pages"]):
+            click.echo("   ⏭️  Skipped: no impacted pages")
+            return
+        # Only this step needs the LLM module (and, through it, the API client)
+        from repo_wiki_llm import generate
+
+        ctx.invoke(generate, repo_path=str(repo), changed=changed)
+
+    runners = {
+        "init": run_init,
+        "index": lambda: ctx.invoke(index, repo_path=str(repo)),
+        "detect": run_detect,
+        "generate": run_generate,
+        "validate": lambda: ctx.invoke(validate, repo_path=str(repo)),
+        "permalinks": lambda: sys.exit(run_permalinks(repo)),
+    }
+
+    results = []
+    for step in PIPELINE_STEPS:
+        if step not in selected:
+            continue
+        click.echo(f"\n▶️  {step}")
+        started = time.perf_counter()
+        try:
+            with span(f"pipeline.{step}"):
+                runners[step]()
+            code = 0
+        except SystemExit as e:
+            code = e.code if isinstance(e.code, int) else (0 if e.code is None else 1)
+        except Exception as e:
+            click.echo(f"❌ {step} failed: {e}")
+            code = 1
+        results.append((step, code, time.perf_counter() - started))
+        if code:
+            break
+    return results
+
+
+@cli.command()
+@click.argument("repo_path", type=click.Path(exists=True))
+@click.option(
+    "--steps",
+    default=",".join(PIPELINE_STEPS),
+    show_default=True,
+    help="Comma-separated steps to run; they always run in pipeline order",
+)
+@click.pass_context
+def pipeline(ctx: click.Context, repo_path: str, steps: str):
+    """Run init, index, detect, generate, validate and permalinks in one process.
+
+    Modules are imported once and results are handed from step to step. init
+    is skipped for an initialized wiki, detect right after a fresh init, and
+    generate only regenerates impacted pages when detect found changes. The
+    pipeline stops at the first failing step.
+    """
+    repo = Path(repo_path).resolve()
+    TRACER.bind_repo(repo)
+    results = run_pipeline(ctx, repo, parse_steps(steps))
+
+    click.echo(f"\n📊 Pipeline:")
+    for step, code, seconds in results:
+        click.echo(f"   {'✅' if code == 0 else '❌'} {step:<12} {seconds:>7.2f}s")
+
+    failed = next((code for _, code, _ in results if code), 0)
+    if failed:
+        click.echo(f"\n❌ Pipeline stopped at '{results[-1][0]}'")
+        sys.exit(failed)
+    click.echo(f"\n✅ Pipeline complete!")
+
+
+def expand_repos(patterns: tuple[str, ...], repo_list: str | None) -> list[Path]:
+    """Resolve repository arguments and list-file entries, expanding globs."""
+    entries = list(patterns)
+    if repo_list:
+        with open(repo_list) as f:
+            entries += [line.strip() for line in f if line.strip() and not line.startswith("#")]
+
+    import glob
+
+    repos: list[Path] = []
+    for entry in entries:
+        entry = os.path.expanduser(entry)
+        if any(c in entry for c in "*?["):
+            matches = [Path(m) for m in sorted(glob.glob(entry)) if Path(m).is_dir()]
+        else:
+            matches = [Path(entry)]
+        for match in matches:
+            if match.resolve() not in repos:
+                repos.append(match.resolve())
+    return repos
+
+
+def init_batch_worker(cache_dir: str, api_slots) -> None:
+    """Point a batch worker process at the shared cache and API budget."""
+    os.environ[SHARED_CACHE_ENV] = cache_dir
+    if api_slots is not None:
+        from repo_wiki_llm import share_api_slots
+
+        share_api_slots(api_slots)
+
+
+def batch_repo(repo: Path, steps: set[str]) -> dict:
+    """Run the pipeline for one repository, with its output in .repo_wiki/logs."""
+    started = time.perf_counter()
+    result = {"repo": str(repo), "ok": False, "steps": [], "log": None, "error": None, "seconds": 0.0}
+    if not repo.is_dir():
+        result["error"] = "not a directory"
+        return result
+
+    log_dir = repo / ".repo_wiki/logs"
+    log_dir.mkdir(parents=True, exist_ok=True)
+    log_file = log_dir / f"batch-{datetime.utcnow().strftime('%Y%m%dT%H%M%SZ')}.log"
+    result["log"] = str(log_file)
+    try:
+        with open(log_file, "w") as log, redirect_stdout(log), redirect_stderr(log):
+            with click.Context(pipeline, info_name="pipeline") as ctx:
+                steps_run = run_pipeline(ctx, repo, steps)
+    except Exception as e:
+        result["error"] = str(e) or type(e).__name__
+        steps_run = []
+
+    result["steps"] = [
+        {"step": step, "exit_code": code, "seconds": round(seconds, 3)}
+        for step, code, seconds in steps_run
+    ]
+    result["ok"] = result["error"] is None and all(code == 0 for _, code, _ in steps_run)
+    result["seconds"] = round(time.perf_counter() - started, 3)
+    return result
+
+
+@cli.command()
+@click.argument("repos", nargs=-1)
+@click.option(
+    "--from-file",
+    "repo_list",
+    type=click.Path(exists=True, dir_okay=False),
+    help="File listing one repository path or glob per line",
+)
+@click.option("--generate", is_flag=True, help="Also regenerate impacted pages via the API")
+@click.option(
+    "--workers",
+    type=click.IntRange(min=1),
+    default=os.cpu_count() or 1,
+    help="Repositories processed in parallel  [default: CPU count]",
+)
+@click.option(
+    "--api-concurrency",
+    type=click.IntRange(min=1),
+    default=DEFAULT_API_CONCURRENCY,
+    show_default=True,
+    help="API requests in flight across all repositories",
+)
+@click.option(
+    "--cache-dir",
+    default=DEFAULT_BATCH_CACHE,
+    show_default=True,
+    help="Fingerprint, summary and response cache shared by all repositories",
+)
+@click.option("--report", type=click.Path(dir_okay=False), help="Also write the report as JSON")
+def batch(
+    repos: tuple[str, ...],
+    repo_list: str | None,
+    generate: bool,
+    workers: int,
+    api_concurrency: int,
+    cache_dir: str,
+    report: str | None,
+):
+    """Run index, detect and validate across many repositories.
+
+    Repositories are given as paths or globs, on the command line or in a
+    --from-file list, and processed by a pool of worker processes. Each one is
+    initialized first if needed, and its output goes to
+    .repo_wiki/logs/batch-*.log. A failing repository is reported without
+    stopping the others.
+    """
+    targets = expand_repos(repos, repo_list)
+    if not targets:
+        click.echo("❌ No repositories matched.")
+        sys.exit(1)
+    if generate and not os.environ.get("ANTHROPIC_API_KEY"):
+        click.echo("❌ ANTHROPIC_API_KEY environment variable not set")
+        sys.exit(1)
+
+    # The process pool is only needed here, so other commands start without it
+    import multiprocessing
+    from concurrent.futures import ProcessPoolExecutor, as_completed
+
+    steps = BATCH_STEPS | ({"generate"} if generate else set())
+    cache = Path(cache_dir).expanduser().resolve()
+    cache.mkdir(parents=True, exist_ok=True)
+    api_slots = multiprocessing.BoundedSemaphore(api_concurrency) if generate else None
+
+    click.echo(f"Processing {len(targets)} repositories with {min(workers, len(targets))} workers")
+    click.echo(f"   Shared cache: {cache}")
+
+    started = time.perf_counter()
+    results = []
+    with ProcessPoolExecutor(
+        max_workers=min(workers, len(targets)),
+        initializer=init_batch_worker,
+        initargs=(str(cache), api_slots),
+    ) as pool:
+        futures = {pool.submit(batch_repo, repo, steps): repo for repo in targets}
+        for future in as_completed(futures):
+            try:
+                result = future.result()
+            except Exception as e:  # e.g. the worker process was killed
+                result = {
+                    "repo": str(futures[future]),
+                    "ok": False,
+                    "steps": [],
+                    "log": None,
+                    "error": str(e) or type(e).__name__,
+                    "seconds": 0.0,
+                }
+            results.append(result)
+            click.echo(
+                f"   {'✅' if result['ok'] else '❌'} [{len(results)}/{len(targets)}] "
+                f"{result['repo']} ({result['seconds']:.1f}s)"
+            )
+
+    results.sort(key=lambda r: r["repo"])
+    failed = [r for r in results if not r["ok"]]
+    step_seconds: dict[str, float] = {}
+    for result in results:
+        for step in result["steps"]:
+            step_seconds[step["step"]] = step_seconds.get(step["step"], 0.0) + step["seconds"]
+
+    click.echo(f"\n📊 Batch Results:")
+    click.echo(f"   Repositories: {len(results)} ({len(results) - len(failed)} ok, {len(failed)} failed)")
+    click.echo(f"   Wall time: {time.perf_counter() - started:.1f}s")
+    for step in PIPELINE_STEPS:
+        if step in step_seconds:
+            click.echo(f"   {step:<10} {step_seconds[step]:>8.1f}s total")
+
+    if failed:
+        click.echo(f"\n❌ Failed ({len(failed)}):")
+        for result in failed:
+            failing = next((s for s in result["steps"] if s["exit_code"]), None)
+            reason = result["error"] or (
+                f"{failing['step']} exited {failing['exit_code']}" if failing else "unknown"
+            )
+            click.echo(f"   - {result['repo']}: {reason}")
+            if result["log"]:
+                click.echo(f"     log: {result['log']}")
+
+    if report:
+        write_json(
+            Path(report),
+            {
+                "generated_at": datetime.utcnow().isoformat() + "Z",
+                "steps": sorted(steps, key=PIPELINE_STEPS.index),
+                "repositories": results,
+            },
+        )
+        click.echo(f"\n   Report saved to {report}")
+
+    if failed:
+        sys.exit(1)
+    click.echo(f"\n✅ Batch complete!")
+
+
+@cli.command()
+@click.argument("repo_path", type=click.Path(exists=True))
+@click.option("--port", default=DEFAULT_SERVE_PORT, show_default=True, help="Loopback HTTP port")
+@click.option(
+    "--socket",
+    "socket_path",
+    type=click.Path(dir_okay=False),
+    help="Listen on this Unix socket instead of HTTP",
+)
+@click.option(
+    "--poll-interval",
+    type=click.FloatRange(min=0.05),
+    default=1.0,
+    show_default=True,
+    help="Seconds between checks for changed files when watchdog is not installed",
+)
+def serve(repo_path: str, port: int, socket_path: str | None, poll_interval: float):
+    """Keep wiki indexes in memory and answer JSON-RPC 2.0 queries.
+
+    Methods: pages_citing(path), validate_page(page), impact(paths),
+    symbol(name), status() and refresh(full). Over HTTP, POST requests to
+    http://127.0.0.1:PORT/; over a Unix socket, send one request per line.
+    """
+    from repo_wiki_serve import WATCHES_EVENTS, WikiIndex, make_http_server, make_unix_server
+
+    repo = Path(repo_path).resolve()
+    TRACER.bind_repo(repo)
+
+    started = time.perf_counter()
+    with span("serve.load") as load_span:
+        wiki = WikiIndex(repo)
+        load_span["files"] = len(wiki.stats)
+    status = wiki.status()
+    click.echo(f"Loaded wiki for {repo} in {time.perf_counter() - started:.2f}s")
+    click.echo(
+        f"   Pages: {status['pages']} ({status['pages_with_errors']} with errors), "
+        f"cited files: {status['cited_files']}, symbols: {status['symbols']}"
+    )
+
+    def on_change(changed: list[str]) -> None:
+        shown = ", ".join(changed[:5]) + (f" (+{len(changed) - 5} more)" if len(changed) > 5 else "")
+        click.echo(f"   🔄 Refreshed {len(changed)} file(s): {shown}")
+
+    if socket_path:
+        server = make_unix_server(wiki, Path(socket_path))
+        click.echo(f"\n✅ Listening on unix:{socket_path}")
+    else:
+        server = make_http_server(wiki, port)
+        click.echo(f"\n✅ Listening on http://127.0.0.1:{port}/")
+
+    if WATCHES_EVENTS:
+        click.echo("   Watching for changes with filesystem events")
+    else:
+        click.echo(f"   Polling for changes every {poll_interval}s (install watchdog for events)")
+
+    # Let SIGTERM (service managers, timeout) run the cleanup below like Ctrl-C
+    signal.signal(signal.SIGTERM, lambda signum, frame: sys.exit(0))
+    stop = threading.Event()
+    threading.Thread(target=wiki.watch, args=(poll_interval, stop, on_change), daemon=True).start()
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        click.echo("\n   Stopping")
+    finally:
+        stop.set()
+        server.server_close()
+        if socket_path:
+            Path(socket_path).unlink(missing_ok=True)
+
+
+@cli.command()
+@click.argument("repo_path", type=click.Path(exists=True))
+@click.option("--top", default=15, show_default=True, help="Number of hot spots to show")
+def summarize(repo_path: str, top: int):
+    """Summarize recorded traces: the slowest phases across all runs."""
+    repo = Path(repo_path).resolve()
+    runs, stats = summarize_traces(repo)
+    if not stats:
+        click.echo("❌ No traces found. Run a command with --trace first.")
+        sys.exit(1)
+
+    # Whole-run spans would always top the list
+    hot = sorted(
+        ((name, entry) for name, entry in stats.items() if not name.endswith(":run")),
+        key=lambda item: -item[1]["total_ms"],
+    )[:top]
+
+    click.echo(f"📈 Hot spots across {runs} run(s):")
+    click.echo(
+        f"   {'Span':<32} {'Count':>6} {'Total ms':>10} {'p95 ms':>9} {'Max ms':>9}  Counters"
+    )
+    for name, entry in hot:
+        counters = [f"{c}={entry[c]:,}" for c in COUNTERS if c in entry]
+        counters += [f"mean {lat}={entry[lat]:.1f}" for lat in LATENCIES if lat in entry]
+        click.echo(
+            f"   {name:<32} {entry['count']:>6} {entry['total_ms']:>10.1f} "
+            f"{entry['p95_ms']:>9.1f} {entry['max_ms']:>9.1f}  {', '.join(counters)}"
+        )
+
+    click.echo("\n   Runs:")
+    for name, entry in sorted(stats.items()):
+        if name.endswith(":run"):
+            command = name[: -len(":run")]
+            click.echo(
+                f"   {command:<32} {entry['count']:>6} runs, "
+                f"mean {entry['total_ms'] / entry['count']:.1f} ms"
+            )
+
+
 if __name__ == "__main__":
     cli()
@@ -0,0 +1,510 @@
+"""
+Repo Wiki Context - Token-budgeted context packing for LLM prompts.
+
+Ranks the candidate files of a component by signal (entrypoint status, size,
+symbol density, import centrality and recent churn) and fills a token budget
+with numbered file contents, falling back to symbol outlines for files that
+do not fit in full. Also splits components into bounded units for
+hierarchical (map-reduce) summarization.
+
+Before packing, candidates pass a filter stage that drops vendored, generated
+and minified files and collapses byte-identical files to one representative.
+"""
+
+import hashlib
+import math
+import re
+import subprocess
+from collections import Counter
+from pathlib import Path
+
+from repo_wiki_churn import load_churn, path_churn
+from repo_wiki_store import cache_path, read_json, shared_cache_dir, update_json
+
+# Source file extensions considered for component context
+SOURCE_EXTENSIONS = {".ts", ".tsx", ".js", ".jsx", ".py", ".go", ".rs", ".java"}
+
+# Directory names never sent as context
+IGNORED_DIRS = {"node_modules", "__pycache__", ".git", "dist", "build", ".next", "venv", ".venv"}
+
+# Default token budget for a single component prompt's file context
+DEFAULT_CONTEXT_BUDGET = 24000
+
+# Rough characters-per-token ratio for source code
+CHARS_PER_TOKEN = 4
+
+# Files larger than this are only ever sent as outlines
+MAX_FULL_FILE_BYTES = 256 * 1024
+
+# Content fingerprints keyed by path, reused while size and mtime are unchanged
+FINGERPRINT_CACHE = ".repo_wiki/cache/fingerprints.json"
+
+VENDORED_DIRS = {"vendor", "vendored", "third_party", "third-party", "generated", "__generated__"}
+
+GENERATED_NAME_PATTERN = re.compile(
+    r"(_pb2(_grpc)?\.py|\.pb\.go|_grpc\.pb\.go|_pb\.(js|ts)|\.pb\.(js|ts)"
+    r"|\.min\.js|\.bundle\.js|\.generated\.\w+|\.g\.dart)$"
+)
+
+# Markers found near the top of generated files (protoc, OpenAPI, go generate, ...)
+GENERATED_HEADER_PATTERN = re.compile(
+    rb"code generated .* do not edit|@generated|auto-?generated|do not edit"
+    rb"|generated by the protocol buffer compiler|openapi-generator|swagger-codegen",
+    re.IGNORECASE,
+)
+
+# Minified content: very long lines with little whitespace and high byte entropy
+MINIFIED_AVG_LINE_LENGTH = 250
+MINIFIED_MAX_WHITESPACE_RATIO = 0.1
+MINIFIED_MIN_ENTROPY = 4.8
+
+ENTRYPOINT_NAMES = {
+    "main.py",
+    "__init__.py",
+    "__main__.py",
+    "app.py",
+    "server.py",
+    "cli.py",
+    "main.ts",
+    "main.js",
+    "index.ts",
+    "index.tsx",
+    "index.js",
+    "app.ts",
+    "app.js",
+    "server.ts",
+    "server.js",
+    "main.go",
+    "lib.rs",
+    "main.rs",
+    "mod.rs",
+}
+
+TEST_PATTERN = re.compile(
+    r"(^|/)(tests?|__tests__|spec|fixtures?|mocks?|__mocks__|testdata)(/|$)"
+    r"|(^|/)test_[^/]*$|_test\.\w+$|\.(test|spec)\.\w+$"
+)
+
+SYMBOL_PATTERNS = {
+    ".py": re.compile(r"^\s*(?:async\s+def|def|class)\s+\w+"),
+    ".go": re.compile(r"^(?:func|type)\s+"),
+    ".rs": re.compile(
+        r"^\s*(?:pub(?:\([^)]*\))?\s+)?(?:async\s+)?(?:fn|struct|enum|trait|impl|mod|type)\b"
+    ),
+    ".java": re.compile(
+        r"^\s*(?:public|protected|private)?\s*(?:static\s+)?(?:final\s+)?"
+        r"(?:class|interface|enum|record|[\w<>\[\],\s]+\s+\w+\s*\()"
+    ),
+}
+_JS_SYMBOL = re.compile(
+    r"^\s*(?:export\s+(?:default\s+)?)?(?:async\s+)?"
+    r"(?:function\*?\s+\w+|class\s+\w+|interface\s+\w+|type\s+\w+\s*=|enum\s+\w+"
+    r"|(?:const|let)\s+\w+\s*=\s*(?:async\s*)?(?:\([^)]*\)|\w+)\s*=>)"
+)
+for _ext in (".ts", ".tsx", ".js", ".jsx"):
+    SYMBOL_PATTERNS[_ext] = _JS_SYMBOL
+
+IMPORT_PATTERN = re.compile(
+    r"^\s*(?:from\s+([\w.]+)\s+import|import\s+([\w.]+))"  # Python
+    r"|(?:from|require\(|import\()\s*['\"]([^'\"]+)['\"]"  # JS / TS
+    r"|^\s*(?:pub\s+)?mod\s+(\w+)\s*;"  # Rust modules
+    r"|^\s*use\s+(?:crate|super)::(\w+)"  # Rust uses
+    r"|^\s*\"([\w./-]+)\"\s*$",  # Go import blocks
+    re.MULTILINE,
+)
+
+
+def estimate_tokens(text: str) -> int:
+    """Estimate the token count of text without calling a tokenizer."""
+    return (len(text) + CHARS_PER_TOKEN - 1) // CHARS_PER_TOKEN
+
+
+def number_lines(lines: list[str], line_numbers: list[int] | None = None) -> str:
+    """Prefix lines with their 1-based line numbers."""
+    if line_numbers is None:
+        line_numbers = list(range(1, len(lines) + 1))
+    return "\n".join(f"{n:4d}| {line.rstrip()}" for n, line in zip(line_numbers, lines))
+
+
+def module_key(rel_path: str) -> str:
+    """Name other files would use to import this file."""
+    path = Path(rel_path)
+    if path.stem in {"__init__", "index", "mod", "lib", "main"}:
+        return path.parent.name
+    return path.stem
+
+
+def extract_imports(text: str) -> set[str]:
+    """Return the last path segment of every module imported by text."""
+    names = set()
+    for match in IMPORT_PATTERN.finditer(text):
+        target = next((g for g in match.groups() if g), "")
+        segment = re.split(r"[./]", target.rstrip("/"))[-1]
+        if segment:
+            names.add(segment)
+    return names
+
+
+def outline_file(lines: list[str], suffix: str) -> tuple[list[str], list[int]]:
+    """Return the symbol definition lines of a file with their line numbers."""
+    pattern = SYMBOL_PATTERNS.get(suffix)
+    if pattern is None:
+        return [], []
+    outline, numbers = [], []
+    for i, line in enumerate(lines, 1):
+        if pattern.match(line):
+            outline.append(line)
+            numbers.append(i)
+    return outline, numbers
+
+
+def get_churn(repo: Path, component_path: str, max_commits: int = 200) -> dict[str, float]:
+    """Recent-change weight of each file under a path.
+
+    Uses the decayed scores `index` cached in .repo_wiki/cache/churn.json, and
+    otherwise counts the last `max_commits` commits with one git call.
+    """
+    cached = path_churn(load_churn(repo), component_path)
+    if cached:
+        return {path: entry[2] for path, entry in cached.items()}
+
+    try:
+        output = subprocess.check_output(
+            ["git", "log", f"-n{max_commits}", "--format=", "--name-only", "--", component_path],
+            cwd=repo,
+            text=True,
+            stderr=subprocess.DEVNULL,
+        )
+    except (subprocess.CalledProcessError, FileNotFoundError):
+        return {}
+
+    churn: dict[str, int] = {}
+    for line in output.splitlines():
+        if line:
+            churn[line] = churn.get(line, 0) + 1
+    return churn
+
+
+def byte_entropy(data: bytes) -> float:
+    """Shannon entropy of a byte string in bits per byte."""
+    if not data:
+        return 0.0
+    total = len(data)
+    return -sum(n / total * math.log2(n / total) for n in Counter(data).values())
+
+
+def classify_generated(rel_path: str, data: bytes) -> str | None:
+    """Return why a file looks vendored, generated or minified, or None for real source."""
+    if VENDORED_DIRS.intersection(Path(rel_path).parts[:-1]):
+        return "vendored"
+    if GENERATED_NAME_PATTERN.search(rel_path):
+        return "generated (file name)"
+    if GENERATED_HEADER_PATTERN.search(data[:2048]):
+        return "generated (header marker)"
+
+    sample = data[:16384]
+    line_count = sample.count(b"\n") + 1
+    if len(sample) / line_count > MINIFIED_AVG_LINE_LENGTH:
+        whitespace = sum(sample.count(c) for c in b" \t\n") / len(sample)
+        if whitespace < MINIFIED_MAX_WHITESPACE_RATIO and byte_entropy(sample) > MINIFIED_MIN_ENTROPY:
+            return "minified"
+    return None
+
+
+def load_fingerprints(repo: Path) -> dict:
+    """Load the fingerprint cache, or an empty one.
+
+    A shared cache holds one section per repository, keyed by its path.
+    """
+    cached = read_json(cache_path(repo, FINGERPRINT_CACHE), {})
+    if shared_cache_dir() is not None:
+        return cached.get(str(repo), {})
+    return cached
+
+
+def save_fingerprints(repo: Path, fingerprints: dict) -> None:
+    """Persist the fingerprint cache, keeping entries added by concurrent runs."""
+    shared = shared_cache_dir() is not None
+
+    def merge(cached: dict) -> None:
+        (cached.setdefault(str(repo), {}) if shared else cached).update(fingerprints)
+
+    update_json(cache_path(repo, FINGERPRINT_CACHE), merge, {}, None)
+
+
+def fingerprint_file(file: Path, rel_path: str, fingerprints: dict) -> dict | None:
+    """Return the cached hash and classification of a file, refreshing stale entries."""
+    try:
+        st = file.stat()
+    except OSError:
+        return None
+    entry = fingerprints.get(rel_path)
+    if entry and entry["size"] == st.st_size and entry["mtime_ns"] == st.st_mtime_ns:
+        return entry
+
+    try:
+        data = file.read_bytes()
+    except OSError:
+        return None
+    entry = {
+        "size": st.st_size,
+        "mtime_ns": st.st_mtime_ns,
+        "sha256": hashlib.sha256(data).hexdigest(),
+        "generated": classify_generated(rel_path, data),
+    }
+    fingerprints[rel_path] = entry
+    return entry
+
+
+def filter_component_files(repo: Path, component_paths: list[str]) -> dict[str, str]:
+    """Find files that should never reach a prompt, with the reason for each.
+
+    Vendored, generated and minified files are dropped, and byte-identical
+    files across all given components collapse to the first path in sorted
+    order. Pass every component so representatives are stable between runs.
+    """
+    fingerprints = load_fingerprints(repo)
+    skip: dict[str, str] = {}
+    representatives: dict[str, str] = {}
+
+    files = []
+    for component_path in component_paths:
+        component_dir = repo / component_path
+        if component_dir.exists():
+            files.extend(iter_candidate_files(component_dir))
+
+    for file in sorted(set(files)):
+        rel_path = str(file.relative_to(repo))
+        entry = fingerprint_file(file, rel_path, fingerprints)
+        if entry is None:
+            continue
+        if entry["generated"]:
+            skip[rel_path] = entry["generated"]
+            continue
+        first = representatives.setdefault(entry["sha256"], rel_path)
+        if first != rel_path:
+            skip[rel_path] = f"duplicate of {first}"
+
+    save_fingerprints(repo, fingerprints)
+    return skip
+
+
+def iter_candidate_files(component_dir: Path, nested: list[Path] | None = None):
+    """Yield source files under a component, skipping ignored directories.
+
+    Files under `nested` (the directories of child components) belong to the
+    children's own pages and are skipped too.
+    """
+    for file in sorted(component_dir.rglob("*")):
+        if file.suffix not in SOURCE_EXTENSIONS or not file.is_file():
+            continue
+        if IGNORED_DIRS.intersection(file.relative_to(component_dir).parts):
+            continue
+        if nested and any(file.is_relative_to(child) for child in nested):
+            continue
+        yield file
+
+
+def collect_candidates(
+    repo: Path, component_path: str, skip: dict[str, str], nested: list[str] | None = None
+) -> list[dict]:
+    """Read every candidate file of a component and record its raw signals."""
+    component_dir = repo / component_path
+    if not component_dir.exists():
+        return []
+
+    candidates = []
+    for file in iter_candidate_files(component_dir, [repo / child for child in nested or []]):
+        if str(file.relative_to(repo)) in skip:
+            continue
+        try:
+            size = file.stat().st_size
+            with open(file, errors="ignore") as f:
+                text = f.read(MAX_FULL_FILE_BYTES + 1)
+        except OSError:
+            continue
+
+        lines = text.splitlines()
+        outline, outline_numbers = outline_file(lines, file.suffix)
+        candidates.append(
+            {
+                "path": str(file.relative_to(repo)),
+                "size": size,
+                "lines": lines,
+                "truncated": size > MAX_FULL_FILE_BYTES,
+                "outline": outline,
+                "outline_numbers": outline_numbers,
+                "imports": extract_imports(text),
+            }
+        )
+    return candidates
+
+
+def rank_candidates(candidates: list[dict], churn: dict[str, float]) -> list[dict]:
+    """Score candidates by signal and return them best first."""
+    references: dict[str, int] = {}
+    for cand in candidates:
+        for name in cand["imports"]:
+            references[name] = references.get(name, 0) + 1
+
+    max_refs = max(references.values(), default=0) or 1
+    max_churn = max(churn.values(), default=0) or 1
+
+    for cand in candidates:
+        path = cand["path"]
+        line_count = len(cand["lines"]) or 1
+        is_entry = Path(path).name in ENTRYPOINT_NAMES
+        is_test = bool(TEST_PATTERN.search(path))
+        density = min(1.0, len(cand["outline"]) * 20 / line_count)
+        centrality = references.get(module_key(path), 0) / max_refs
+        recency = churn.get(path, 0) / max_churn
+        # Favour substantial files but stop rewarding size past a few thousand lines
+        size_score = min(1.0, math.log10(line_count + 1) / 3)
+        depth_penalty = 0.1 * len(Path(path).parts)
+
+        cand["score"] = round(
+            3.0 * is_entry
+            + 2.0 * density
+            + 2.0 * centrality
+            + 1.0 * recency
+            + 1.0 * size_score
+            - 4.0 * is_test
+            - depth_penalty,
+            4,
+        )
+
+    return sorted(candidates, key=lambda c: (-c["score"], c["path"]))
+
+
+def pack_context(
+    repo: Path,
+    component_path: str,
+    budget_tokens: int = DEFAULT_CONTEXT_BUDGET,
+    skip: dict[str, str] | None = None,
+    nested: list[str] | None = None,
+) -> list[dict]:
+    """Fill a token budget with the highest-signal files of a component.
+
+    Files are added in full while they fit; otherwise their symbol outline is
+    used instead. Every entry keeps real line numbers so citations stay valid.
+    Paths in `skip` (see filter_component_files) and files of the `nested`
+    child components are never considered.
+    """
+    if skip is None:
+        skip = filter_component_files(repo, [component_path])
+    candidates = rank_candidates(
+        collect_candidates(repo, component_path, skip, nested), get_churn(repo, component_path)
+    )
+
+    packed = []
+    remaining = budget_tokens
+    for cand in candidates:
+        if remaining <= 0:
+            break
+
+        if not cand["truncated"]:
+            content = number_lines(cand["lines"])
+            tokens = estimate_tokens(content)
+            if tokens <= remaining:
+                packed.append(
+                    {
+                        "path": cand["path"],
+                        "content": content,
+                        "line_count": len(cand["lines"]),
+                        "mode": "full",
+                        "tokens": tokens,
+                        "score": cand["score"],
+                    }
+                )
+                remaining -= tokens
+                continue
+
+        if cand["outline"]:
+            content = number_lines(cand["outline"], cand["outline_numbers"])
+            tokens = estimate_tokens(content)
+            if tokens <= remaining:
+                packed.append(
+                    {
+                        "path": cand["path"],
+                        "content": content,
+                        "line_count": len(cand["lines"]),
+                        "mode": "outline",
+                        "tokens": tokens,
+                        "score": cand["score"],
+                    }
+                )
+                remaining -= tokens
+
+    return packed
+
+
+def split_into_units(
+    repo: Path,
+    component_path: str,
+    max_unit_tokens: int,
+    skip: dict[str, str] | None = None,
+    nested: list[str] | None = None,
+) -> list[dict]:
+    """Split every source file of a component into numbered chunks under a token limit.
+
+    Unlike pack_context nothing is dropped for size: large files become several
+    units, each carrying the fingerprint of the whole file for caching.
+    """
+    component_dir = repo / component_path
+    if not component_dir.exists():
+        return []
+    if skip is None:
+        skip = filter_component_files(repo, [component_path])
+
+    units = []
+    for file in iter_candidate_files(component_dir, [repo / child for child in nested or []]):
+        if str(file.relative_to(repo)) in skip:
+            continue
+        try:
+            data = file.read_bytes()
+        except OSError:
+            continue
+        fingerprint = hashlib.sha256(data).hexdigest()
+        rel_path = str(file.relative_to(repo))
+        lines = data.decode("utf-8", errors="ignore").splitlines()
+
+        start = 0
+        while start < len(lines):
+            end = start
+            tokens = 0
+            while end < len(lines):
+                line_tokens = estimate_tokens(f"{end + 1:4d}| {lines[end]}\n")
+                if end > start and tokens + line_tokens > max_unit_tokens:
+                    break
+                tokens += line_tokens
+                end += 1
+            numbers = list(range(start + 1, end + 1))
+            units.append(
+                {
+                    "path": rel_path,
+                    "start_line": start + 1,
+                    "end_line": end,
+                    "fingerprint": fingerprint,
+                    "content": number_lines(lines[start:end], numbers),
+                    "tokens": tokens,
+                }
+            )
+            start = end
+
+    return units
+
+
+def group_units(units: list[dict], budget_tokens: int) -> list[list[dict]]:
+    """Greedily group consecutive units so each group fits the token budget."""
+    groups: list[list[dict]] = []
+    current: list[dict] = []
+    used = 0
+    for unit in units:
+        if current and used + unit["tokens"] > budget_tokens:
+            groups.append(current)
+            current, used = [], 0
+        current.append(unit)
+        used += unit["tokens"]
+    if current:
+        groups.append(current)
+    return groups
@@ -0,0 +1,365 @@
+"""
+Repo Wiki Discovery - Tech stack, components and file statistics from one walk.
+
+`index` calls walk_repository, which walks the tree once and collects file
+counts by extension, entrypoints, the markers of every directory
+(package.json, go.mod, pyproject.toml, Dockerfile, ...), workspace manifests
+(npm and pnpm workspaces, Cargo workspaces, go.work) and the files the
+retrieval index covers.
+
+find_components turns that into a component tree: every nested project root
+is a component with its own stack, its parent is the nearest enclosing
+component, and workspace members record the workspace that lists them. The
+directories under src/, lib/, packages/ and similar folders remain
+components too, so single-project repositories keep their layout.
+"""
+
+import fnmatch
+import json
+import os
+import re
+from collections import Counter
+from pathlib import Path
+
+from repo_wiki_context import IGNORED_DIRS, VENDORED_DIRS
+from repo_wiki_retrieval import indexed_stat, skips_dir
+
+# Never walked: dependencies, build output and the wiki's own state
+WALK_IGNORED_DIRS = IGNORED_DIRS | {".repo_wiki", "target"}
+
+# Files that make a directory a project root, and the stack they imply
+STACK_MARKERS = {
+    "package.json": "nodejs",
+    "requirements.txt": "python",
+    "pyproject.toml": "python",
+    "setup.py": "python",
+    "go.mod": "go",
+    "Cargo.toml": "rust",
+    "pom.xml": "java-maven",
+    "build.gradle": "java-gradle",
+    "build.gradle.kts": "java-gradle",
+    "Gemfile": "ruby",
+    "composer.json": "php",
+}
+
+# Frameworks and tooling; they add to a directory's stack but do not make it a project
+FRAMEWORK_MARKERS = {
+    "next.config.js": "nextjs",
+    "next.config.ts": "nextjs",
+    "next.config.mjs": "nextjs",
+    "angular.json": "angular",
+    "vue.config.js": "vue",
+    "nuxt.config.js": "nuxt",
+    "svelte.config.js": "svelte",
+    "Dockerfile": "docker",
+    "docker-compose.yml": "docker-compose",
+    "docker-compose.yaml": "docker-compose",
+    ".github/workflows": "github-actions",
+    "terraform": "terraform",
+    "helm": "helm",
+}
+
+# Stack of a component without markers, from its most common source extension
+EXTENSION_STACKS = {
+    ".py": "python",
+    ".go": "go",
+    ".rs": "rust",
+    ".java": "java",
+    ".rb": "ruby",
+    ".php": "php",
+    ".ts": "nodejs",
+    ".tsx": "nodejs",
+    ".js": "nodejs",
+    ".jsx": "nodejs",
+}
+
+ENTRYPOINT_NAMES = [
+    "main.py",
+    "main.ts",
+    "main.js",
+    "main.go",
+    "index.ts",
+    "index.js",
+    "app.py",
+    "app.ts",
+    "app.js",
+    "server.py",
+    "server.ts",
+    "server.js",
+]
+MAX_ENTRYPOINTS = 10
+
+CONFIG_FILES = [
+    "package.json",
+    "requirements.txt",
+    "pyproject.toml",
+    "Dockerfile",
+    "docker-compose.yml",
+    ".gitignore",
+]
+
+# Top-level folders whose subdirectories are components
+COMPONENT_DIRS = ["src", "lib", "packages", "apps", "app", "components", "modules"]
+
+# Manifests under these directories are test fixtures, not projects
+FIXTURE_DIRS = {"test", "tests", "__tests__", "fixtures", "__fixtures__", "testdata"}
+
+CARGO_WORKSPACE_PATTERN = re.compile(r"^\[workspace\]\s*$(.*?)(?=^\[|\Z)", re.M | re.S)
+QUOTED_PATTERN = re.compile(r"[\"']([^\"']+)[\"']")
+
+
+def read_text(path: str) -> str:
+    """Contents of a manifest, or '' if it cannot be read."""
+    try:
+        with open(path, encoding="utf-8", errors="ignore") as f:
+            return f.read()
+    except OSError:
+        return ""
+
+
+def toml_list(section: str, key: str) -> list[str]:
+    """Strings of a `key = [...]` array in a TOML section."""
+    match = re.search(rf"^\s*{key}\s*=\s*\[(.*?)\]", section, re.M | re.S)
+    return QUOTED_PATTERN.findall(match.group(1)) if match else []
+
+
+def parse_workspaces(root: str, files: set[str]) -> list[dict]:
+    """Workspace manifests in a directory, as {type, members, exclude} records."""
+    workspaces = []
+    if "package.json" in files:
+        try:
+            manifest = json.loads(read_text(os.path.join(root, "package.json")))
+        except ValueError:
+            manifest = {}
+        members = manifest.get("workspaces") if isinstance(manifest, dict) else None
+        if isinstance(members, dict):
+            members = members.get("packages")
+        if isinstance(members, list):
+            patterns = [m for m in members if isinstance(m, str)]
+            workspaces.append({
+                "type": "npm",
+                "members": [m for m in patterns if not m.startswith("!")],
+                "exclude": [m[1:] for m in patterns if m.startswith("!")],
+            })
+    if "pnpm-workspace.yaml" in files:
+        patterns, in_packages = [], False
+        for line in read_text(os.path.join(root, "pnpm-workspace.yaml")).splitlines():
+            stripped = line.strip()
+            if not line[:1].isspace() and stripped:
+                in_packages = stripped.startswith("packages:")
+            elif in_packages and stripped.startswith("-"):
+                patterns.append(stripped[1:].split("#")[0].strip().strip("\"'"))
+        workspaces.append({
+            "type": "pnpm",
+            "members": [m for m in patterns if m and not m.startswith("!")],
+            "exclude": [m[1:] for m in patterns if m.startswith("!")],
+        })
+    if "Cargo.toml" in files:
+        match = CARGO_WORKSPACE_PATTERN.search(read_text(os.path.join(root, "Cargo.toml")))
+        if match:
+            workspaces.append({
+                "type": "cargo",
+                "members": toml_list(match.group(1), "members"),
+                "exclude": toml_list(match.group(1), "exclude"),
+            })
+    if "go.work" in files:
+        members, in_block = [], False
+        for line in read_text(os.path.join(root, "go.work")).splitlines():
+            words = line.split("//")[0].split()
+            if words[:1] == ["use"]:
+                in_block = words[1:2] == ["("] and ")" not in words
+                members += [w for w in words[1:] if w not in ("(", ")")]
+            elif in_block and words:
+                in_block = words[0] != ")"
+                members += words[:1] if in_block else []
+        workspaces.append({"type": "go", "members": members, "exclude": []})
+    return workspaces
+
+
+def matches_member(rel: str, pattern: str) -> bool:
+    """Whether a path relative to the workspace root matches a member glob."""
+    pattern = pattern.strip().removeprefix("./").strip("/")
+    if pattern in ("", "."):
+        return rel == "."
+    if "**" in pattern:
+        return fnmatch.fnmatch(rel, pattern.replace("/**", "*").replace("**", "*"))
+    parts, globs = rel.split("/"), pattern.split("/")
+    return len(parts) == len(globs) and all(map(fnmatch.fnmatch, parts, globs))
+
+
+def member_rel(path: str, workspace_path: str) -> str:
+    """A path relative to a workspace root."""
+    return path if workspace_path == "." else path[len(workspace_path) + 1 :]
+
+
+def walk_repository(repo: Path) -> dict:
+    """Everything `index` needs from the working tree, in a single walk."""
+    extensions: Counter = Counter()
+    entrypoints: dict[str, list[str]] = {}
+    markers: dict[str, dict] = {}
+    workspaces: list[dict] = []
+    dir_files: dict[str, int] = {}
+    dir_sources: dict[str, Counter] = {}
+    indexed: dict[str, os.stat_result] = {}
+    unindexed: set[str] = set()
+    root_files: set[str] = set()
+
+    for root, dirs, files in os.walk(repo):
+        dirs[:] = sorted(d for d in dirs if d not in WALK_IGNORED_DIRS)
+        rel = Path(root).relative_to(repo).as_posix()
+        names = set(files)
+        if rel == ".":
+            root_files = names
+
+        # Retrieval leaves out vendored and hidden directories the walk keeps
+        indexable = root not in unindexed
+        for d in dirs:
+            if not indexable or skips_dir(d):
+                unindexed.add(os.path.join(root, d))
+
+        found = {}
+        for marker, tech_name in (STACK_MARKERS | FRAMEWORK_MARKERS).items():
+            first, _, rest = marker.partition("/")
+            if first in names or first in dirs:
+                if not rest or os.path.exists(os.path.join(root, marker)):
+                    found[tech_name] = marker in STACK_MARKERS
+        if found:
+            markers[rel] = found
+        for workspace in parse_workspaces(root, names):
+            workspaces.append({"path": rel, **workspace})
+
+        sources: Counter = Counter()
+        for name in files:
+            ext = os.path.splitext(name)[1]
+            extensions[ext or "(no extension)"] += 1
+            if ext in EXTENSION_STACKS:
+                sources[EXTENSION_STACKS[ext]] += 1
+            if name in ENTRYPOINT_NAMES:
+                entrypoints.setdefault(name, []).append(f"{rel}/{name}" if rel != "." else name)
+            if indexable:
+                stat = indexed_stat(os.path.join(root, name), name)
+                if stat:
+                    indexed[f"{rel}/{name}" if rel != "." else name] = stat
+        dir_files[rel] = len(files)
+        if sources:
+            dir_sources[rel] = sources
+
+    return {
+        "by_extension": dict(sorted(extensions.items(), key=lambda x: -x[1])[:10]),
+        "total_files": sum(extensions.values()),
+        "entrypoints": [p for name in ENTRYPOINT_NAMES for p in entrypoints.get(name, [])][
+            :MAX_ENTRYPOINTS
+        ],
+        "configuration_files": [c for c in CONFIG_FILES if c in root_files],
+        "markers": markers,
+        "workspaces": workspaces,
+        "dir_files": dir_files,
+        "dir_sources": dir_sources,
+        "indexed_files": indexed,
+    }
+
+
+def ancestors(rel: str):
+    """Proper ancestor directories of a relative path, nearest first, ending with '.'."""
+    while rel != ".":
+        rel = rel.rpartition("/")[0] or "."
+        yield rel
+
+
+def is_project_root(rel: str, found: dict) -> bool:
+    """Whether a directory with these markers is a project, outside hidden, vendored and fixture dirs."""
+    parts = rel.split("/")
+    return (
+        rel != "."
+        and any(found.values())
+        and not any(p.startswith(".") or p in FIXTURE_DIRS or p in VENDORED_DIRS for p in parts)
+    )
+
+
+def find_components(walk: dict) -> list[dict]:
+    """Component tree from a walk: nested project roots plus the conventional folders.
+
+    Each component has a unique name (its directory name, or its path when
+    names collide), its path, kind ("project" or "directory"), stack, file
+    count, the path of its parent component, the paths of its child
+    components and, for workspace members, the path of the workspace root.
+    """
+    markers = walk["markers"]
+    dir_files = walk["dir_files"]
+    projects = {rel for rel, found in markers.items() if is_project_root(rel, found)}
+    folders = {
+        rel
+        for rel in dir_files
+        if rel.count("/") == 1
+        and rel.split("/")[0] in COMPONENT_DIRS
+        and not rel.split("/")[1].startswith(".")
+    }
+    paths = sorted(projects | folders)
+
+    # Subtree totals, summed up the tree once per directory
+    file_counts: Counter = Counter()
+    source_counts: dict[str, Counter] = {path: Counter() for path in paths}
+    for rel, count in dir_files.items():
+        for path in (rel, *ancestors(rel)):
+            if path in source_counts:
+                file_counts[path] += count
+                source_counts[path].update(walk["dir_sources"].get(rel, {}))
+
+    # Nearest workspace first
+    workspaces = sorted(walk["workspaces"], key=lambda w: -len(w["path"]))
+    components = []
+    for path in paths:
+        stack = {tech_name: True for tech_name in sorted(markers.get(path, {}))}
+        if not any(markers.get(path, {}).values()) and source_counts[path]:
+            stack[source_counts[path].most_common(1)[0][0]] = True
+        parent = next((a for a in ancestors(path) if a in source_counts), None)
+        workspace = next(
+            (
+                w["path"]
+                for w in workspaces
+                if (w["path"] == "." or path.startswith(w["path"] + "/"))
+                and any(matches_member(member_rel(path, w["path"]), m) for m in w["members"])
+                and not any(matches_member(member_rel(path, w["path"]), m) for m in w["exclude"])
+            ),
+            None,
+        )
+        components.append({
+            "name": path.rsplit("/", 1)[-1],
+            "path": path,
+            "kind": "project" if path in projects else "directory",
+            "stack": stack,
+            "file_count": file_counts[path],
+            "parent": parent,
+            "children": [],
+            "workspace": workspace,
+        })
+    by_path = {c["path"]: c for c in components}
+    for component in components:
+        if component["parent"]:
+            by_path[component["parent"]]["children"].append(component["path"])
+
+    # Page names must be unique; colliding directory names use the whole path
+    names = Counter(c["name"] for c in components)
+    for component in components:
+        if names[component["name"]] > 1:
+            component["name"] = component["path"].replace("/", "-")
+    return components
+
+
+def detect_tech_stack(walk: dict, components: list[dict]) -> dict:
+    """Repository stack: the root's markers plus every component's stack."""
+    tech = {tech_name: True for tech_name in walk["markers"].get(".", {})}
+    for component in components:
+        tech.update(component["stack"])
+    return tech
+
+
+def owning_component(components: list[dict], rel_path: str) -> dict | None:
+    """The deepest component whose path contains a repository-relative file path."""
+    best = None
+    for component in components:
+        path = component["path"].strip("/")
+        if rel_path == path or rel_path.startswith(path + "/"):
+            if best is None or len(path) > len(best["path"].strip("/")):
+                best = component
+    return best
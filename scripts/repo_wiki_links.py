@@ -0,0 +1,297 @@
+"""
+Repo Wiki Links - Concurrent, cached checking of external links.
+
+`validate --external-links` collects the http(s) links of every page and
+checks each distinct URL (fragments dropped, so permalinks to different
+lines of one file are one check) with a HEAD request, falling back to GET
+when a server refuses HEAD. Requests run on one asyncio loop, bounded by a
+global concurrency limit; each host keeps a small pool of keep-alive
+connections and spaces its requests to a per-host rate. Results are cached
+in .repo_wiki/cache/links.json with a TTL, and a rewrite map can point
+checks at a local mirror or stand-in server.
+
+Only the standard library is used, so the CLI keeps its single dependency.
+"""
+
+import asyncio
+import re
+import ssl
+import time
+from pathlib import Path
+from urllib.parse import urljoin, urlsplit
+
+from repo_wiki_store import cache_path, read_json, update_json
+
+LINKS_CACHE = ".repo_wiki/cache/links.json"
+
+# Reachable links are re-checked after the TTL, failures after FAILED_TTL at most
+FAILED_TTL_SECONDS = 3600
+
+CONNECTIONS_PER_HOST = 4
+REQUEST_TIMEOUT = 10.0
+MAX_REDIRECTS = 5
+
+# Servers that reject HEAD are asked again with GET
+HEAD_REFUSED = {403, 405, 501}
+
+# A rate-limited answer says nothing about the link itself
+RATE_LIMITED = 429
+
+USER_AGENT = "repo-wiki-link-checker/1.0"
+
+EXTERNAL_LINK_PATTERN = re.compile(r"\]\((https?://[^)\s]+)\)|<(https?://[^>\s]+)>")
+
+
+def extract_external_links(content: str) -> set[str]:
+    """Distinct http(s) links of a page, without fragments."""
+    return {
+        (inline or auto).split("#", 1)[0]
+        for inline, auto in EXTERNAL_LINK_PATTERN.findall(content)
+    }
+
+
+def parse_rewrites(pairs: tuple[str, ...], map_file: str | None) -> dict[str, str]:
+    """Prefix rewrites from FROM=TO pairs and a JSON {"from": "to"} file."""
+    rewrites = dict(read_json(Path(map_file), {})) if map_file else {}
+    for pair in pairs:
+        source, sep, target = pair.partition("=")
+        if not sep or not source:
+            raise ValueError(f"rewrite must be FROM=TO: {pair}")
+        rewrites[source] = target
+    return rewrites
+
+
+def rewrite_url(url: str, rewrites: dict[str, str]) -> str:
+    """Apply the longest matching prefix rewrite."""
+    for source in sorted(rewrites, key=len, reverse=True):
+        if url.startswith(source):
+            return rewrites[source] + url[len(source) :]
+    return url
+
+
+class HostPool:
+    """Keep-alive connections and request pacing for one scheme://host:port."""
+
+    def __init__(self, scheme: str, host: str, port: int, rate: float):
+        self.scheme = scheme
+        self.host = host
+        self.port = port
+        self.interval = 1.0 / rate if rate > 0 else 0.0
+        self.next_slot = 0.0
+        self.slots = asyncio.Semaphore(CONNECTIONS_PER_HOST)
+        self.idle: list[tuple[asyncio.StreamReader, asyncio.StreamWriter]] = []
+        self.opened = 0
+        self.requests = 0
+
+    async def connect(self):
+        context = ssl.create_default_context() if self.scheme == "https" else None
+        self.opened += 1
+        return await asyncio.open_connection(
+            self.host, self.port, ssl=context, server_hostname=self.host if context else None
+        )
+
+    async def pace(self) -> None:
+        if not self.interval:
+            return
+        now = time.monotonic()
+        slot = max(now, self.next_slot)
+        self.next_slot = slot + self.interval
+        if slot > now:
+            await asyncio.sleep(slot - now)
+
+    async def request(self, method: str, target: str) -> tuple[int, dict[str, str]]:
+        """Send one request and return (status, headers); the body is never kept."""
+        async with self.slots:
+            await self.pace()
+            self.requests += 1
+            # A pooled connection may have been closed by the server; retry once on a new one
+            while True:
+                reused = bool(self.idle)
+                # The timeout covers connecting (DNS, TCP, TLS) as well as the exchange
+                conn = (
+                    self.idle.pop()
+                    if reused
+                    else await asyncio.wait_for(self.connect(), REQUEST_TIMEOUT)
+                )
+                try:
+                    status, headers, keep = await asyncio.wait_for(
+                        self.exchange(conn, method, target), REQUEST_TIMEOUT
+                    )
+                except (ConnectionError, asyncio.IncompleteReadError):
+                    conn[1].close()
+                    if reused:
+                        continue
+                    raise
+                except BaseException:
+                    conn[1].close()
+                    raise
+                if keep:
+                    self.idle.append(conn)
+                else:
+                    conn[1].close()
+                return status, headers
+
+    async def exchange(self, conn, method: str, target: str) -> tuple[int, dict[str, str], bool]:
+        reader, writer = conn
+        default_port = 443 if self.scheme == "https" else 80
+        host = self.host if self.port == default_port else f"{self.host}:{self.port}"
+        writer.write(
+            f"{method} {target} HTTP/1.1\r\nHost: {host}\r\nUser-Agent: {USER_AGENT}\r\n"
+            f"Accept: */*\r\nConnection: keep-alive\r\n\r\n".encode("latin-1")
+        )
+        await writer.drain()
+
+        status_line = await reader.readline()
+        if not status_line:
+            raise ConnectionError("connection closed")
+        version, _, rest = status_line.decode("latin-1").partition(" ")
+        status = int(rest.split(" ", 1)[0])
+        headers = {}
+        while True:
+            line = await reader.readline()
+            if line in (b"\r\n", b"\n", b""):
+                break
+            name, _, value = line.decode("latin-1").partition(":")
+            headers[name.strip().lower()] = value.strip()
+
+        keep = version == "HTTP/1.1" and headers.get("connection", "").lower() != "close"
+        if method == "HEAD" or status in (204, 304) or status < 200:
+            return status, headers, keep
+        # Only a declared, small body is drained to reuse the connection
+        length = headers.get("content-length")
+        if length is not None and "chunked" not in headers.get("transfer-encoding", ""):
+            if int(length) <= 1 << 16:
+                await reader.readexactly(int(length))
+                return status, headers, keep
+        return status, headers, False
+
+    def close(self) -> None:
+        for _, writer in self.idle:
+            writer.close()
+        self.idle.clear()
+
+
+class LinkChecker:
+    """Checks URLs on one event loop with shared host pools."""
+
+    def __init__(self, concurrency: int, host_rate: float):
+        self.limit = asyncio.Semaphore(concurrency)
+        self.host_rate = host_rate
+        self.pools: dict[tuple[str, str, int], HostPool] = {}
+
+    def pool(self, url: str) -> tuple[HostPool, str]:
+        parts = urlsplit(url)
+        port = parts.port or (443 if parts.scheme == "https" else 80)
+        key = (parts.scheme, parts.hostname or "", port)
+        if key not in self.pools:
+            self.pools[key] = HostPool(*key, self.host_rate)
+        target = parts.path or "/"
+        if parts.query:
+            target += "?" + parts.query
+        return self.pools[key], target
+
+    async def check(self, url: str) -> dict:
+        """Final status of a URL after redirects, or the error that stopped the check."""
+        async with self.limit:
+            try:
+                for _ in range(MAX_REDIRECTS + 1):
+                    pool, target = self.pool(url)
+                    status, headers = await pool.request("HEAD", target)
+                    if status in HEAD_REFUSED:
+                        status, headers = await pool.request("GET", target)
+                    if 300 <= status < 400 and headers.get("location"):
+                        url = urljoin(url, headers["location"])
+                        continue
+                    return {"status": status, "error": None}
+                return {"status": None, "error": "too many redirects"}
+            except asyncio.TimeoutError:
+                return {"status": None, "error": "timed out"}
+            except (OSError, ValueError, asyncio.IncompleteReadError) as e:
+                return {"status": None, "error": str(e) or type(e).__name__}
+
+    def close(self) -> None:
+        for pool in self.pools.values():
+            pool.close()
+
+
+def is_unknown(result: dict) -> bool:
+    """Whether the server declined to answer, so the link could not be checked."""
+    return result["status"] == RATE_LIMITED
+
+
+def is_broken(result: dict) -> bool:
+    if is_unknown(result):
+        return False
+    return result["error"] is not None or result["status"] >= 400
+
+
+def is_fresh(result: dict, ttl_seconds: float, now: float) -> bool:
+    ttl = min(ttl_seconds, FAILED_TTL_SECONDS) if is_broken(result) else ttl_seconds
+    return now - result.get("checked_at", 0) < ttl
+
+
+def check_links(
+    repo: Path,
+    urls: set[str],
+    rewrites: dict[str, str] | None = None,
+    ttl_hours: float = 24.0,
+    concurrency: int = 32,
+    host_rate: float = 10.0,
+) -> tuple[dict[str, dict], dict]:
+    """Check URLs, reusing cached results younger than the TTL.
+
+    Returns each URL's result ({status, error, checked, checked_at}, keyed by
+    the URL as written in the pages) and run counts: checked, cached,
+    requests and connections opened. host_rate is requests per second per
+    host; 0 disables the limit.
+    """
+    rewrites = rewrites or {}
+    cache_file = cache_path(repo, LINKS_CACHE)
+    cached = read_json(cache_file, {}) or {}
+    now = time.time()
+    ttl_seconds = ttl_hours * 3600
+
+    targets = {url: rewrite_url(url, rewrites) for url in urls}
+    results = {
+        url: dict(cached[target], checked=target)
+        for url, target in targets.items()
+        if target in cached and is_fresh(cached[target], ttl_seconds, now)
+    }
+    pending = sorted({target for url, target in targets.items() if url not in results})
+
+    async def run() -> tuple[list[dict], LinkChecker]:
+        checker = LinkChecker(concurrency, host_rate)
+        try:
+            return await asyncio.gather(*(checker.check(t) for t in pending)), checker
+        finally:
+            checker.close()
+
+    checked: dict[str, dict] = {}
+    stats = {"checked": len(pending), "cached": len(results), "requests": 0, "connections": 0}
+    if pending:
+        outcomes, checker = asyncio.run(run())
+        stats["requests"] = sum(p.requests for p in checker.pools.values())
+        stats["connections"] = sum(p.opened for p in checker.pools.values())
+        checked_at = time.time()
+        by_target = dict(zip(pending, outcomes))
+        for target, outcome in by_target.items():
+            # Rate-limited answers are not cached
+            if not is_unknown(outcome):
+                checked[target] = dict(outcome, checked_at=checked_at)
+        for url, target in targets.items():
+            if url not in results:
+                results[url] = dict(by_target[target], checked=target)
+
+        def merge(data: dict) -> None:
+            data.update(checked)
+            # Expired entries are dropped so the cache does not grow without bound
+            for key in [k for k, v in data.items() if not is_fresh(v, ttl_seconds, checked_at)]:
+                del data[key]
+
+        update_json(cache_file, merge, {}, indent=None)
+    return results, stats
+
+
+def describe(result: dict) -> str:
+    """Short reason a link is reported."""
+    return result["error"] or f"HTTP {result['status']}"
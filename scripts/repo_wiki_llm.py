@@ -1,7 +1,7 @@
 #!/usr/bin/env python3
 # /// script
 # requires-python = ">=3.10"
-# dependencies = ["click>=8.0", "anthropic>=0.18"]
+# dependencies = ["click>=8.0", "anthropic>=0.25"]
 # ///
 """
 Repo Wiki LLM - Generate documentation using Claude API.
@@ -9,26 +9,147 @@ Repo Wiki LLM - Generate documentation using Claude API.
 Usage:
     ANTHROPIC_API_KEY=xxx uv run scripts/repo_wiki_llm.py generate /path/to/repo
     ANTHROPIC_API_KEY=xxx uv run scripts/repo_wiki_llm.py generate /path/to/repo --component auth
+    ANTHROPIC_API_KEY=xxx uv run scripts/repo_wiki_llm.py --trace generate /path/to/repo
 """
 
+import hashlib
 import json
 import os
+import re
 import sys
-from datetime import datetime
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager, nullcontext
+from datetime import datetime, timezone
 from pathlib import Path
 from typing import Optional
 
 import click
 
-try:
-    import anthropic
-except ImportError:
-    anthropic = None
+from repo_wiki_blocks import (
+    human_edited,
+    index_page,
+    is_fresh,
+    load_block_index,
+    save_block_index,
+    scan_blocks,
+    splice_at_offsets,
+)
+from repo_wiki_context import (
+    CHARS_PER_TOKEN,
+    DEFAULT_CONTEXT_BUDGET,
+    estimate_tokens,
+    filter_component_files,
+    group_units,
+    pack_context,
+    split_into_units,
+)
+from repo_wiki_retrieval import load_retrieval_meta, search_snippets
+from repo_wiki_store import (
+    MANIFEST,
+    cache_path,
+    iter_json_items,
+    json_path,
+    locked,
+    merge_manifest,
+    open_json,
+    write_text_if_changed,
+)
+from repo_wiki_trace import TRACER, span, start_tracing
+
+MANAGED_BEGIN = "<!-- BEGIN:REPO_WIKI_MANAGED -->"
+MANAGED_END = "<!-- END:REPO_WIKI_MANAGED -->"
+OVERVIEW_PAGE = "docs/architecture/overview.md"
+
+# Footnote definitions, and the plain or permalinked citations inside them
+FOOTNOTE_PATTERN = re.compile(r"^\[\^([^\]]+)\]:\s*(.+)$", re.MULTILINE)
+CITATION_PATTERN = re.compile(
+    r"`([^`]+)`\s+L(\d+)(?:[-–]L?(\d+))?|\[([^\]#]+)#L(\d+)(?:-L(\d+))?\]\([^)]*\)"
+)
+
+MODEL = "claude-sonnet-4-20250514"
+MAX_TOKENS = 4096
+DEFAULT_CONCURRENCY = 4
+
+# Completed responses are stored as <key>.md, in-flight streams as <key>.md.part
+RESPONSE_CACHE_DIR = ".repo_wiki/cache/responses"
+
+# Per-unit summaries for hierarchical generation, keyed by file fingerprint
+SUMMARY_CACHE_DIR = ".repo_wiki/cache/summaries"
+
+# Hierarchical mode: source tokens per map prompt, and at most this many
+# condense passes when the summaries alone exceed the context budget
+MAP_GROUP_BUDGET = 12000
+MAX_REDUCE_LEVELS = 3
+
+# Retrieval queries for the overview's cross-cutting topics, answered from the
+# BM25 index `index` builds, and the token budgets for retrieved snippets
+OVERVIEW_TOPICS = {
+    "Entry points and startup": "main entrypoint start startup server listen bootstrap run app",
+    "Configuration": "config configuration settings env environment variable option default",
+    "Authentication and security": "auth authenticate authorization token login session permission secret",
+    "Data and persistence": "database db model schema query migration repository storage cache",
+    "Build and deployment": "docker dockerfile deploy build ci workflow kubernetes health",
+}
+OVERVIEW_RETRIEVAL_BUDGET = 8000
+SNIPPETS_PER_TOPIC = 4
+USAGE_RETRIEVAL_BUDGET = 2000
+USAGE_SNIPPETS = 4
+
+# Seconds between progress lines for a streaming page
+PROGRESS_INTERVAL = 10.0
+
+# Estimation assumptions: Claude Sonnet pricing in USD per million tokens, and
+# typical streaming latency when no cached responses exist to learn from
+INPUT_PRICE_PER_MTOK = 3.0
+OUTPUT_PRICE_PER_MTOK = 15.0
+DEFAULT_OUTPUT_TOKENS = 2000
+FIRST_TOKEN_LATENCY = 2.0
+OUTPUT_TOKENS_PER_SECOND = 60.0
+SUMMARY_TOKENS_PER_UNIT = 300
+
+
+# Process-shared semaphore set by batch workers, so all repositories obey one API budget
+_shared_api_slots = None
+
+
+def share_api_slots(slots) -> None:
+    """Make every ThrottledClient in this process also hold a slot of `slots` per stream."""
+    global _shared_api_slots
+    _shared_api_slots = slots
+
+
+class ThrottledClient:
+    """Wrap an API client so at most `max_in_flight` streams run at once across threads."""
+
+    def __init__(self, client, max_in_flight: int):
+        self._client = client
+        self._slots = threading.BoundedSemaphore(max_in_flight)
+        self._waits = threading.local()
+        # Mirror the SDK's client.messages.stream(...) call shape
+        self.messages = self
+
+    @contextmanager
+    def stream(self, **kwargs):
+        queued = time.monotonic()
+        with self._slots, (_shared_api_slots or nullcontext()):
+            self._waits.seconds = time.monotonic() - queued
+            with self._client.messages.stream(**kwargs) as stream:
+                yield stream
+
+    def queue_wait(self) -> float:
+        """Seconds the calling thread's latest stream waited for a free slot."""
+        return getattr(self._waits, "seconds", 0.0)
 
 
 def get_api_client():
     """Get Anthropic API client."""
-    if anthropic is None:
+    # Imported here so estimate and --help do not pay for the SDK import
+    try:
+        import anthropic
+    except ImportError:
         click.echo("❌ anthropic package not installed. Run: uv pip install anthropic")
         sys.exit(1)
 
@@ -42,12 +163,12 @@ def get_api_client():
 
 def load_code_index(repo: Path) -> dict:
     """Load the code index."""
-    index_file = repo / ".repo_wiki/code_index.json"
+    index_file = json_path(repo / ".repo_wiki/code_index.json")
     if not index_file.exists():
         click.echo("❌ Code index not found. Run 'repo_wiki_cli.py index' first.")
         sys.exit(1)
 
-    with open(index_file) as f:
+    with open_json(index_file) as f:
         return json.load(f)
 
 
@@ -62,6 +183,181 @@ def load_state(repo: Path) -> dict:
         return json.load(f)
 
 
+def load_change_set(repo: Path) -> dict:
+    """Load the change set written by detect."""
+    change_file = repo / ".repo_wiki/change_set.json"
+    if not change_file.exists():
+        click.echo("❌ Change set not found. Run 'repo_wiki_cli.py detect' first.")
+        sys.exit(1)
+
+    with open(change_file) as f:
+        return json.load(f)
+
+
+def component_page(component: dict) -> str:
+    """Repository-relative path of a component's documentation page."""
+    return f"docs/components/{component['name']}.md"
+
+
+def find_managed_block(content: str) -> Optional[tuple[int, int]]:
+    """Return the (start, end) offsets of the first managed block's inner content."""
+    begin = content.find(MANAGED_BEGIN)
+    if begin == -1:
+        return None
+    start = begin + len(MANAGED_BEGIN)
+    end = content.find(MANAGED_END, start)
+    if end == -1:
+        return None
+    return start, end
+
+
+def extract_managed_content(generated: str) -> str:
+    """Extract the managed block content from a generated page.
+
+    Responses without markers are treated as all-managed, minus frontmatter.
+    A BEGIN marker without its END marker (a truncated response) raises
+    ValueError rather than splicing the raw response and its markers.
+    """
+    span = find_managed_block(generated)
+    if span:
+        return generated[span[0] : span[1]]
+    if MANAGED_BEGIN in generated:
+        raise ValueError("unterminated managed block")
+
+    body = generated
+    if body.startswith("---"):
+        close = body.find("\n---", 3)
+        if close != -1:
+            body = body[close + 4 :]
+    return "\n" + body.strip() + "\n"
+
+
+def splice_managed_block(existing: str, generated: str) -> str:
+    """Replace the managed block of an existing page with freshly generated content.
+
+    Everything outside the block is kept byte-for-byte. Pages without a
+    managed block are replaced by the generated page.
+    """
+    span = find_managed_block(existing)
+    if span is None:
+        return generated
+    return existing[: span[0]] + extract_managed_content(generated) + existing[span[1] :]
+
+
+def atomic_write_text(path: Path, content: str) -> None:
+    """Write a file via a temp file in the same directory and an atomic rename."""
+    fd, tmp_name = tempfile.mkstemp(dir=path.parent, prefix=f".{path.name}.", suffix=".tmp")
+    try:
+        with os.fdopen(fd, "w", encoding="utf-8", newline="") as f:
+            f.write(content)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_name, path)
+    except BaseException:
+        Path(tmp_name).unlink(missing_ok=True)
+        raise
+
+
+def write_page(
+    repo: Path, rel_path: str, generated: str, block_index: Optional[dict] = None
+) -> tuple[str, str]:
+    """Write a generated page, splicing into an existing managed block if present.
+
+    With a managed-block index, a fresh entry lets the splice happen at the
+    recorded offsets, and the entry is refreshed after the write. A page that
+    would only change its date stamps is left as it is ("Unchanged").
+    Returns the action taken and the final page content. Raises ValueError,
+    leaving the page untouched, if the generated block is unterminated, and
+    UnicodeDecodeError if the existing page is not UTF-8.
+    """
+    if MANAGED_BEGIN in generated and find_managed_block(generated) is None:
+        raise ValueError("unterminated managed block")
+    page_file = repo / rel_path
+    page_file.parent.mkdir(parents=True, exist_ok=True)
+    entry = block_index["pages"].get(rel_path) if block_index else None
+
+    if page_file.exists():
+        data = page_file.read_bytes()
+        existing = data.decode("utf-8")
+        fresh = is_fresh(entry, page_file)
+        blocks = entry["blocks"] if fresh else scan_blocks(data)
+        if entry and blocks:
+            blocks[0]["written_hash"] = (entry["blocks"] or [{}])[0].get("written_hash")
+            if human_edited(blocks[0]):
+                click.echo(f"   ⚠️  {rel_path}: overwriting human edits inside the managed block")
+
+        spliced = None
+        if fresh:
+            spliced = splice_at_offsets(data, entry, extract_managed_content(generated).encode())
+        if spliced is not None:
+            content = spliced.decode("utf-8")
+            action = "Updated"
+        else:
+            content = splice_managed_block(existing, generated)
+            action = "Updated" if find_managed_block(existing) else "Replaced"
+    else:
+        content = generated
+        action = "Created"
+
+    if not write_text_if_changed(page_file, content):
+        action = "Unchanged"
+        content = existing
+    if block_index is not None:
+        block_index["pages"][rel_path] = index_page(page_file, content.encode(), entry, written=True)
+    return action, content
+
+
+def parse_citations(content: str) -> list[dict]:
+    """Extract the citations from a page's footnote definitions."""
+    citations = []
+    for footnote_id, body in FOOTNOTE_PATTERN.findall(content):
+        for match in CITATION_PATTERN.finditer(body):
+            filepath = match.group(1) or match.group(4)
+            start = int(match.group(2) or match.group(5))
+            end = int(match.group(3) or match.group(6) or start)
+            citations.append(
+                {"footnote": footnote_id, "filepath": filepath, "start_line": start, "end_line": end}
+            )
+    return citations
+
+
+def hash_line_range(lines: Optional[list[bytes]], start: int, end: int) -> Optional[str]:
+    """Hash the cited lines of a source file, or None if the range is out of bounds."""
+    if lines is None or start < 1 or end < start or end > len(lines):
+        return None
+    return hashlib.sha256(b"".join(lines[start - 1 : end])).hexdigest()
+
+
+def build_manifest_entry(repo: Path, content: str, generated_at: str) -> dict:
+    """Build a manifest entry with parsed citations and content hashes for a page.
+
+    Citations of files outside the repository (`../`, absolute paths or
+    symlinks leading out) are recorded without a range hash and never read.
+    """
+    root = repo.resolve()
+    sources: dict[str, Optional[list[bytes]]] = {}
+    citations = parse_citations(content)
+    for citation in citations:
+        filepath = citation["filepath"]
+        if filepath not in sources:
+            source = (root / filepath).resolve()
+            sources[filepath] = None
+            if source.is_relative_to(root):
+                try:
+                    sources[filepath] = source.read_bytes().splitlines(keepends=True)
+                except OSError:
+                    pass
+        citation["range_hash"] = hash_line_range(
+            sources[filepath], citation["start_line"], citation["end_line"]
+        )
+
+    return {
+        "generated_at": generated_at,
+        "content_hash": hashlib.sha256(content.encode("utf-8")).hexdigest(),
+        "citations": citations,
+    }
+
+
 def read_file_with_lines(filepath: Path, max_lines: int = 500) -> tuple[str, int]:
     """Read file content with line numbers."""
     try:
@@ -77,65 +373,119 @@ def read_file_with_lines(filepath: Path, max_lines: int = 500) -> tuple[str, int
         return f"Error reading file: {e}", 0
 
 
-def find_component_files(repo: Path, component_path: str, max_files: int = 10) -> list[dict]:
-    """Find key files in a component."""
-    component_dir = repo / component_path
-    if not component_dir.exists():
-        return []
-
-    files = []
-    extensions = {".ts", ".tsx", ".js", ".jsx", ".py", ".go", ".rs", ".java"}
-
-    for file in component_dir.rglob("*"):
-        if file.is_file() and file.suffix in extensions:
-            rel_path = str(file.relative_to(repo))
-            if "node_modules" not in rel_path and "__pycache__" not in rel_path:
-                content, line_count = read_file_with_lines(file, max_lines=200)
-                files.append({
-                    "path": rel_path,
-                    "content": content,
-                    "line_count": line_count,
-                })
-                if len(files) >= max_files:
-                    break
-
-    return files
+def find_component_files(
+    repo: Path,
+    component_path: str,
+    budget_tokens: int = DEFAULT_CONTEXT_BUDGET,
+    skip: Optional[dict[str, str]] = None,
+    nested: Optional[list[str]] = None,
+) -> list[dict]:
+    """Find key files in a component, packed into a token budget."""
+    return pack_context(repo, component_path, budget_tokens, skip, nested)
+
+
+def format_snippets(snippets: list[dict]) -> str:
+    """Render retrieved snippets as numbered code blocks."""
+    return "\n\n".join(
+        f"#### {s['path']} L{s['start']}-L{s['end']}\n```\n{s['content']}\n```" for s in snippets
+    )
+
+
+def build_topic_context(repo: Path) -> str:
+    """Top-ranked code for each overview topic, within OVERVIEW_RETRIEVAL_BUDGET.
+
+    Empty when no retrieval index has been built.
+    """
+    meta = load_retrieval_meta(repo)
+    if not meta:
+        return ""
+    sections = []
+    seen: set = set()
+    per_topic = OVERVIEW_RETRIEVAL_BUDGET // len(OVERVIEW_TOPICS)
+    with span("retrieval.search", page="overview") as search_span:
+        for topic, query in OVERVIEW_TOPICS.items():
+            snippets = search_snippets(
+                repo, query, per_topic, SNIPPETS_PER_TOPIC, seen=seen, meta=meta
+            )
+            if snippets:
+                sections.append(f"### {topic}\n{format_snippets(snippets)}")
+        search_span["files"] = len(seen)
+    return "\n\n".join(sections)
+
+
+def build_usage_context(repo: Path, component: dict) -> str:
+    """Code outside a component that best matches its name, within USAGE_RETRIEVAL_BUDGET."""
+    meta = load_retrieval_meta(repo)
+    if not meta:
+        return ""
+    with span("retrieval.search", component=component["name"]) as search_span:
+        snippets = search_snippets(
+            repo,
+            component["name"],
+            USAGE_RETRIEVAL_BUDGET,
+            USAGE_SNIPPETS,
+            exclude=component["path"],
+            meta=meta,
+        )
+        search_span["files"] = len(snippets)
+    return format_snippets(snippets)
 
 
-def generate_component_doc(
-    client: anthropic.Anthropic,
+def build_component_prompt(
     repo: Path,
     component: dict,
     state: dict,
-) -> str:
-    """Generate documentation for a component using Claude."""
-    
-    component_name = component["name"]
-    component_path = component["path"]
-    
-    click.echo(f"   Analyzing {component_name}...")
-    
+    context_budget: int = DEFAULT_CONTEXT_BUDGET,
+    skip: Optional[dict[str, str]] = None,
+) -> Optional[str]:
+    """Build the generation prompt for a component, or None if it has no source files."""
     # Get component files
-    files = find_component_files(repo, component_path)
-    
+    with span("context.pack", component=component["name"]) as pack_span:
+        files = find_component_files(
+            repo, component["path"], context_budget, skip, component.get("children")
+        )
+        pack_span["files"] = len(files)
+        pack_span["bytes"] = sum(len(f["content"]) for f in files)
+
     if not files:
-        return f"# {component_name}\n\nNo source files found in `{component_path}`.\n"
+        return None
 
     # Build context
     file_context = "\n\n".join([
-        f"### File: {f['path']} ({f['line_count']} lines)\n```\n{f['content']}\n```"
+        f"### File: {f['path']} ({f['line_count']} lines"
+        f"{', outline only' if f['mode'] == 'outline' else ''})\n```\n{f['content']}\n```"
         for f in files
     ])
+    usage = build_usage_context(repo, component)
+    if usage:
+        file_context += f"\n\nCode elsewhere in the repository that refers to this component:\n\n{usage}"
+
+    return render_component_prompt(
+        repo,
+        component,
+        state,
+        'Files in this component (most important first; "outline only" files list just their\n'
+        "symbol definitions with real line numbers):",
+        file_context,
+    )
+
+
+def render_component_prompt(
+    repo: Path, component: dict, state: dict, context_heading: str, context: str
+) -> str:
+    """Render the component page prompt around an already-built source context."""
+    component_name = component["name"]
+    component_path = component["path"]
 
-    prompt = f"""You are a technical documentation writer. Generate documentation for this code component with CITATIONS.
+    return f"""You are a technical documentation writer. Generate documentation for this code component with CITATIONS.
 
 Component: {component_name}
 Path: {component_path}
 Repository: {repo.name}
 Commit: {state.get('baseline_commit', 'unknown')[:8]}
 
-Files in this component:
-{file_context}
+{context_heading}
+{context}
 
 Generate a markdown documentation page with these requirements:
 
@@ -169,28 +519,9 @@ last_updated: "{datetime.now().strftime('%Y-%m-%d')}"
 
 IMPORTANT: Every factual statement about the code MUST have a citation with file path and line numbers."""
 
-    try:
-        response = client.messages.create(
-            model="claude-sonnet-4-20250514",
-            max_tokens=4096,
-            messages=[{"role": "user", "content": prompt}],
-        )
-        return response.content[0].text
-    except Exception as e:
-        click.echo(f"   ⚠️  Error generating docs for {component_name}: {e}")
-        return f"# {component_name}\n\nError generating documentation: {e}\n"
-
-
-def generate_overview_doc(
-    client: anthropic.Anthropic,
-    repo: Path,
-    code_index: dict,
-    state: dict,
-) -> str:
-    """Generate overview documentation."""
-    
-    click.echo("   Generating overview...")
 
+def build_overview_prompt(repo: Path, code_index: dict, state: dict) -> str:
+    """Build the generation prompt for the architecture overview."""
     # Get some key files for context
     entrypoints = code_index.get("entrypoints", [])[:5]
     entrypoint_contents = []
@@ -200,18 +531,31 @@ def generate_overview_doc(
             content, _ = read_file_with_lines(ep_path, max_lines=100)
             entrypoint_contents.append(f"### {ep}\n```\n{content}\n```")
 
-    prompt = f"""You are a technical documentation writer. Generate an architecture overview with CITATIONS.
+    # Cross-cutting code retrieved from the whole repository, with real line numbers
+    topic_context = build_topic_context(repo)
+    if topic_context:
+        topic_context = f"""
+Relevant code by topic (retrieved from the whole repository; cite these line ranges):
+{topic_context}
+"""
+
+    # Churn changes with every commit and says nothing about the architecture
+    components = [
+        {k: v for k, v in c.items() if k != "churn"} for c in code_index.get("components", [])
+    ]
+
+    return f"""You are a technical documentation writer. Generate an architecture overview with CITATIONS.
 
 Repository: {repo.name}
 Technology Stack: {', '.join(code_index.get('technology_stack', {}).keys())}
 Total Files: {code_index.get('statistics', {}).get('total_files', 0)}
-Components: {json.dumps(code_index.get('components', []), indent=2)}
+Components: {json.dumps(components, indent=2)}
 Entrypoints: {entrypoints}
 Config Files: {code_index.get('configuration_files', [])}
 
 Key entrypoint files:
 {chr(10).join(entrypoint_contents) if entrypoint_contents else 'No entrypoints found'}
-
+{topic_context}
 Generate markdown documentation with:
 
 1. YAML frontmatter with generated_by, baseline_commit: "{state.get('baseline_commit', '')}", last_updated
@@ -225,60 +569,342 @@ EVERY factual claim needs a citation: [^N]: `filepath` L##-L##
 
 End with the closing managed block marker and a "## Design Decisions" section for humans."""
 
-    try:
-        response = client.messages.create(
-            model="claude-sonnet-4-20250514",
-            max_tokens=4096,
-            messages=[{"role": "user", "content": prompt}],
+
+def response_cache_key(prompt: str) -> str:
+    """Cache key for a prompt, ignoring the volatile last_updated date."""
+    stable = re.sub(r'last_updated: "\d{4}-\d{2}-\d{2}"', 'last_updated: ""', prompt)
+    return hashlib.sha256(f"{MODEL}\0{MAX_TOKENS}\0{stable}".encode()).hexdigest()
+
+
+def stream_response(client, repo: Path, prompt: str, label: str) -> Optional[str]:
+    """Stream a response to disk and return its text, or None if the call fails.
+
+    Finished responses are reused from the response cache without an API call.
+    A leftover partial stream is resumed by sending it back as an assistant
+    prefill, so only the missing tail is paid for. The partial file is locked
+    while streaming, so processes sharing a cache directory wait for each
+    other and then reuse the finished response instead of interleaving writes.
+    """
+    cache_dir = cache_path(repo, RESPONSE_CACHE_DIR)
+    cache_dir.mkdir(parents=True, exist_ok=True)
+    key = response_cache_key(prompt)
+    final_file = cache_dir / f"{key}.md"
+    part_file = cache_dir / f"{key}.md.part"
+
+    with locked(part_file):
+        if final_file.exists():
+            click.echo(f"   ♻️  {label}: reused cached response")
+            with span("llm.cached", label=label) as cached_span:
+                text = final_file.read_text(encoding="utf-8")
+                cached_span["bytes"] = len(text)
+            return text
+        return stream_to_cache(client, prompt, label, part_file, final_file)
+
+
+def stream_to_cache(
+    client, prompt: str, label: str, part_file: Path, final_file: Path
+) -> Optional[str]:
+    """Stream (or resume) one response into `part_file`; the caller holds its lock."""
+    messages = [{"role": "user", "content": prompt}]
+    prefix = ""
+    if part_file.exists():
+        # The API rejects assistant prefills that end in whitespace
+        prefix = part_file.read_text(encoding="utf-8").rstrip()
+    if prefix:
+        messages.append({"role": "assistant", "content": prefix})
+        click.echo(f"   ⏯️  {label}: resuming partial response (~{estimate_tokens(prefix)} tokens)")
+    max_tokens = max(256, MAX_TOKENS - estimate_tokens(prefix))
+
+    started = time.monotonic()
+    last_report = started
+    streamed_chars = 0
+    with span("llm.request", label=label, bytes=len(prompt), resumed=bool(prefix)) as request_span:
+        try:
+            with open(part_file, "w", encoding="utf-8") as out:
+                out.write(prefix)
+                with client.messages.stream(
+                    model=MODEL,
+                    max_tokens=max_tokens,
+                    messages=messages,
+                ) as stream:
+                    queue_wait = client.queue_wait()
+                    request_span["queue_ms"] = round(queue_wait * 1000, 3)
+                    for text in stream.text_stream:
+                        now = time.monotonic()
+                        if not streamed_chars:
+                            request_span["ttfb_ms"] = round((now - started - queue_wait) * 1000, 3)
+                        out.write(text)
+                        out.flush()
+                        streamed_chars += len(text)
+                        if now - last_report >= PROGRESS_INTERVAL:
+                            tokens = streamed_chars // CHARS_PER_TOKEN
+                            click.echo(
+                                f"   … {label}: ~{tokens} tokens "
+                                f"({tokens / (now - started):.1f} tok/s)"
+                            )
+                            last_report = now
+                    final = stream.get_final_message()
+                os.fsync(out.fileno())
+        except Exception as e:
+            request_span["error"] = str(e)
+            click.echo(f"   ⚠️  Error generating {label}: {e}")
+            return None
+        usage = final.usage
+        request_span["input_tokens"] = usage.input_tokens
+        request_span["output_tokens"] = usage.output_tokens
+        request_span["stop_reason"] = final.stop_reason
+
+    # Only a complete answer is cached; a cut-off one stays partial and is resumed next run
+    if final.stop_reason != "end_turn":
+        click.echo(
+            f"   ⚠️  {label}: response stopped early ({final.stop_reason}) after "
+            f"{usage.output_tokens} tokens; kept as partial, rerun to resume"
         )
-        return response.content[0].text
-    except Exception as e:
-        click.echo(f"   ⚠️  Error generating overview: {e}")
-        return f"# Architecture Overview\n\nError: {e}\n"
+        return None
+    os.replace(part_file, final_file)
+    elapsed = max(time.monotonic() - started, 1e-6)
+    click.echo(
+        f"   📝 {label}: {usage.output_tokens} tokens in {elapsed:.1f}s "
+        f"({usage.output_tokens / elapsed:.1f} tok/s)"
+    )
+    return final_file.read_text(encoding="utf-8")
 
 
-@click.group()
-def cli():
-    """Repo Wiki LLM - Generate documentation using Claude API."""
-    pass
+def unit_label(unit: dict) -> str:
+    """Header identifying a source unit in map prompts and responses."""
+    return f"{unit['path']} L{unit['start_line']}-L{unit['end_line']}"
 
 
-@cli.command()
-@click.argument("repo_path", type=click.Path(exists=True))
-@click.option("--component", "-c", help="Generate docs for specific component only")
-@click.option("--overview-only", is_flag=True, help="Generate only overview page")
-def generate(repo_path: str, component: Optional[str], overview_only: bool):
-    """Generate documentation using Claude API."""
-    repo = Path(repo_path).resolve()
-    click.echo(f"Generating documentation for: {repo}")
+def summary_cache_key(unit: dict) -> str:
+    """Cache key for a unit summary, tied to the fingerprint of its file."""
+    raw = f"{MODEL}\0{unit_label(unit)}\0{unit['fingerprint']}"
+    return hashlib.sha256(raw.encode()).hexdigest()
 
-    # Check API
-    client = get_api_client()
 
-    # Load data
-    code_index = load_code_index(repo)
-    state = load_state(repo)
+def build_map_prompt(repo: Path, component: dict, group: list[dict]) -> str:
+    """Build the prompt that summarizes one group of source units."""
+    sections = "\n\n".join(
+        f"### FILE: {unit_label(u)}\n```\n{u['content']}\n```" for u in group
+    )
+    return f"""You are a technical documentation writer summarizing source code for a later documentation pass.
+
+Component: {component['name']}
+Repository: {repo.name}
+
+For EACH file section below, write a block that starts with its exact header line
+("### FILE: <path> L<start>-L<end>", copied from the input), followed by a concise summary of
+its purpose, key functions and classes, configuration and notable behaviour.
+
+Cite every claim with the real line numbers shown, in the form `path` L<start>-L<end>.
+Do not add any text outside the file blocks.
+
+{sections}"""
+
+
+def build_condense_prompt(repo: Path, component: dict, summaries: str) -> str:
+    """Build the prompt that merges summaries that are too large for one page prompt."""
+    return f"""You are a technical documentation writer condensing code summaries.
+
+Component: {component['name']}
+Repository: {repo.name}
+
+Merge the summaries below into a shorter summary of the same code. Keep the most important
+facts and keep their citations (`path` L<start>-L<end>) exactly as written.
+
+{summaries}"""
+
+
+def parse_summary_sections(text: str) -> dict[str, str]:
+    """Split a map response into per-unit summaries keyed by unit label."""
+    parts = re.split(r"^### FILE: (.+?)\s*$", text, flags=re.MULTILINE)
+    return {label.strip(): body.strip() for label, body in zip(parts[1::2], parts[2::2])}
+
+
+def summarize_units(
+    client, repo: Path, component: dict, units: list[dict], concurrency: int
+) -> list[tuple[dict, str]]:
+    """Map phase: summarize source units in parallel, reusing cached unit summaries."""
+    cache_dir = cache_path(repo, SUMMARY_CACHE_DIR)
+    cache_dir.mkdir(parents=True, exist_ok=True)
+
+    summaries: dict[str, str] = {}
+    pending = []
+    for unit in units:
+        cache_file = cache_dir / f"{summary_cache_key(unit)}.md"
+        if cache_file.exists():
+            summaries[unit_label(unit)] = cache_file.read_text(encoding="utf-8")
+        else:
+            pending.append(unit)
+
+    groups = group_units(pending, MAP_GROUP_BUDGET)
+    click.echo(
+        f"   🗺️  {component['name']}: {len(units)} units, {len(units) - len(pending)} cached, "
+        f"{len(groups)} map prompt(s)"
+    )
+
+    def run_group(numbered_group) -> None:
+        i, group = numbered_group
+        label = f"{component['name']} [map {i}/{len(groups)}]"
+        text = stream_response(client, repo, build_map_prompt(repo, component, group), label)
+        if text is None:
+            return
+        sections = parse_summary_sections(text)
+        if len(group) == 1 and not sections:
+            sections = {unit_label(group[0]): text.strip()}
+        for unit in group:
+            summary = sections.get(unit_label(unit))
+            if summary is None:
+                click.echo(f"   ⚠️  {label}: no summary returned for {unit_label(unit)}")
+                continue
+            atomic_write_text(cache_dir / f"{summary_cache_key(unit)}.md", summary)
+            summaries[unit_label(unit)] = summary
+
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        list(pool.map(run_group, enumerate(groups, 1)))
+
+    return [(u, summaries[unit_label(u)]) for u in units if unit_label(u) in summaries]
+
+
+def reduce_summaries(
+    client, repo: Path, component: dict, summaries: list[tuple[dict, str]], budget: int
+) -> Optional[str]:
+    """Reduce phase: condense unit summaries until they fit the context budget."""
+    sections = [f"### {unit_label(u)}\n{summary}" for u, summary in summaries]
+
+    for level in range(1, MAX_REDUCE_LEVELS + 1):
+        context = "\n\n".join(sections)
+        if estimate_tokens(context) <= budget:
+            return context
+
+        chunks = group_units(
+            [{"text": section, "tokens": estimate_tokens(section)} for section in sections],
+            MAP_GROUP_BUDGET,
+        )
+        condensed = []
+        for i, chunk in enumerate(chunks, 1):
+            text = stream_response(
+                client,
+                repo,
+                build_condense_prompt(repo, component, "\n\n".join(c["text"] for c in chunk)),
+                f"{component['name']} [reduce {level}.{i}/{len(chunks)}]",
+            )
+            if text is None:
+                return None
+            condensed.append(text.strip())
+        sections = condensed
+
+    return "\n\n".join(sections)
+
+
+def generate_hierarchical_component_doc(
+    client,
+    repo: Path,
+    component: dict,
+    state: dict,
+    context_budget: int = DEFAULT_CONTEXT_BUDGET,
+    concurrency: int = DEFAULT_CONCURRENCY,
+    skip: Optional[dict[str, str]] = None,
+) -> Optional[str]:
+    """Generate a component page from map-reduce summaries of all of its files."""
+    component_name = component["name"]
+    click.echo(f"   Analyzing {component_name} (hierarchical)...")
+
+    with span("context.units", component=component_name) as units_span:
+        units = split_into_units(
+            repo, component["path"], MAP_GROUP_BUDGET, skip, component.get("children")
+        )
+        units_span["files"] = len({u["path"] for u in units})
+    if not units:
+        return f"# {component_name}\n\nNo source files found in `{component['path']}`.\n"
+
+    summaries = summarize_units(client, repo, component, units, concurrency)
+    if len(summaries) < len(units):
+        click.echo(f"   ⚠️  {component_name}: {len(units) - len(summaries)} unit(s) not summarized")
+    if not summaries:
+        return None
+
+    context = reduce_summaries(client, repo, component, summaries, context_budget)
+    if context is None:
+        return None
+
+    prompt = render_component_prompt(
+        repo,
+        component,
+        state,
+        "Summaries of every file in this component (each cites real line ranges; reuse these\n"
+        "citations rather than inventing new ones):",
+        context,
+    )
+    return stream_response(client, repo, prompt, component_name)
 
+
+def generate_component_doc(
+    client,
+    repo: Path,
+    component: dict,
+    state: dict,
+    context_budget: int = DEFAULT_CONTEXT_BUDGET,
+    skip: Optional[dict[str, str]] = None,
+    prompt: Optional[str] = None,
+) -> Optional[str]:
+    """Generate documentation for a component using Claude.
+
+    Returns None if the API call fails, so existing pages are left untouched.
+    """
+    component_name = component["name"]
+    click.echo(f"   Analyzing {component_name}...")
+
+    if prompt is None:
+        prompt = build_component_prompt(repo, component, state, context_budget, skip)
+    if prompt is None:
+        return f"# {component_name}\n\nNo source files found in `{component['path']}`.\n"
+
+    return stream_response(client, repo, prompt, component_name)
+
+
+def generate_overview_doc(
+    client,
+    repo: Path,
+    code_index: dict,
+    state: dict,
+) -> Optional[str]:
+    """Generate overview documentation, or None if the API call fails."""
+    click.echo("   Generating overview...")
+    prompt = build_overview_prompt(repo, code_index, state)
+    return stream_response(client, repo, prompt, "overview")
+
+
+def filter_source_files(repo: Path, code_index: dict) -> dict[str, str]:
+    """Find generated, vendored and duplicate files across all components."""
+    with span("context.filter") as filter_span:
+        skip = filter_component_files(
+            repo, [c["path"] for c in code_index.get("components", [])]
+        )
+        filter_span["files"] = len(skip)
+    duplicates = sum(1 for reason in skip.values() if reason.startswith("duplicate"))
+    if skip:
+        click.echo(
+            f"   🧹 Filtered {len(skip) - duplicates} generated/vendored/minified "
+            f"and {duplicates} duplicate file(s) from context"
+        )
+    return skip
+
+
+def select_pages(
+    repo: Path,
+    code_index: dict,
+    component: Optional[str],
+    overview_only: bool,
+    changed: bool,
+) -> tuple[bool, list[dict]]:
+    """Decide whether to generate the overview and which components to generate."""
     components = code_index.get("components", [])
 
     if not components and not overview_only:
         click.echo("⚠️  No components found. Generating overview only.")
         overview_only = True
 
-    # Generate overview
-    if not component:
-        overview = generate_overview_doc(client, repo, code_index, state)
-        overview_file = repo / "docs/architecture/overview.md"
-        overview_file.parent.mkdir(parents=True, exist_ok=True)
-        with open(overview_file, "w") as f:
-            f.write(overview)
-        click.echo(f"   ✅ Created: docs/architecture/overview.md")
-
-    if overview_only:
-        click.echo("\n✅ Overview generated!")
-        return
-
-    # Generate component docs
+    include_overview = not component
     if component:
         # Find specific component
         comp = next((c for c in components if c["name"] == component), None)
@@ -286,58 +912,471 @@ def generate(repo_path: str, component: Optional[str], overview_only: bool):
             click.echo(f"❌ Component '{component}' not found")
             sys.exit(1)
         components = [comp]
+    if overview_only:
+        components = []
+
+    if changed:
+        impacted = set(load_change_set(repo).get("impacted_pages", []))
+        include_overview = include_overview and OVERVIEW_PAGE in impacted
+        components = [c for c in components if component_page(c) in impacted]
+
+        handled = {OVERVIEW_PAGE} | {component_page(c) for c in code_index.get("components", [])}
+        for page in sorted(impacted - handled):
+            click.echo(f"   ⏭️  Skipped: {page} (not generated by this command)")
+        click.echo(
+            f"   Changed scope: {len(components)} component(s)"
+            f"{' + overview' if include_overview else ''}"
+        )
 
-    for comp in components:
-        doc = generate_component_doc(client, repo, comp, state)
-        doc_file = repo / f"docs/components/{comp['name']}.md"
-        doc_file.parent.mkdir(parents=True, exist_ok=True)
-        with open(doc_file, "w") as f:
-            f.write(doc)
-        click.echo(f"   ✅ Created: docs/components/{comp['name']}.md")
-
-    # Update manifest
-    manifest_file = repo / ".repo_wiki/manifest.json"
-    manifest = {"schema_version": "1.0", "generated_at": datetime.utcnow().isoformat() + "Z", "pages": {}}
-    
-    for md_file in (repo / "docs").rglob("*.md"):
-        rel_path = str(md_file.relative_to(repo))
-        manifest["pages"][rel_path] = {"generated_at": datetime.utcnow().isoformat() + "Z"}
-    
-    with open(manifest_file, "w") as f:
-        json.dump(manifest, f, indent=2)
+    return include_overview, components
+
+
+def parse_timestamp(value: str) -> float:
+    """Seconds since the epoch for an ISO 8601 UTC timestamp, or 0 if unparsable."""
+    try:
+        return datetime.fromisoformat(value.rstrip("Z")).replace(tzinfo=timezone.utc).timestamp()
+    except (AttributeError, ValueError):
+        return 0.0
+
+
+def schedule_pages(
+    repo: Path, code_index: dict, pages: list[tuple[str, Optional[dict]]]
+) -> list[tuple[str, Optional[dict]]]:
+    """Order pages hottest and most stale first.
+
+    A page is stale when it was never generated or its sources changed after
+    its manifest `generated_at`. Stale pages come first, by decayed churn
+    score and then by how long their sources have been ahead of them.
+    """
+    components = code_index.get("components", [])
+    if not any("churn" in c for c in components):
+        click.echo("   ℹ️  No churn data in code_index.json; run 'index' to enable ordering")
+        return pages
+
+    # Only generated_at is needed, so the manifest's citations are never loaded
+    generated = {}
+    if json_path(repo / MANIFEST).exists():
+        generated = {
+            page: entry.get("generated_at")
+            for page, entry in iter_json_items(repo / MANIFEST, "pages")
+        }
+    # Nested components' files are already counted in their parents
+    top_level = [c for c in components if not c.get("parent")]
+    overview = {
+        "score": sum(c.get("churn", {}).get("score", 0) for c in top_level),
+        "last_changed": max((c.get("churn", {}).get("last_changed", 0) for c in top_level), default=0),
+    }
+
+    def priority(page_and_component) -> tuple:
+        page, component = page_and_component
+        churn = overview if component is None else component.get("churn", {})
+        generated_at = generated.get(page)
+        lag = churn.get("last_changed", 0) - parse_timestamp(generated_at) if generated_at else float("inf")
+        return (lag <= 0, -churn.get("score", 0), -lag)
+
+    ordered = sorted(pages, key=priority)
+    stale = sum(1 for p in ordered if not priority(p)[0])
+    click.echo(f"   Order: hottest and most stale first ({stale} stale)")
+    return ordered
+
+
+def parse_budget(ctx, param, value: Optional[str]) -> Optional[tuple[float, str]]:
+    """Parse a budget such as `$5`, `5usd`, `200k` or `1.5m` (tokens)."""
+    if value is None:
+        return None
+    text = value.strip().lower().replace(",", "").replace("_", "")
+    unit = "tokens"
+    if text.startswith("$") or text.endswith("usd"):
+        unit = "usd"
+        text = text.lstrip("$").removesuffix("usd")
+    else:
+        text = text.removesuffix("tokens")
+    multiplier = 1
+    if unit == "tokens" and text[-1:] in ("k", "m"):
+        multiplier = 1_000 if text[-1] == "k" else 1_000_000
+        text = text[:-1]
+    try:
+        amount = float(text) * multiplier
+    except ValueError:
+        raise click.BadParameter(f"expected e.g. '$5' or '200k', got '{value}'")
+    if amount <= 0:
+        raise click.BadParameter("must be positive")
+    return amount, unit
+
+
+def job_cost(input_tokens: int, output_tokens: int, unit: str) -> float:
+    """Cost of a job in budget units (tokens or US dollars)."""
+    if unit == "tokens":
+        return input_tokens + output_tokens
+    return (
+        input_tokens / 1_000_000 * INPUT_PRICE_PER_MTOK
+        + output_tokens / 1_000_000 * OUTPUT_PRICE_PER_MTOK
+    )
+
+
+def format_cost(amount: float, unit: str) -> str:
+    """Human-readable budget amount."""
+    return f"${amount:.2f}" if unit == "usd" else f"{amount:,.0f} tokens"
+
+
+def apply_budget(
+    repo: Path,
+    code_index: dict,
+    state: dict,
+    pages: list[tuple[str, Optional[dict]]],
+    budget: tuple[float, str],
+    context_budget: int,
+    hierarchical: bool,
+    skip: dict[str, str],
+) -> tuple[list[tuple[str, Optional[dict]]], dict[str, str]]:
+    """Keep the pages, in order, whose estimated cost fits the budget.
+
+    Pages that do not fit are deferred and later, cheaper pages may still be
+    admitted. Also returns the component prompts built for estimation, so
+    generation does not pack the same context twice.
+    """
+    limit, unit = budget
+    output_guess = expected_output_tokens(repo)
+    admitted, prompts = [], {}
+    spent = 0.0
+    for page, component in pages:
+        if component is None:
+            row = estimate_prompt(repo, build_overview_prompt(repo, code_index, state), output_guess)
+        elif hierarchical:
+            row = estimate_hierarchical(repo, component, state, context_budget, skip, output_guess)
+        else:
+            prompt = build_component_prompt(repo, component, state, context_budget, skip)
+            if prompt is not None:
+                prompts[page] = prompt
+            row = estimate_prompt(repo, prompt, output_guess)
+        cost = job_cost(row[0], row[1], unit)
+        if spent + cost > limit:
+            click.echo(f"   ⏸️  Deferred: {page} (~{format_cost(cost, unit)}, over budget)")
+            continue
+        spent += cost
+        admitted.append((page, component))
+
+    click.echo(
+        f"   Budget: {len(admitted)}/{len(pages)} page(s), "
+        f"~{format_cost(spent, unit)} of {format_cost(limit, unit)}"
+    )
+    return admitted, prompts
+
+
+def finish_trace() -> None:
+    """Write the run's trace when the command exits."""
+    trace_file = TRACER.finish()
+    if trace_file:
+        click.echo(f"   📈 Trace saved to {trace_file}")
+
+
+@click.group()
+@click.option("--trace", is_flag=True, help="Record per-phase spans in .repo_wiki/logs")
+@click.option("--profile", is_flag=True, help="Also dump a cProfile file (implies --trace)")
+@click.pass_context
+def cli(ctx: click.Context, trace: bool, profile: bool):
+    """Repo Wiki LLM - Generate documentation using Claude API."""
+    if start_tracing(ctx.invoked_subcommand or "llm", trace, profile):
+        ctx.call_on_close(finish_trace)
+
+
+@cli.command()
+@click.argument("repo_path", type=click.Path(exists=True))
+@click.option("--component", "-c", help="Generate docs for specific component only")
+@click.option("--overview-only", is_flag=True, help="Generate only overview page")
+@click.option(
+    "--changed",
+    is_flag=True,
+    help="Regenerate only impacted_pages from .repo_wiki/change_set.json",
+)
+@click.option(
+    "--context-budget",
+    type=int,
+    default=DEFAULT_CONTEXT_BUDGET,
+    show_default=True,
+    help="Token budget for source context per component",
+)
+@click.option(
+    "--concurrency",
+    type=click.IntRange(min=1),
+    default=DEFAULT_CONCURRENCY,
+    show_default=True,
+    help="Maximum number of API requests in flight",
+)
+@click.option(
+    "--hierarchical",
+    is_flag=True,
+    help="Summarize all component files in parallel, then write pages from the summaries",
+)
+@click.option(
+    "--order",
+    type=click.Choice(["churn", "index"]),
+    default="churn",
+    show_default=True,
+    help="Hottest and most stale pages first, or code_index.json order",
+)
+@click.option(
+    "--budget",
+    callback=parse_budget,
+    help="Estimated spend limit in tokens ('200k') or US dollars ('$5')",
+)
+def generate(
+    repo_path: str,
+    component: Optional[str],
+    overview_only: bool,
+    changed: bool,
+    context_budget: int,
+    concurrency: int,
+    hierarchical: bool,
+    order: str,
+    budget: Optional[tuple[float, str]],
+):
+    """Generate documentation using Claude API.
+
+    Existing pages keep everything outside their managed block unchanged.
+    """
+    repo = Path(repo_path).resolve()
+    TRACER.bind_repo(repo)
+    click.echo(f"Generating documentation for: {repo}")
+
+    # Check API
+    client = ThrottledClient(get_api_client(), concurrency)
+
+    # Load data
+    code_index = load_code_index(repo)
+    state = load_state(repo)
+
+    include_overview, components = select_pages(
+        repo, code_index, component, overview_only, changed
+    )
+    skip = filter_source_files(repo, code_index) if components else {}
+
+    pages = [(OVERVIEW_PAGE, None)] if include_overview else []
+    pages += [(component_page(comp), comp) for comp in components]
+    if order == "churn":
+        pages = schedule_pages(repo, code_index, pages)
+    prompts: dict[str, str] = {}
+    if budget:
+        pages, prompts = apply_budget(
+            repo, code_index, state, pages, budget, context_budget, hierarchical, skip
+        )
+
+    def produce(page: str, comp: Optional[dict]) -> Optional[str]:
+        if comp is None:
+            return generate_overview_doc(client, repo, code_index, state)
+        if hierarchical:
+            return generate_hierarchical_component_doc(
+                client, repo, comp, state, context_budget, concurrency, skip
+            )
+        return generate_component_doc(
+            client, repo, comp, state, context_budget, skip, prompts.get(page)
+        )
+
+    generated_at = datetime.utcnow().isoformat() + "Z"
+    manifest_entries: dict[str, dict] = {}
+    block_index = load_block_index(repo)
+
+    def run_job(job: tuple[str, Optional[dict]]) -> Optional[tuple[str, str]]:
+        page, comp = job
+        with span("page", page=page):
+            doc = produce(page, comp)
+        if doc is None:
+            return None
+        with span("write", page=page) as write_span:
+            try:
+                action, content = write_page(repo, page, doc, block_index)
+            except UnicodeDecodeError:
+                click.echo(f"   ⚠️  {page} is not UTF-8; left unchanged")
+                return None
+            except ValueError as e:
+                click.echo(f"   ⚠️  {page}: {e} in the response (truncated?); page left unchanged")
+                return None
+            write_span["bytes"] = len(content)
+        # Citations are parsed while the page is in memory, so nothing re-reads docs/
+        manifest_entries[page] = build_manifest_entry(repo, content, generated_at)
+        click.echo(
+            f"   ✅ {action}: {page} ({len(manifest_entries[page]['citations'])} citations)"
+        )
+        return page, action
+
+    # Each page streams to its own temp file and is moved into place when complete.
+    # The pool starts jobs in list order, so the schedule is also the dispatch order
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        done = [result for result in pool.map(run_job, pages) if result]
+    finished = [page for page, _ in done]
+    unchanged = sum(1 for _, action in done if action == "Unchanged")
+
+    # Merge this run's pages into the manifest and block index under their locks,
+    # so parallel generate runs (e.g. one per component) do not drop each other's pages
+    with span("manifest.write", files=len(manifest_entries)):
+        merge_manifest(
+            repo,
+            manifest_entries,
+            generated_at=generated_at,
+            baseline_commit=state.get("baseline_commit", ""),
+        )
+        save_block_index(repo, block_index, finished)
 
     click.echo(f"\n✅ Documentation generated!")
-    click.echo(f"   Components: {len(components)}")
+    click.echo(
+        f"   Pages written: {len(finished) - unchanged}/{len(pages)} "
+        f"({unchanged} unchanged apart from date stamps, not rewritten)"
+    )
     click.echo(f"   Run 'mkdocs serve' to preview")
 
 
+def projected_wall_time(latencies: list[float], concurrency: int) -> float:
+    """Wall time for running jobs in order on a pool of `concurrency` workers."""
+    workers = [0.0] * concurrency
+    for latency in latencies:
+        idx = workers.index(min(workers))
+        workers[idx] += latency
+    return max(workers, default=0.0)
+
+
+def expected_output_tokens(repo: Path) -> int:
+    """Average output size of cached responses, or a default when there are none."""
+    cache_dir = cache_path(repo, RESPONSE_CACHE_DIR)
+    sizes = [estimate_tokens(f.read_text(encoding="utf-8")) for f in cache_dir.glob("*.md")]
+    if not sizes:
+        return DEFAULT_OUTPUT_TOKENS
+    return min(MAX_TOKENS, sum(sizes) // len(sizes))
+
+
+def stream_latency(output_tokens: int) -> float:
+    """Expected seconds to stream a response of `output_tokens`."""
+    return FIRST_TOKEN_LATENCY + output_tokens / OUTPUT_TOKENS_PER_SECOND
+
+
+def estimate_prompt(repo: Path, prompt: Optional[str], output_guess: int) -> tuple:
+    """Estimate (input tokens, output tokens, status, latencies) for one prompt."""
+    if prompt is None:
+        return (0, 0, "no source", [])
+    cache_dir = cache_path(repo, RESPONSE_CACHE_DIR)
+    key = response_cache_key(prompt)
+    if (cache_dir / f"{key}.md").exists():
+        return (0, 0, "cached", [])
+    input_tokens = estimate_tokens(prompt)
+    output_tokens = output_guess
+    status = "new"
+    part_file = cache_dir / f"{key}.md.part"
+    if part_file.exists():
+        prefix_tokens = estimate_tokens(part_file.read_text(encoding="utf-8").rstrip())
+        input_tokens += prefix_tokens
+        output_tokens = max(0, output_guess - prefix_tokens)
+        status = "resume"
+    return (input_tokens, output_tokens, status, [stream_latency(output_tokens)])
+
+
+def estimate_hierarchical(
+    repo: Path,
+    component: dict,
+    state: dict,
+    context_budget: int,
+    skip: dict[str, str],
+    output_guess: int,
+) -> tuple:
+    """Estimate (input tokens, output tokens, status, latencies) for map-reduce generation."""
+    units = split_into_units(
+        repo, component["path"], MAP_GROUP_BUDGET, skip, component.get("children")
+    )
+    if not units:
+        return (0, 0, "no source", [])
+    summary_dir = cache_path(repo, SUMMARY_CACHE_DIR)
+    pending = [u for u in units if not (summary_dir / f"{summary_cache_key(u)}.md").exists()]
+    groups = group_units(pending, MAP_GROUP_BUDGET)
+    input_tokens = sum(estimate_tokens(build_map_prompt(repo, component, g)) for g in groups)
+    output_tokens = SUMMARY_TOKENS_PER_UNIT * len(pending)
+    latencies = [stream_latency(SUMMARY_TOKENS_PER_UNIT * len(g)) for g in groups]
+
+    # The page prompt depends on the summaries, so its size is approximated
+    template = render_component_prompt(repo, component, state, "", "")
+    summary_tokens = min(context_budget, SUMMARY_TOKENS_PER_UNIT * len(units))
+    input_tokens += estimate_tokens(template) + summary_tokens
+    output_tokens += output_guess
+    latencies.append(stream_latency(output_guess))
+    status = f"{len(groups)} map, {len(units) - len(pending)}/{len(units)} units cached"
+    return (input_tokens, output_tokens, status, latencies)
+
+
 @cli.command()
 @click.argument("repo_path", type=click.Path(exists=True))
-def estimate(repo_path: str):
-    """Estimate API cost for generation."""
+@click.option("--component", "-c", help="Estimate a specific component only")
+@click.option("--overview-only", is_flag=True, help="Estimate only the overview page")
+@click.option(
+    "--changed",
+    is_flag=True,
+    help="Estimate only impacted_pages from .repo_wiki/change_set.json",
+)
+@click.option(
+    "--context-budget",
+    type=int,
+    default=DEFAULT_CONTEXT_BUDGET,
+    show_default=True,
+    help="Token budget for source context per component",
+)
+@click.option(
+    "--concurrency",
+    type=click.IntRange(min=1),
+    default=DEFAULT_CONCURRENCY,
+    show_default=True,
+    help="Maximum number of API requests in flight",
+)
+@click.option("--hierarchical", is_flag=True, help="Estimate map-reduce generation")
+def estimate(
+    repo_path: str,
+    component: Optional[str],
+    overview_only: bool,
+    changed: bool,
+    context_budget: int,
+    concurrency: int,
+    hierarchical: bool,
+):
+    """Estimate API cost and wall time for generation.
+
+    Builds the exact prompts generate would send and counts their tokens
+    locally; no network calls are made.
+    """
     repo = Path(repo_path).resolve()
-    
+    TRACER.bind_repo(repo)
+
     code_index = load_code_index(repo)
-    components = code_index.get("components", [])
-    
-    # Rough estimate: ~2000 tokens input + 1000 output per component
-    # Plus overview: ~3000 tokens input + 1500 output
-    
-    component_tokens = len(components) * 3000
-    overview_tokens = 4500
-    total_tokens = component_tokens + overview_tokens
-    
-    # Claude pricing (approximate): $3/1M input, $15/1M output
-    # Assume 60% input, 40% output
-    input_tokens = total_tokens * 0.6
-    output_tokens = total_tokens * 0.4
-    
-    cost = (input_tokens / 1_000_000 * 3) + (output_tokens / 1_000_000 * 15)
-    
+    state = load_state(repo)
+    include_overview, components = select_pages(
+        repo, code_index, component, overview_only, changed
+    )
+    skip = filter_source_files(repo, code_index) if components else {}
+
+    output_guess = expected_output_tokens(repo)
+
+    rows = []
+    if include_overview:
+        prompt = build_overview_prompt(repo, code_index, state)
+        rows.append(("overview", *estimate_prompt(repo, prompt, output_guess)))
+    for comp in components:
+        if hierarchical:
+            row = estimate_hierarchical(repo, comp, state, context_budget, skip, output_guess)
+        else:
+            prompt = build_component_prompt(repo, comp, state, context_budget, skip)
+            row = estimate_prompt(repo, prompt, output_guess)
+        rows.append((comp["name"], *row))
+
+    total_input = sum(r[1] for r in rows)
+    total_output = sum(r[2] for r in rows)
+    cost = job_cost(total_input, total_output, "usd")
+    wall_time = projected_wall_time([t for r in rows for t in r[4]], concurrency)
+
     click.echo(f"📊 Estimation for {repo.name}:")
-    click.echo(f"   Components: {len(components)}")
-    click.echo(f"   Estimated tokens: ~{total_tokens:,}")
+    click.echo(f"   {'Page':<30} {'Input':>9} {'Output':>8}  Status")
+    for name, input_tokens, output_tokens, status, _ in rows:
+        click.echo(f"   {name:<30} {input_tokens:>9,} {output_tokens:>8,}  {status}")
+
+    cached = sum(1 for r in rows if r[3] == "cached")
+    click.echo(f"\n   Pages: {len(rows)} ({cached} cached)")
+    click.echo(f"   Input tokens: ~{total_input:,}")
+    click.echo(f"   Output tokens: ~{total_output:,} (~{output_guess:,} per page)")
     click.echo(f"   Estimated cost: ~${cost:.2f}")
+    click.echo(f"   Projected wall time: ~{wall_time:.0f}s at concurrency {concurrency}")
 
 
 if __name__ == "__main__":
@@ -0,0 +1,360 @@
+"""
+Repo Wiki Retrieval - BM25 lexical index over repository source.
+
+`index` splits every source and config file into fixed line windows and
+indexes their identifier parts (`parseConfig` -> parse, config), comment and
+docstring words in .repo_wiki/cache/bm25/. Postings are sharded by term, so a
+query only loads the shards of its own terms. Updates are incremental: files
+whose size and mtime are unchanged are kept, changed and removed files are
+tombstoned and their new postings appended, and the index is rebuilt once
+tombstones outweigh COMPACT_RATIO of it.
+
+Generation uses search_snippets to pull the best-matching windows, with real
+line numbers for citations, into a token budget.
+"""
+
+import math
+import os
+import re
+import zlib
+from collections import Counter
+from pathlib import Path
+
+from repo_wiki_context import (
+    GENERATED_NAME_PATTERN,
+    IGNORED_DIRS,
+    SOURCE_EXTENSIONS,
+    VENDORED_DIRS,
+    estimate_tokens,
+    number_lines,
+)
+from repo_wiki_store import locked, read_json, write_json
+
+RETRIEVAL_DIR = ".repo_wiki/cache/bm25"
+INDEX_VERSION = 1
+
+# Postings are spread over this many shard files by term hash
+SHARD_COUNT = 64
+
+# Lines per indexed window; snippets are returned at this granularity
+CHUNK_LINES = 40
+
+# Larger files are usually data or bundles and are not indexed
+MAX_INDEXED_BYTES = 256 * 1024
+
+# Rebuild from scratch once this share of indexed chunks is tombstoned
+COMPACT_RATIO = 0.3
+
+BM25_K1 = 1.2
+BM25_B = 0.75
+
+# Config, build and deployment files are indexed along with source
+INDEXED_EXTENSIONS = SOURCE_EXTENSIONS | {
+    ".yml", ".yaml", ".toml", ".ini", ".cfg", ".conf", ".sh", ".tf", ".sql",
+}
+INDEXED_NAMES = {"Dockerfile", "Makefile", "Procfile", "Jenkinsfile"}
+
+# The wiki's own site config, written by `init`
+EXCLUDED_NAMES = {"mkdocs.yml"}
+
+# Hidden directories that still hold build and deployment configuration
+INDEXED_HIDDEN_DIRS = {".github", ".circleci", ".gitlab"}
+
+WORD_PATTERN = re.compile(r"[A-Za-z][A-Za-z0-9_]*")
+CAMEL_PATTERN = re.compile(r"[A-Z]+(?=[A-Z][a-z])|[A-Z]?[a-z]+|[A-Z]+|\d+")
+
+# Language keywords and filler words that match almost every window
+STOPWORDS = {
+    "the", "and", "for", "not", "with", "this", "that", "from", "into", "are", "was", "has",
+    "have", "will", "can", "but", "its", "you", "your", "all", "any", "use", "used", "then",
+    "def", "class", "self", "cls", "return", "import", "none", "true", "false", "elif",
+    "else", "try", "except", "finally", "raise", "lambda", "pass", "async", "await", "yield",
+    "const", "let", "var", "function", "new", "null", "undefined", "export", "default",
+    "extends", "implements", "interface", "type", "public", "private", "protected", "static",
+    "void", "int", "str", "string", "bool", "boolean", "func", "package", "struct", "impl",
+    "pub", "mut", "mod", "crate", "super", "err", "nil", "if", "in", "is", "of", "or", "to",
+    "as", "at", "be", "by", "do", "go", "it", "no", "on", "fn",
+}
+
+
+def split_identifier(word: str) -> list[str]:
+    """Lowercase parts of an identifier, plus the whole identifier if compound."""
+    parts = [p.lower() for piece in word.split("_") for p in CAMEL_PATTERN.findall(piece)]
+    whole = word.lower().strip("_")
+    if len(parts) > 1 and whole:
+        parts.append(whole)
+    return parts
+
+
+def tokenize(text: str) -> list[str]:
+    """Index terms of source text or a query."""
+    return [
+        term
+        for word in WORD_PATTERN.findall(text)
+        for term in split_identifier(word)
+        if len(term) > 1 and term not in STOPWORDS and not term.isdigit()
+    ]
+
+
+def shard_of(term: str) -> int:
+    """Shard number holding a term's postings."""
+    return zlib.crc32(term.encode()) % SHARD_COUNT
+
+
+def skips_dir(name: str) -> bool:
+    """Whether the index leaves out a directory and everything below it."""
+    return (
+        name in IGNORED_DIRS
+        or name in VENDORED_DIRS
+        or (name.startswith(".") and name not in INDEXED_HIDDEN_DIRS)
+    )
+
+
+def indexed_stat(path: str, name: str) -> os.stat_result | None:
+    """Stat of a file the index covers, or None if it is not indexed."""
+    if name not in INDEXED_NAMES and os.path.splitext(name)[1] not in INDEXED_EXTENSIONS:
+        return None
+    if name in EXCLUDED_NAMES or GENERATED_NAME_PATTERN.search(name):
+        return None
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+    return stat if stat.st_size <= MAX_INDEXED_BYTES else None
+
+
+def iter_indexed_files(repo: Path):
+    """Yield (relative path, stat) for every file the index covers."""
+    for root, dirs, files in os.walk(repo):
+        dirs[:] = [d for d in dirs if not skips_dir(d)]
+        for name in files:
+            path = os.path.join(root, name)
+            stat = indexed_stat(path, name)
+            if stat:
+                yield Path(path).relative_to(repo).as_posix(), stat
+
+
+def chunk_file(file: Path) -> list[tuple[int, int, Counter]]:
+    """Split a file into (start, end, term counts) windows of CHUNK_LINES lines."""
+    try:
+        lines = file.read_text(encoding="utf-8", errors="ignore").splitlines()
+    except OSError:
+        return []
+    chunks = []
+    for start in range(0, len(lines), CHUNK_LINES):
+        window = lines[start : start + CHUNK_LINES]
+        chunks.append((start + 1, start + len(window), Counter(tokenize("\n".join(window)))))
+    return chunks
+
+
+def empty_meta() -> dict:
+    """Metadata of an empty index."""
+    return {
+        "version": INDEX_VERSION,
+        "chunk_lines": CHUNK_LINES,
+        "next_id": 0,
+        "files": {},
+        "live_chunks": 0,
+        "dead_chunks": 0,
+        "total_length": 0,
+    }
+
+
+def update_retrieval_index(repo: Path, current: dict | None = None) -> dict:
+    """Bring the BM25 index up to date with the working tree.
+
+    `current` maps relative paths to stats of the indexed files when the
+    caller has already walked the tree; otherwise the tree is walked here.
+    Returns counts of indexed files and chunks, and of files added or
+    re-indexed, removed, and whether the index was rebuilt.
+    """
+    index_dir = repo / RETRIEVAL_DIR
+    meta_file = index_dir / "meta.json"
+    with locked(meta_file):
+        meta = read_json(meta_file, None)
+        # A missing or outdated index is rebuilt, clearing any leftover shards
+        fresh = (
+            not meta
+            or meta.get("version") != INDEX_VERSION
+            or meta.get("chunk_lines") != CHUNK_LINES
+        )
+        if fresh:
+            meta = empty_meta()
+        # Ids handed out by a run that died before writing meta.json are never reused
+        meta["next_id"] = max(meta["next_id"], read_json(index_dir / "ids.json", 0))
+        files = meta["files"]
+
+        if current is None:
+            current = dict(iter_indexed_files(repo))
+        stale = [
+            path
+            for path, (_, size, mtime_ns, _) in files.items()
+            if path not in current
+            or current[path].st_size != size
+            or current[path].st_mtime_ns != mtime_ns
+        ]
+        removed = sum(1 for path in stale if path not in current)
+        for path in stale:
+            _, _, _, chunks = files.pop(path)
+            meta["live_chunks"] -= len(chunks)
+            meta["dead_chunks"] += len(chunks)
+            meta["total_length"] -= sum(c[2] for c in chunks)
+
+        total = meta["live_chunks"] + meta["dead_chunks"]
+        rebuild = fresh or meta["dead_chunks"] > COMPACT_RATIO * total
+        if rebuild and not fresh:
+            next_id = meta["next_id"]
+            meta = empty_meta()
+            meta["next_id"] = next_id
+            files = meta["files"]
+        pending = sorted(path for path in current if path not in files)
+
+        if pending:
+            write_json(index_dir / "ids.json", meta["next_id"] + len(pending))
+        postings: dict[int, dict[str, list[str]]] = {}
+        for path in pending:
+            stat = current[path]
+            file_id = meta["next_id"]
+            meta["next_id"] += 1
+            chunks = []
+            for chunk_idx, (start, end, counts) in enumerate(chunk_file(repo / path)):
+                length = sum(counts.values())
+                chunks.append([start, end, length])
+                meta["total_length"] += length
+                for term, tf in counts.items():
+                    postings.setdefault(shard_of(term), {}).setdefault(term, []).append(
+                        f"{file_id}.{chunk_idx}.{tf}"
+                    )
+            meta["live_chunks"] += len(chunks)
+            files[path] = [file_id, stat.st_size, stat.st_mtime_ns, chunks]
+
+        # Postings are appended; entries of tombstoned files are skipped at query time
+        shards = range(SHARD_COUNT) if rebuild else sorted(postings)
+        for shard in shards:
+            shard_file = index_dir / f"shard-{shard:02d}.json"
+            existing = {} if rebuild else read_json(shard_file, {})
+            for term, entries in postings.get(shard, {}).items():
+                added = " ".join(entries)
+                existing[term] = f"{existing[term]} {added}" if term in existing else added
+            write_json(shard_file, existing, indent=None)
+
+        if stale or pending or rebuild:
+            write_json(meta_file, meta, indent=None)
+
+    return {
+        "files": len(files),
+        "chunks": meta["live_chunks"],
+        "indexed": len(pending),
+        "removed": removed,
+        "rebuilt": rebuild,
+    }
+
+
+def search_code(
+    repo: Path,
+    query: str,
+    top_k: int = 10,
+    include: str | None = None,
+    exclude: str | None = None,
+    meta: dict | None = None,
+) -> list[dict]:
+    """Rank indexed windows against a query with BM25.
+
+    `include` and `exclude` restrict results to, or away from, paths under a
+    directory. Returns [] when no index has been built.
+    """
+    index_dir = repo / RETRIEVAL_DIR
+    if meta is None:
+        meta = read_json(index_dir / "meta.json", None)
+    if not meta or not meta["live_chunks"]:
+        return []
+
+    by_id = {entry[0]: (path, entry[3]) for path, entry in meta["files"].items()}
+    include = include.rstrip("/") + "/" if include else None
+    exclude = exclude.rstrip("/") + "/" if exclude else None
+    eligible = {
+        file_id: chunks
+        for file_id, (path, chunks) in by_id.items()
+        if not (include and not path.startswith(include))
+        and not (exclude and path.startswith(exclude))
+    }
+    n_chunks = meta["live_chunks"]
+    avg_length = meta["total_length"] / n_chunks or 1.0
+    has_tombstones = meta["dead_chunks"] > 0
+
+    shards: dict[int, dict] = {}
+    scores: dict[tuple[int, int], float] = {}
+    for term in set(tokenize(query)):
+        shard = shard_of(term)
+        if shard not in shards:
+            shards[shard] = read_json(index_dir / f"shard-{shard:02d}.json", {})
+        encoded = shards[shard].get(term)
+        if not encoded:
+            continue
+        numbers = list(map(int, encoded.replace(".", " ").split(" ")))
+        postings = zip(numbers[0::3], numbers[1::3], numbers[2::3])
+        if has_tombstones:
+            postings = [p for p in postings if p[0] in by_id]
+        else:
+            postings = list(postings)
+        if not postings:
+            continue
+        idf = math.log(1 + (n_chunks - len(postings) + 0.5) / (len(postings) + 0.5))
+        for file_id, chunk_idx, tf in postings:
+            chunks = eligible.get(file_id)
+            if chunks is None:
+                continue
+            norm = BM25_K1 * (1 - BM25_B + BM25_B * chunks[chunk_idx][2] / avg_length)
+            key = (file_id, chunk_idx)
+            scores[key] = scores.get(key, 0.0) + idf * tf * (BM25_K1 + 1) / (tf + norm)
+
+    ranked = sorted(scores.items(), key=lambda item: -item[1])[:top_k]
+    results = []
+    for (file_id, chunk_idx), score in ranked:
+        path, chunks = by_id[file_id]
+        start, end, _ = chunks[chunk_idx]
+        results.append({"path": path, "start": start, "end": end, "score": round(score, 3)})
+    return results
+
+
+def search_snippets(
+    repo: Path,
+    query: str,
+    budget_tokens: int,
+    top_k: int = 10,
+    include: str | None = None,
+    exclude: str | None = None,
+    seen: set | None = None,
+    meta: dict | None = None,
+) -> list[dict]:
+    """Best-matching windows with numbered lines, within a token budget.
+
+    Windows already in `seen` (a set of (path, start)) are skipped, and the
+    returned ones are added to it, so several queries can share one budget
+    without repeating code.
+    """
+    if seen is None:
+        seen = set()
+    snippets = []
+    used = 0
+    for hit in search_code(repo, query, top_k * 2, include, exclude, meta):
+        if len(snippets) >= top_k or (hit["path"], hit["start"]) in seen:
+            continue
+        try:
+            lines = (repo / hit["path"]).read_text(encoding="utf-8", errors="ignore").splitlines()
+        except OSError:
+            continue
+        window = lines[hit["start"] - 1 : hit["end"]]
+        content = number_lines(window, list(range(hit["start"], hit["start"] + len(window))))
+        tokens = estimate_tokens(content)
+        if used + tokens > budget_tokens:
+            continue
+        used += tokens
+        seen.add((hit["path"], hit["start"]))
+        snippets.append({**hit, "content": content})
+    return snippets
+
+
+def load_retrieval_meta(repo: Path) -> dict | None:
+    """Index metadata, for callers running several queries in a row."""
+    return read_json(repo / RETRIEVAL_DIR / "meta.json", None)
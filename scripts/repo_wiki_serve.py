@@ -0,0 +1,533 @@
+"""
+Repo Wiki Serve - Warm wiki indexes behind a local JSON-RPC API.
+
+WikiIndex loads the code index, a symbol table of component sources, a
+reverse citation index (cited file -> pages) and per-page validation results
+once. Afterwards it refreshes incrementally from filesystem events (inotify,
+FSEvents, ... through the optional watchdog package): only the files named by
+events are re-read, and the pages that cite them re-validated. Without
+watchdog it falls back to polling, which stats the tracked files on every poll
+and discovers new files with a periodic full scan. Requests are JSON-RPC 2.0,
+over loopback HTTP (POST /) or a Unix socket (one request per line).
+"""
+
+import json
+import os
+import re
+import socketserver
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Callable
+from urllib.parse import urlsplit
+
+from repo_wiki_context import (
+    IGNORED_DIRS,
+    SOURCE_EXTENSIONS,
+    SYMBOL_PATTERNS,
+    iter_candidate_files,
+    outline_file,
+)
+from repo_wiki_store import read_json
+from repo_wiki_validate import check_page
+
+try:
+    from watchdog.events import FileSystemEventHandler
+    from watchdog.observers import Observer
+except ImportError:  # watch() polls instead
+    FileSystemEventHandler = object
+    Observer = None
+
+WATCHES_EVENTS = Observer is not None
+
+CODE_INDEX = ".repo_wiki/code_index.json"
+
+# Either variant may exist, depending on REPO_WIKI_COMPRESS when it was written
+CODE_INDEX_FILES = (CODE_INDEX, CODE_INDEX + ".gz")
+
+# New files and pages are discovered on every Nth poll; other polls only stat known files
+FULL_SCAN_EVERY = 30
+
+# Events are collected this long after the first one, so a checkout or a save
+# that touches many files is applied as one refresh
+EVENT_SETTLE = 0.05
+
+# Name of the symbol defined on an outline line
+SYMBOL_NAME = re.compile(
+    r"\b(?:def|class|func|type|fn|struct|enum|trait|mod|interface|record|function\*?|const|let)"
+    r"\s+(?:\([^)]*\)\s*)?(\w+)"
+    r"|(\w+)\s*\("
+)
+
+# Same page rules as the detect command
+OVERVIEW_PAGES = ["docs/index.md", "docs/architecture/overview.md"]
+CONFIG_FILES = ["package.json", "requirements.txt", "Dockerfile", "docker-compose.yml"]
+CONFIG_PAGES = ["docs/getting-started/local-dev.md", "docs/operations/build-and-test.md"]
+
+# JSON-RPC 2.0 error codes
+PARSE_ERROR = -32700
+INVALID_REQUEST = -32600
+METHOD_NOT_FOUND = -32601
+INVALID_PARAMS = -32602
+INTERNAL_ERROR = -32603
+
+# Hosts the HTTP listener answers to; anything else is a DNS-rebinding attempt
+LOOPBACK_HOSTS = {"127.0.0.1", "localhost"}
+
+
+class EventCollector(FileSystemEventHandler):
+    """Collects the repository-relative paths named by filesystem events."""
+
+    def __init__(self, repo: Path):
+        super().__init__()
+        self.repo = repo
+        self.lock = threading.Lock()
+        self.ready = threading.Event()
+        self.paths: set[str] = set()
+        self.rescan = False
+
+    def on_any_event(self, event) -> None:
+        # A directory's own mtime changes with every file event inside it
+        if event.event_type in ("opened", "closed", "closed_no_write") or (
+            event.is_directory and event.event_type == "modified"
+        ):
+            return
+        rels = []
+        for path in (event.src_path, getattr(event, "dest_path", "")):
+            if not path:
+                continue
+            rel = Path(os.path.relpath(os.fsdecode(path), self.repo)).as_posix()
+            if rel != ".." and not rel.startswith(("../", ".git/")):
+                rels.append(rel)
+        if not rels:
+            return
+        with self.lock:
+            # A moved or deleted directory stands for every file below it
+            if event.is_directory and event.event_type in ("moved", "deleted", "created"):
+                self.rescan = True
+            else:
+                self.paths.update(rels)
+        self.ready.set()
+
+    def drain(self) -> tuple[set[str], bool]:
+        """Take the collected paths and whether a full rescan is needed."""
+        with self.lock:
+            paths, rescan = self.paths, self.rescan
+            self.paths, self.rescan = set(), False
+            self.ready.clear()
+        return paths, rescan
+
+
+class WikiIndex:
+    """In-memory wiki state for one repository, refreshed from file changes."""
+
+    def __init__(self, repo: Path):
+        self.repo = repo
+        self.lock = threading.RLock()
+        self.code_index: dict = {}
+        self.stats: dict[str, tuple[int, int]] = {}
+        self.contents: dict[str, str] = {}
+        self.pages: dict[str, dict] = {}
+        self.cited_by: dict[str, dict[str, list[list[int]]]] = {}
+        self.symbols: dict[str, list[dict]] = {}
+        self.file_symbols: dict[str, list[str]] = {}
+        self.line_counts: dict[str, int] = {}
+        self.refreshed_at = 0.0
+        self.refresh(full=True)
+
+    def rel(self, path: str) -> str:
+        """Normalize a client-supplied path to a repository-relative POSIX path."""
+        p = Path(path)
+        if p.is_absolute():
+            p = p.resolve().relative_to(self.repo)
+        return p.as_posix().removeprefix("./")
+
+    def discover(self) -> set[str]:
+        """All files worth tracking: docs pages, component sources and the code index."""
+        paths = set(CODE_INDEX_FILES)
+        docs_dir = self.repo / "docs"
+        if docs_dir.exists():
+            paths.update(p.relative_to(self.repo).as_posix() for p in docs_dir.rglob("*.md"))
+        for component in self.code_index.get("components", []):
+            component_dir = self.repo / component["path"]
+            if component_dir.exists():
+                paths.update(
+                    f.relative_to(self.repo).as_posix() for f in iter_candidate_files(component_dir)
+                )
+        return paths
+
+    def refresh(self, full: bool = False) -> list[str]:
+        """Re-read tracked files whose size or mtime changed; returns the changed paths."""
+        with self.lock:
+            if full:
+                # The code index decides which components are scanned
+                self.update_stats(CODE_INDEX_FILES)
+            paths = set(self.stats) | set(self.cited_by)
+            if full:
+                paths |= self.discover()
+            changed = self.update_stats(paths)
+            self.apply(changed)
+            # Files cited for the first time were just read by validation
+            self.update_stats(set(self.cited_by) - set(self.stats))
+            self.refreshed_at = time.time()
+            return changed
+
+    def tracks(self, rel: str) -> bool:
+        """Whether a path is, or would be, part of the in-memory indexes."""
+        if rel in self.stats or rel in self.cited_by or rel in CODE_INDEX_FILES:
+            return True
+        if rel.startswith("docs/") and rel.endswith(".md"):
+            return True
+        if Path(rel).suffix not in SOURCE_EXTENSIONS:
+            return False
+        for component in self.code_index.get("components", []):
+            prefix = component["path"].rstrip("/") + "/"
+            if rel.startswith(prefix) and not IGNORED_DIRS.intersection(
+                Path(rel[len(prefix) :]).parts
+            ):
+                return True
+        return False
+
+    def refresh_paths(self, paths) -> list[str]:
+        """Re-read only the given paths (from filesystem events); returns the changed ones."""
+        with self.lock:
+            changed = self.update_stats(p for p in paths if self.tracks(p))
+            if any(rel in CODE_INDEX_FILES for rel in changed):
+                # New components bring files that were never tracked
+                changed += self.refresh(full=True)
+                return sorted(set(changed))
+            self.apply(changed)
+            self.update_stats(set(self.cited_by) - set(self.stats))
+            self.refreshed_at = time.time()
+            return changed
+
+    def update_stats(self, paths) -> list[str]:
+        """Record current stats and return the paths whose stats differ."""
+        changed = []
+        for rel in sorted(paths):
+            try:
+                st = os.stat(self.repo / rel)
+                stat = (st.st_size, st.st_mtime_ns)
+            except OSError:
+                stat = None
+            if self.stats.get(rel) == stat:
+                continue
+            if stat is None:
+                self.stats.pop(rel)
+            else:
+                self.stats[rel] = stat
+            changed.append(rel)
+            if rel in CODE_INDEX_FILES:
+                self.code_index = read_json(self.repo / CODE_INDEX, {})
+        return changed
+
+    def apply(self, changed: list[str]) -> None:
+        """Update the indexes for changed files and re-validate affected pages."""
+        revalidate = set()
+        pages_added_or_removed = False
+        for rel in changed:
+            self.line_counts.pop(str(self.repo / rel), None)
+            if rel.startswith("docs/") and rel.endswith(".md"):
+                existed = rel in self.pages
+                self.load_page(rel)
+                pages_added_or_removed |= existed != (rel in self.pages)
+            elif Path(rel).suffix in SYMBOL_PATTERNS:
+                self.load_symbols(rel)
+            revalidate.update(self.cited_by.get(rel, {}))
+
+        # Link checks depend on which pages exist
+        if pages_added_or_removed:
+            revalidate.update(self.pages)
+        for page in revalidate - set(changed):
+            self.check(page)
+
+    def load_page(self, page: str) -> None:
+        """(Re)read a docs page, or forget it if it was deleted."""
+        try:
+            content = (self.repo / page).read_text(errors="ignore")
+        except OSError:
+            content = None
+        self.unindex_page(page)
+        if content is None:
+            self.contents.pop(page, None)
+            self.pages.pop(page, None)
+            return
+        self.contents[page] = content
+        self.check(page)
+
+    def unindex_page(self, page: str) -> None:
+        """Drop a page's entries from the reverse citation index."""
+        for filepath in {c[0] for c in self.pages.get(page, {}).get("citations", [])}:
+            pages = self.cited_by.get(filepath, {})
+            pages.pop(page, None)
+            if not pages:
+                self.cited_by.pop(filepath, None)
+
+    def check(self, page: str) -> None:
+        """Validate a loaded page and index its citations."""
+        self.unindex_page(page)
+        result = check_page(self.repo, self.repo / page, self.contents[page], self.line_counts)
+        self.pages[page] = result
+        for filepath, start, end in result["citations"]:
+            self.cited_by.setdefault(filepath, {}).setdefault(page, []).append([start, end])
+
+    def load_symbols(self, rel: str) -> None:
+        """(Re)build the symbol table entries of one source file."""
+        for name in self.file_symbols.pop(rel, []):
+            entries = [e for e in self.symbols.get(name, []) if e["path"] != rel]
+            if entries:
+                self.symbols[name] = entries
+            else:
+                self.symbols.pop(name, None)
+
+        try:
+            with open(self.repo / rel, errors="ignore") as f:
+                lines = f.read().splitlines()
+        except OSError:
+            return
+        names = []
+        for line, number in zip(*outline_file(lines, Path(rel).suffix)):
+            match = SYMBOL_NAME.search(line)
+            if not match:
+                continue
+            name = match.group(1) or match.group(2)
+            self.symbols.setdefault(name, []).append(
+                {"path": rel, "line": number, "definition": line.strip()}
+            )
+            names.append(name)
+        self.file_symbols[rel] = names
+
+    def watch(
+        self,
+        interval: float,
+        stop: threading.Event,
+        on_change: Callable[[list[str]], None] | None = None,
+    ) -> None:
+        """Apply file changes until `stop` is set.
+
+        Uses filesystem events when watchdog is installed; otherwise polls every
+        `interval` seconds.
+        """
+        if not WATCHES_EVENTS:
+            self.poll(interval, stop, on_change)
+            return
+
+        collector = EventCollector(self.repo)
+        observer = Observer()
+        observer.schedule(collector, str(self.repo), recursive=True)
+        observer.start()
+        try:
+            while not stop.is_set():
+                if not collector.ready.wait(interval):
+                    continue
+                stop.wait(EVENT_SETTLE)
+                paths, rescan = collector.drain()
+                changed = self.refresh(full=True) if rescan else self.refresh_paths(paths)
+                if changed and on_change:
+                    on_change(changed)
+        finally:
+            observer.stop()
+            observer.join()
+
+    def poll(
+        self,
+        interval: float,
+        stop: threading.Event,
+        on_change: Callable[[list[str]], None] | None = None,
+    ) -> None:
+        """Poll for changes until `stop` is set."""
+        polls = 0
+        while not stop.wait(interval):
+            polls += 1
+            changed = self.refresh(full=polls % FULL_SCAN_EVERY == 0)
+            if changed and on_change:
+                on_change(changed)
+
+    # JSON-RPC methods
+
+    def pages_citing(self, path: str) -> list[dict]:
+        """Pages citing a file, with the cited line ranges."""
+        with self.lock:
+            pages = self.cited_by.get(self.rel(path), {})
+            return [{"page": page, "ranges": ranges} for page, ranges in sorted(pages.items())]
+
+    def validate_page(self, page: str) -> dict:
+        """Current validation result of one page."""
+        rel = self.rel(page)
+        if not rel.startswith("docs/"):
+            rel = f"docs/{rel}"
+        with self.lock:
+            if rel not in self.pages:
+                raise ValueError(f"unknown page: {page}")
+            result = self.pages[rel]
+            return {
+                "page": rel,
+                "ok": not result["errors"],
+                "errors": result["errors"],
+                "warnings": result["warnings"],
+                "citations": len(result["citations"]),
+                "valid_citations": result["valid_citations"],
+            }
+
+    def impact(self, paths: list[str]) -> dict[str, list[str]]:
+        """Pages affected by changes to the given paths, with the reasons."""
+        impacted: dict[str, list[str]] = {}
+
+        def add(page: str, reason: str) -> None:
+            impacted.setdefault(page, []).append(reason)
+
+        with self.lock:
+            components = self.code_index.get("components", [])
+            for path in paths:
+                rel = self.rel(path)
+                for page in self.cited_by.get(rel, {}):
+                    add(page, f"cites {rel}")
+                in_component = False
+                for component in components:
+                    prefix = component["path"].rstrip("/") + "/"
+                    if rel == component["path"] or rel.startswith(prefix):
+                        in_component = True
+                        add(f"docs/components/{component['name']}.md", f"{rel} is in {component['name']}")
+                if not (self.repo / rel).exists():
+                    for page in OVERVIEW_PAGES:
+                        add(page, f"{rel} was deleted")
+                elif in_component and rel not in self.stats:
+                    for page in OVERVIEW_PAGES:
+                        add(page, f"{rel} is a new file")
+                if any(rel.endswith(config) for config in CONFIG_FILES):
+                    for page in CONFIG_PAGES:
+                        add(page, f"{rel} is a config file")
+        return dict(sorted(impacted.items()))
+
+    def symbol(self, name: str) -> list[dict]:
+        """Definitions of a symbol across component sources."""
+        with self.lock:
+            return list(self.symbols.get(name, []))
+
+    def status(self) -> dict:
+        """Sizes of the in-memory indexes and the overall validation state."""
+        with self.lock:
+            return {
+                "repo": str(self.repo),
+                "pages": len(self.pages),
+                "pages_with_errors": sum(1 for r in self.pages.values() if r["errors"]),
+                "tracked_files": len(self.stats),
+                "cited_files": len(self.cited_by),
+                "symbols": len(self.symbols),
+                "refreshed_at": self.refreshed_at,
+            }
+
+    def methods(self) -> dict[str, Callable]:
+        """JSON-RPC method table."""
+        return {
+            "pages_citing": self.pages_citing,
+            "validate_page": self.validate_page,
+            "impact": self.impact,
+            "symbol": self.symbol,
+            "status": self.status,
+            "refresh": lambda full=False: {"changed": self.refresh(full)},
+        }
+
+
+def rpc_error(request_id, code: int, message: str) -> dict:
+    """A JSON-RPC error response."""
+    return {"jsonrpc": "2.0", "id": request_id, "error": {"code": code, "message": message}}
+
+
+def handle_request(wiki: WikiIndex, request) -> dict | None:
+    """Dispatch one JSON-RPC request; notifications (no id) get no response."""
+    if not isinstance(request, dict) or not isinstance(request.get("method"), str):
+        return rpc_error(None, INVALID_REQUEST, "Invalid Request")
+    request_id = request.get("id")
+    method = wiki.methods().get(request["method"])
+    if method is None:
+        return rpc_error(request_id, METHOD_NOT_FOUND, f"Method not found: {request['method']}")
+
+    params = request.get("params", {})
+    try:
+        result = method(**params) if isinstance(params, dict) else method(*params)
+    except (TypeError, ValueError) as e:
+        return rpc_error(request_id, INVALID_PARAMS, str(e))
+    except Exception as e:
+        # e.g. a page deleted while it was being read; the daemon keeps serving
+        return rpc_error(request_id, INTERNAL_ERROR, f"Internal error: {e}")
+
+    if "id" not in request:
+        return None
+    return {"jsonrpc": "2.0", "id": request_id, "result": result}
+
+
+def handle_payload(wiki: WikiIndex, payload: bytes) -> bytes | None:
+    """Handle a raw JSON-RPC request or batch and return the encoded response."""
+    try:
+        request = json.loads(payload)
+    except ValueError:
+        return json.dumps(rpc_error(None, PARSE_ERROR, "Parse error")).encode()
+
+    if isinstance(request, list):
+        responses = [r for r in (handle_request(wiki, item) for item in request) if r]
+        return json.dumps(responses).encode() if responses else None
+    response = handle_request(wiki, request)
+    return json.dumps(response).encode() if response else None
+
+
+def is_loopback(host: str | None) -> bool:
+    """Whether a Host header (or Origin netloc) names this machine's loopback."""
+    if not host:
+        return False
+    name, _, port = host.rpartition(":")
+    if not name or not port.isdigit():
+        name = host
+    return name.lower() in LOOPBACK_HOSTS
+
+
+def make_http_server(wiki: WikiIndex, port: int) -> ThreadingHTTPServer:
+    """JSON-RPC over HTTP POST on the loopback interface, with keep-alive."""
+
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+        # Headers and body are separate writes; Nagle would delay the body ~40ms
+        disable_nagle_algorithm = True
+
+        def do_POST(self):
+            if not is_loopback(self.headers.get("Host")) or (
+                "Origin" in self.headers and not is_loopback(urlsplit(self.headers["Origin"]).netloc)
+            ):
+                # Web pages can reach loopback ports through DNS rebinding or form posts
+                self.send_error(403, "Only loopback clients are served")
+                return
+            length = int(self.headers.get("Content-Length", 0))
+            body = handle_payload(wiki, self.rfile.read(length)) or b""
+            self.send_response(200 if body else 204)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", port), Handler)
+    server.daemon_threads = True
+    return server
+
+
+def make_unix_server(wiki: WikiIndex, socket_path: Path) -> socketserver.UnixStreamServer:
+    """JSON-RPC over a Unix socket, one request and one response per line."""
+
+    class Handler(socketserver.StreamRequestHandler):
+        def handle(self):
+            for line in self.rfile:
+                if not line.strip():
+                    continue
+                response = handle_payload(wiki, line)
+                if response:
+                    self.wfile.write(response + b"\n")
+                    self.wfile.flush()
+
+    # A socket file left by a previous daemon would make bind fail
+    socket_path.unlink(missing_ok=True)
+    server = socketserver.ThreadingUnixStreamServer(str(socket_path), Handler)
+    server.daemon_threads = True
+    return server
@@ -0,0 +1,418 @@
+"""
+Repo Wiki Store - Concurrency-safe JSON state under .repo_wiki.
+
+Every write goes through a temp file in the same directory, an fsync and an
+atomic rename, so readers never see truncated JSON and need no lock. Writers
+that read-modify-write a shared file (the manifest, the managed-block index,
+caches) hold an advisory lock on a sidecar `<file>.lock` and re-read the file
+under it, so parallel jobs, e.g. one `generate --component` per component,
+merge their updates instead of overwriting each other.
+
+The large documents, code_index.json and manifest.json, are written compactly
+and section by section (write_json_stream), gzipped as `<file>.gz` when
+REPO_WIKI_COMPRESS is set, and can be read one section member at a time
+(iter_json_items) so memory does not grow with the size of the wiki.
+
+Generated pages and init's files are written only when they change beyond
+their date stamps (write_text_if_changed, write_json_if_changed), so site
+builds and git diffs only see pages whose content really changed.
+"""
+
+import gzip
+import hashlib
+import io
+import json
+import os
+import re
+import tempfile
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Callable, Iterable
+
+try:
+    import fcntl
+except ImportError:  # Windows: writes stay atomic, but are not serialized
+    fcntl = None
+
+
+MANIFEST = ".repo_wiki/manifest.json"
+CACHE_DIR = ".repo_wiki/cache"
+
+# Points every repository at one cache directory (batch mode shares caches this way)
+SHARED_CACHE_ENV = "REPO_WIKI_CACHE_DIR"
+
+# Gzip code_index.json and manifest.json (stored as <file>.gz)
+COMPRESS_ENV = "REPO_WIKI_COMPRESS"
+GZIP_MAGIC = b"\x1f\x8b"
+
+# Date stamps that change on every run without changing what a page says
+VOLATILE_LINE_PATTERN = re.compile(r"^(last_updated:|\*\*Last updated\*\*:).*$", re.M)
+
+READ_CHUNK = 1 << 16
+_DECODER = json.JSONDecoder()
+_WHITESPACE = re.compile(r"[ \t\r\n]*")
+
+
+@contextmanager
+def locked(path: Path):
+    """Hold an exclusive advisory lock for a state file."""
+    lock_file = path.with_name(path.name + ".lock")
+    lock_file.parent.mkdir(parents=True, exist_ok=True)
+    with open(lock_file, "a") as f:
+        if fcntl:
+            fcntl.flock(f, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            if fcntl:
+                fcntl.flock(f, fcntl.LOCK_UN)
+
+
+def shared_cache_dir() -> Path | None:
+    """The cache directory shared across repositories, if one is configured."""
+    shared = os.environ.get(SHARED_CACHE_ENV)
+    return Path(shared) if shared else None
+
+
+def cache_path(repo: Path, rel_path: str) -> Path:
+    """Resolve a path under .repo_wiki/cache, redirected to the shared cache if set."""
+    shared = shared_cache_dir()
+    if shared is None:
+        return repo / rel_path
+    return shared / Path(rel_path).relative_to(CACHE_DIR)
+
+
+def compress_state() -> bool:
+    """Whether large state documents should be written gzipped."""
+    return os.environ.get(COMPRESS_ENV, "") not in ("", "0")
+
+
+def json_path(path: Path) -> Path:
+    """The file holding a JSON document: `path`, or `path.gz` if only that exists."""
+    if not path.exists():
+        compressed = path.with_name(path.name + ".gz")
+        if compressed.exists():
+            return compressed
+    return path
+
+
+def open_json(path: Path):
+    """Open a JSON document for reading as text, transparently un-gzipping it."""
+    real = json_path(path)
+    with open(real, "rb") as f:
+        magic = f.read(2)
+    if magic == GZIP_MAGIC:
+        return gzip.open(real, "rt", encoding="utf-8")
+    return open(real, encoding="utf-8")
+
+
+def read_json(path: Path, default: Any = None) -> Any:
+    """Load a JSON file, or return `default` if it does not exist or is unreadable."""
+    try:
+        with open_json(path) as f:
+            return json.load(f)
+    except (OSError, ValueError, EOFError):
+        return default
+
+
+def atomic_write(path: Path, write: Callable[[Any], None], compress: bool = False) -> None:
+    """Replace a file with text produced by `write(stream)`, optionally gzipped.
+
+    The plain and `.gz` variants never both survive a successful write.
+    """
+    compressed = path.with_name(path.name + ".gz")
+    target, other = (compressed, path) if compress else (path, compressed)
+    target.parent.mkdir(parents=True, exist_ok=True)
+    fd, tmp_name = tempfile.mkstemp(dir=target.parent, prefix=f".{target.name}.", suffix=".tmp")
+    try:
+        # mkstemp creates 0600 files; keep the mode of the file being replaced
+        try:
+            mode = os.stat(target).st_mode & 0o777
+        except OSError:
+            mode = 0o644
+        os.chmod(tmp_name, mode)
+        with os.fdopen(fd, "wb") as raw:
+            if compress:
+                with gzip.GzipFile(fileobj=raw, mode="wb", mtime=0) as gz:
+                    with io.TextIOWrapper(gz, encoding="utf-8", newline="") as f:
+                        write(f)
+            else:
+                f = io.TextIOWrapper(raw, encoding="utf-8", newline="")
+                write(f)
+                f.flush()
+                f.detach()
+            raw.flush()
+            os.fsync(raw.fileno())
+        os.replace(tmp_name, target)
+        other.unlink(missing_ok=True)
+    except BaseException:
+        Path(tmp_name).unlink(missing_ok=True)
+        raise
+
+
+def write_json(path: Path, data: Any, indent: int | None = 2, compress: bool = False) -> None:
+    """Atomically replace a JSON file."""
+    atomic_write(path, lambda f: json.dump(data, f, indent=indent), compress)
+
+
+def content_fingerprint(text: str) -> str:
+    """Hash of a page's text with its volatile date stamps blanked out."""
+    return hashlib.sha256(VOLATILE_LINE_PATTERN.sub(r"\1", text).encode("utf-8")).hexdigest()
+
+
+def read_text(path: Path) -> str | None:
+    """A text file's exact contents, or None if it does not exist or is not UTF-8."""
+    try:
+        with open(path, encoding="utf-8", newline="") as f:
+            return f.read()
+    except (OSError, UnicodeDecodeError):
+        return None
+
+
+def write_text_if_changed(path: Path, content: str) -> bool:
+    """Atomically write a text file unless only its date stamps would change.
+
+    Returns whether the file was written.
+    """
+    existing = read_text(path)
+    if existing is not None and content_fingerprint(existing) == content_fingerprint(content):
+        return False
+    atomic_write(path, lambda f: f.write(content))
+    return True
+
+
+def write_json_if_changed(
+    path: Path,
+    data: dict,
+    volatile: Iterable[str] = (),
+    indent: int | None = 2,
+    compress: bool = False,
+) -> bool:
+    """Atomically write a JSON object unless it differs only in `volatile` keys.
+
+    Returns whether the file was written.
+    """
+    existing = read_json(path, None)
+    if isinstance(existing, dict) and json_path(path).name.endswith(".gz") == compress:
+        skipped = set(volatile)
+        if {k: v for k, v in existing.items() if k not in skipped} == {
+            k: v for k, v in data.items() if k not in skipped
+        }:
+            return False
+    write_json(path, data, indent, compress)
+    return True
+
+
+def write_json_stream(
+    path: Path,
+    fields: dict[str, Any],
+    arrays: dict[str, Iterable[Any]] | None = None,
+    objects: dict[str, Iterable[tuple[str, Any]]] | None = None,
+    compress: bool = False,
+) -> None:
+    """Atomically write a compact JSON object one section member at a time.
+
+    `fields` are written first, then each of `arrays` from an iterable of
+    values and each of `objects` from an iterable of (key, value) pairs, so
+    generators can feed sections without materializing them.
+    """
+
+    def write(f) -> None:
+        dumps = json.JSONEncoder(separators=(",", ":")).encode
+        f.write("{")
+        first = True
+        for key, value in fields.items():
+            f.write(f"{'' if first else ','}{dumps(key)}:{dumps(value)}")
+            first = False
+        for key, values in (arrays or {}).items():
+            f.write(f"{'' if first else ','}{dumps(key)}:[")
+            for i, value in enumerate(values):
+                f.write(f"{',' if i else ''}{dumps(value)}")
+            f.write("]")
+            first = False
+        for key, members in (objects or {}).items():
+            f.write(f"{'' if first else ','}{dumps(key)}:{{")
+            for i, (name, value) in enumerate(members):
+                f.write(f"{',' if i else ''}{dumps(name)}:{dumps(value)}")
+            f.write("}")
+            first = False
+        f.write("}")
+
+    atomic_write(path, write, compress)
+
+
+# Must stay in sync with the standalone copy in repo-wiki/scripts/wiki_json.py,
+# which the skill scripts use to read the same state files.
+class LazyJsonReader:
+    """Walks a JSON document from a text stream one member at a time.
+
+    The read buffer only holds the value being decoded, so memory stays
+    bounded by the largest single member rather than the document.
+    """
+
+    def __init__(self, stream):
+        self.stream = stream
+        self.buf = ""
+        self.pos = 0
+        self.eof = False
+
+    def _fill(self) -> bool:
+        chunk = self.stream.read(READ_CHUNK)
+        if not chunk:
+            self.eof = True
+            return False
+        self.buf = self.buf[self.pos :] + chunk
+        self.pos = 0
+        return True
+
+    def peek(self) -> str:
+        """Next non-whitespace character, or "" at the end of the document."""
+        while True:
+            self.pos = _WHITESPACE.match(self.buf, self.pos).end()
+            if self.pos < len(self.buf) or not self._fill():
+                return self.buf[self.pos : self.pos + 1]
+
+    def expect(self, char: str) -> None:
+        if self.peek() != char:
+            raise ValueError(f"expected {char!r} at offset {self.pos}")
+        self.pos += 1
+
+    def value(self) -> Any:
+        """Decode the next value."""
+        self.peek()
+        while True:
+            try:
+                value, end = _DECODER.raw_decode(self.buf, self.pos)
+                # A number cut off by the buffer end ("12" of "12.5e3") may continue
+                if self.eof or (end < len(self.buf) and self.buf[end] not in ".eE"):
+                    self.pos = end
+                    return value
+            except json.JSONDecodeError:
+                if self.eof:
+                    raise
+            self._fill()
+
+    def skip(self) -> None:
+        """Move past the next value, holding at most one of its members at a time.
+
+        Decoding and dropping members in C is faster than scanning brackets in
+        Python, and memory stays bounded by the largest member.
+        """
+        char = self.peek()
+        if char == "{":
+            for _ in self.members():
+                self.value()
+        elif char == "[":
+            for _ in self.elements():
+                self.value()
+        else:
+            self.value()
+
+    def members(self):
+        """Yield the keys of the next object; the caller consumes each value."""
+        self.expect("{")
+        if self.peek() == "}":
+            self.pos += 1
+            return
+        while True:
+            key = self.value()
+            self.expect(":")
+            yield key
+            char = self.peek()
+            self.pos += 1
+            if char == "}":
+                return
+            if char != ",":
+                raise ValueError(f"expected ',' or '}}' at offset {self.pos}")
+
+    def elements(self):
+        """Yield once per element of the next array; the caller consumes each value."""
+        self.expect("[")
+        if self.peek() == "]":
+            self.pos += 1
+            return
+        while True:
+            yield
+            char = self.peek()
+            self.pos += 1
+            if char == "]":
+                return
+            if char != ",":
+                raise ValueError(f"expected ',' or ']' at offset {self.pos}")
+
+
+def iter_json_items(path: Path, key: str):
+    """Yield the members of one top-level section of a JSON document lazily.
+
+    Object sections yield (name, value) pairs, array sections their values.
+    Other sections are skipped member by member.
+    """
+    with open_json(path) as f:
+        reader = LazyJsonReader(f)
+        for name in reader.members():
+            if name != key:
+                reader.skip()
+                continue
+            if reader.peek() == "{":
+                for member in reader.members():
+                    yield member, reader.value()
+            elif reader.peek() == "[":
+                for _ in reader.elements():
+                    yield reader.value()
+            return
+
+
+def read_json_fields(path: Path, skip: Iterable[str] = ()) -> dict:
+    """Load the top-level fields of a JSON document, skipping the named sections."""
+    skip = set(skip)
+    fields = {}
+    with open_json(path) as f:
+        reader = LazyJsonReader(f)
+        for name in reader.members():
+            if name in skip:
+                reader.skip()
+            else:
+                fields[name] = reader.value()
+    return fields
+
+
+def update_json(
+    path: Path, update: Callable[[Any], Any], default: Any, indent: int | None = 2
+) -> Any:
+    """Read-modify-write a JSON file under its lock and return the written data.
+
+    `update` receives the current content (or `default`) and either mutates it
+    in place and returns None, or returns the replacement.
+    """
+    with locked(path):
+        data = read_json(path, default)
+        replacement = update(data)
+        if replacement is not None:
+            data = replacement
+        write_json(path, data, indent)
+        return data
+
+
+def merge_manifest(repo: Path, pages: dict[str, dict], **fields: Any) -> None:
+    """Merge page entries and top-level fields into manifest.json.
+
+    Pages written by other jobs since this one started are kept. The existing
+    pages are streamed from the old file into the new one, so the manifest is
+    never loaded whole.
+    """
+    path = repo / MANIFEST
+    with locked(path):
+        exists = json_path(path).exists()
+        header = {"schema_version": "1.0"}
+        if exists:
+            header.update(read_json_fields(path, skip=("pages",)))
+        header.update(fields)
+
+        def merged():
+            remaining = dict(pages)
+            if exists:
+                for name, entry in iter_json_items(path, "pages"):
+                    yield name, remaining.pop(name, entry)
+            yield from remaining.items()
+
+        write_json_stream(path, header, objects={"pages": merged()}, compress=compress_state())
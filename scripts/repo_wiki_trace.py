@@ -0,0 +1,177 @@
+"""
+Repo Wiki Trace - Per-phase spans and run telemetry.
+
+Commands wrap their phases in `span(...)`. When tracing is enabled, each
+finished span is written as one JSON line to
+.repo_wiki/logs/trace-<timestamp>-<command>.jsonl with its duration, parent
+span and counters such as files, bytes and tokens. Profiling additionally
+dumps a cProfile file next to the trace. When tracing is disabled, spans cost
+a context-manager call and nothing else.
+"""
+
+import json
+import os
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from datetime import datetime
+from pathlib import Path
+
+LOG_DIR = ".repo_wiki/logs"
+
+# Enable tracing without passing --trace, e.g. in CI
+TRACE_ENV = "REPO_WIKI_TRACE"
+
+# Span attributes summed across runs, and per-request latencies averaged
+COUNTERS = ("files", "bytes", "input_tokens", "output_tokens")
+LATENCIES = ("queue_ms", "ttfb_ms")
+
+
+class Tracer:
+    """Collects spans in memory and writes them to the repository's log directory."""
+
+    def __init__(self):
+        self.enabled = False
+        self.command = ""
+        self.run_id = ""
+        self.repo: Path | None = None
+        self.profiler = None
+        self._spans: list[dict] = []
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._started = 0.0
+
+    def start(self, command: str, profile: bool = False) -> None:
+        """Begin recording spans for a command run."""
+        self.enabled = True
+        self.command = command
+        self.run_id = uuid.uuid4().hex[:12]
+        self._started = time.perf_counter()
+        if profile:
+            import cProfile
+
+            self.profiler = cProfile.Profile()
+            self.profiler.enable()
+
+    def bind_repo(self, repo: Path) -> None:
+        """Set the repository whose log directory receives the trace."""
+        self.repo = repo
+
+    def _stack(self) -> list[str]:
+        if not hasattr(self._local, "stack"):
+            self._local.stack = []
+        return self._local.stack
+
+    @contextmanager
+    def span(self, name: str, **attrs):
+        """Time a phase; the yielded dict can be updated with counters."""
+        if not self.enabled:
+            yield attrs
+            return
+
+        span_id = uuid.uuid4().hex[:8]
+        stack = self._stack()
+        parent = stack[-1] if stack else None
+        stack.append(span_id)
+        started = time.perf_counter()
+        try:
+            yield attrs
+        finally:
+            stack.pop()
+            record = {
+                "run_id": self.run_id,
+                "command": self.command,
+                "span_id": span_id,
+                "parent_id": parent,
+                "name": name,
+                "start_ms": round((started - self._started) * 1000, 3),
+                "duration_ms": round((time.perf_counter() - started) * 1000, 3),
+                "thread": threading.current_thread().name,
+                **attrs,
+            }
+            with self._lock:
+                self._spans.append(record)
+
+    def finish(self) -> Path | None:
+        """Write the collected spans (and profile) and return the trace path."""
+        if not self.enabled:
+            return None
+        self.enabled = False
+        if self.profiler:
+            self.profiler.disable()
+        if self.repo is None:
+            return None
+
+        log_dir = self.repo / LOG_DIR
+        log_dir.mkdir(parents=True, exist_ok=True)
+        stamp = datetime.utcnow().strftime("%Y%m%dT%H%M%SZ")
+        trace_file = log_dir / f"trace-{stamp}-{self.command}-{self.run_id}.jsonl"
+        with open(trace_file, "w") as f:
+            for record in self._spans:
+                f.write(json.dumps(record) + "\n")
+            total = {
+                "run_id": self.run_id,
+                "command": self.command,
+                "name": "run",
+                "start_ms": 0.0,
+                "duration_ms": round((time.perf_counter() - self._started) * 1000, 3),
+            }
+            f.write(json.dumps(total) + "\n")
+
+        if self.profiler:
+            self.profiler.dump_stats(log_dir / f"profile-{stamp}-{self.command}-{self.run_id}.prof")
+        return trace_file
+
+
+TRACER = Tracer()
+
+
+def span(name: str, **attrs):
+    """Time a phase on the process-wide tracer."""
+    return TRACER.span(name, **attrs)
+
+
+def start_tracing(command: str, trace: bool, profile: bool) -> bool:
+    """Enable tracing for this process if requested by flag or environment."""
+    if trace or profile or os.environ.get(TRACE_ENV):
+        TRACER.start(command, profile=profile)
+        return True
+    return False
+
+
+def summarize_traces(repo: Path) -> tuple[int, dict[str, dict]]:
+    """Aggregate all trace files of a repository by span name."""
+    stats: dict[str, dict] = {}
+    runs = set()
+    for trace_file in sorted((repo / LOG_DIR).glob("trace-*.jsonl")):
+        with open(trace_file) as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    continue
+                runs.add(record.get("run_id"))
+                key = f"{record.get('command', '?')}:{record['name']}"
+                entry = stats.setdefault(
+                    key, {"count": 0, "total_ms": 0.0, "max_ms": 0.0, "durations": []}
+                )
+                duration = record.get("duration_ms", 0.0)
+                entry["count"] += 1
+                entry["total_ms"] += duration
+                entry["max_ms"] = max(entry["max_ms"], duration)
+                entry["durations"].append(duration)
+                for counter in COUNTERS:
+                    if isinstance(record.get(counter), int):
+                        entry[counter] = entry.get(counter, 0) + record[counter]
+                for latency in LATENCIES:
+                    if latency in record:
+                        entry.setdefault(latency, []).append(record[latency])
+
+    for entry in stats.values():
+        durations = sorted(entry.pop("durations"))
+        entry["p95_ms"] = durations[min(len(durations) - 1, int(len(durations) * 0.95))]
+        for latency in LATENCIES:
+            if latency in entry:
+                entry[latency] = sum(entry[latency]) / len(entry[latency])
+    return len(runs), stats
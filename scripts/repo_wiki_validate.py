@@ -0,0 +1,88 @@
+"""
+Repo Wiki Validate - Per-page documentation checks.
+
+Checks one page's managed-block markers, citations and internal links. Used
+by the `validate` command for every page and by `serve` to re-validate only
+the pages affected by a change.
+"""
+
+import re
+from pathlib import Path
+
+MANAGED_BEGIN = "<!-- BEGIN:REPO_WIKI_MANAGED -->"
+MANAGED_END = "<!-- END:REPO_WIKI_MANAGED -->"
+
+# Plain citations (`path` L1-L9) and the links generate_permalinks turns them into
+CITATION_PATTERN = re.compile(
+    r"`([^`]+)`\s+L(\d+)-L?(\d+)|\[([^\]#]+)#L(\d+)-L(\d+)\]\([^)]*\)"
+)
+LINK_PATTERN = re.compile(r"\[([^\]]+)\]\(([^)]+\.md)\)")
+
+
+def count_lines(file: Path, line_counts: dict[str, int] | None = None) -> int:
+    """Number of lines in a file, memoized in `line_counts` when given."""
+    key = str(file)
+    if line_counts is not None and key in line_counts:
+        return line_counts[key]
+    with open(file, "rb") as f:
+        count = sum(1 for _ in f)
+    if line_counts is not None:
+        line_counts[key] = count
+    return count
+
+
+def check_page(
+    repo: Path, md_file: Path, content: str, line_counts: dict[str, int] | None = None
+) -> dict:
+    """Validate one page.
+
+    Returns its errors, warnings, parsed citations as (filepath, start, end)
+    and the number of citations that point at valid line ranges.
+    """
+    rel_path = md_file.relative_to(repo)
+    errors = []
+    warnings = []
+
+    # Check managed blocks
+    begin_count = content.count(MANAGED_BEGIN)
+    end_count = content.count(MANAGED_END)
+    if begin_count != end_count:
+        errors.append(f"{rel_path}: Mismatched managed blocks (BEGIN: {begin_count}, END: {end_count})")
+
+    # Check citations
+    citations = [
+        (m.group(1) or m.group(4), int(m.group(2) or m.group(5)), int(m.group(3) or m.group(6)))
+        for m in CITATION_PATTERN.finditer(content)
+    ]
+    valid_citations = 0
+    for filepath, start, end in citations:
+        target_file = repo / filepath
+        if not target_file.exists():
+            errors.append(f"{rel_path}: Citation references missing file: {filepath}")
+            continue
+        try:
+            line_count = count_lines(target_file, line_counts)
+        except Exception as e:
+            warnings.append(f"{rel_path}: Could not validate {filepath}: {e}")
+            continue
+        if start > line_count or end > line_count:
+            errors.append(
+                f"{rel_path}: Citation {filepath} L{start}-L{end} invalid "
+                f"(file has {line_count} lines)"
+            )
+        else:
+            valid_citations += 1
+
+    # Check internal links
+    for link_text, link_target in LINK_PATTERN.findall(content):
+        if link_target.startswith("http"):
+            continue
+        if not (md_file.parent / link_target).exists():
+            warnings.append(f"{rel_path}: Broken link to '{link_target}'")
+
+    return {
+        "errors": errors,
+        "warnings": warnings,
+        "citations": citations,
+        "valid_citations": valid_citations,
+    }
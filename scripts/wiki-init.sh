@@ -19,13 +19,8 @@ echo ""
 echo "Repository: $REPO_PATH"
 echo ""
 
-# Run CLI init
-echo "Step 1: Creating wiki structure..."
-uv run "$SCRIPT_DIR/repo_wiki_cli.py" init "$REPO_PATH"
-
-echo ""
-echo "Step 2: Indexing codebase..."
-uv run "$SCRIPT_DIR/repo_wiki_cli.py" index "$REPO_PATH"
+# Create the wiki structure and index the codebase in one process
+uv run "$SCRIPT_DIR/repo_wiki_cli.py" pipeline "$REPO_PATH" --steps init,index
 
 echo ""
 echo "========================================="
@@ -26,16 +26,31 @@ if [ ! -d "$REPO_PATH/.repo_wiki" ]; then
     exit 1
 fi
 
-# Run CLI detect
-echo "Step 1: Detecting changes..."
-uv run "$SCRIPT_DIR/repo_wiki_cli.py" detect "$REPO_PATH"
+# One process runs every step, instead of one uv start-up per step
+if [ -n "$ANTHROPIC_API_KEY" ]; then
+    uv run "$SCRIPT_DIR/repo_wiki_cli.py" pipeline "$REPO_PATH" \
+        --steps index,detect,generate,validate,permalinks
+
+    echo ""
+    echo "========================================="
+    echo "✅ Documentation updated!"
+    echo "========================================="
+    echo ""
+    echo "Review the changes:"
+    echo "    git -C $REPO_PATH diff docs/"
+    echo ""
+    exit 0
+fi
+
+# Without an API key the content is updated in Cursor, so only detect here
+uv run "$SCRIPT_DIR/repo_wiki_cli.py" pipeline "$REPO_PATH" --steps index,detect
 
 echo ""
 echo "========================================="
 echo "✅ Change detection complete!"
 echo "========================================="
 echo ""
-echo "Next steps:"
+echo "Next steps (set ANTHROPIC_API_KEY to generate pages in this script instead):"
 echo ""
 echo "  Option A: Use Cursor AI to update content"
 echo "    1. Open the repository in Cursor"
@@ -26,8 +26,8 @@ if [ ! -d "$REPO_PATH/docs" ]; then
     exit 1
 fi
 
-# Run CLI validate
-uv run "$SCRIPT_DIR/repo_wiki_cli.py" validate "$REPO_PATH"
+# Validate and convert citations to permalinks in one process
+uv run "$SCRIPT_DIR/repo_wiki_cli.py" pipeline "$REPO_PATH" --steps validate,permalinks
 
 # Try mkdocs build if available
 echo ""
@@ -0,0 +1,18 @@
+"""Make the script modules and standalone helpers importable the way the CLI does."""
+
+import sys
+from pathlib import Path
+
+import pytest
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT / "scripts"))
+sys.path.insert(0, str(ROOT / "repo-wiki/scripts"))
+sys.path.insert(0, str(ROOT / "benchmarks"))
+
+
+@pytest.fixture(autouse=True)
+def isolated_state(monkeypatch):
+    """Keep caches and state in each test's repository, uncompressed."""
+    monkeypatch.delenv("REPO_WIKI_CACHE_DIR", raising=False)
+    monkeypatch.delenv("REPO_WIKI_COMPRESS", raising=False)
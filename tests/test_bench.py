@@ -0,0 +1,32 @@
+"""Benchmark harness measurements and baseline comparison."""
+
+import pytest
+from bench_repo_wiki import compare, run_measured
+
+
+def test_peak_rss_is_the_childs_own(tmp_path):
+    ballast = b"x" * (200 * 1024 * 1024)  # noqa: F841 - raises the harness's high-water mark
+
+    small = run_measured(["-c", "pass"], tmp_path)
+    large = run_measured(["-c", "x = bytes(100 * 1024 * 1024) + b'x'"], tmp_path)
+
+    assert small["exit_code"] == 0
+    assert small["peak_rss_kb"] < 100 * 1024
+    assert large["peak_rss_kb"] - small["peak_rss_kb"] > 90 * 1024
+
+
+def test_exit_code_and_argv_reach_the_target(tmp_path):
+    script = tmp_path / "target.py"
+    script.write_text("import sys\nsys.exit(len(sys.argv))\n")
+
+    assert run_measured([str(script), "a", "b"], tmp_path)["exit_code"] == 3
+
+
+def test_compare_flags_regressions_only_for_matching_params():
+    params = {"files": 2000, "seed": 42}
+    baseline = {"params": params, "results": {"cli.index": {"seconds": 1.0, "peak_rss_kb": 100}}}
+    report = {"params": params, "results": {"cli.index": {"seconds": 1.5, "peak_rss_kb": 110}}}
+
+    assert compare(report, baseline, 1.25) == ["cli.index: seconds 1.0 -> 1.5 (1.50x)"]
+    with pytest.raises(ValueError, match="files"):
+        compare(dict(report, params={"files": 500, "seed": 42}), baseline, 1.25)
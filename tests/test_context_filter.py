@@ -0,0 +1,62 @@
+"""Generated, vendored, minified and duplicate files are kept out of prompts."""
+
+import base64
+import json
+import random
+
+import pytest
+from repo_wiki_context import FINGERPRINT_CACHE, classify_generated, filter_component_files
+
+SOURCE = b"def handler(event):\n    return event\n"
+MOCK = b"// Code generated by mockgen. DO NOT EDIT.\n" + SOURCE
+# Deterministic high-entropy text with no whitespace, like a minified bundle
+MINIFIED = base64.b64encode(random.Random(0).randbytes(6000))
+
+
+@pytest.mark.parametrize(
+    ("rel_path", "data", "reason"),
+    [
+        ("src/app/handler.py", SOURCE, None),
+        ("src/vendor/lib/handler.py", SOURCE, "vendored"),
+        ("src/api/service_pb2.py", SOURCE, "generated (file name)"),
+        ("web/app.min.js", SOURCE, "generated (file name)"),
+        ("src/api/client.go", MOCK, "generated (header marker)"),
+        ("web/bundle.js", MINIFIED, "minified"),
+        # Long lines alone are not enough: ordinary text has too much whitespace
+        ("src/app/data.py", b"x = '" + b"word " * 2000 + b"'\n", None),
+    ],
+)
+def test_classify_generated(rel_path, data, reason):
+    assert classify_generated(rel_path, data) == reason
+
+
+def test_identical_files_collapse_to_the_first_path(tmp_path):
+    for rel in ("apps/web/util.js", "apps/admin/util.js", "apps/web/main.js"):
+        (tmp_path / rel).parent.mkdir(parents=True, exist_ok=True)
+        (tmp_path / rel).write_bytes(SOURCE if rel.endswith("util.js") else b"main()\n")
+    (tmp_path / "apps/web/api_pb.js").write_bytes(SOURCE)
+
+    skip = filter_component_files(tmp_path, ["apps/web", "apps/admin"])
+
+    assert skip == {
+        "apps/web/util.js": "duplicate of apps/admin/util.js",
+        "apps/web/api_pb.js": "generated (file name)",
+    }
+
+
+def test_fingerprints_are_reused_while_size_and_mtime_match(tmp_path):
+    (tmp_path / "svc").mkdir()
+    (tmp_path / "svc/a.py").write_bytes(SOURCE)
+    assert filter_component_files(tmp_path, ["svc"]) == {}
+
+    cache_file = tmp_path / FINGERPRINT_CACHE
+    cache = json.loads(cache_file.read_text())
+    assert cache["svc/a.py"]["size"] == len(SOURCE)
+    # A stale verdict is trusted as long as the file looks unchanged...
+    cache["svc/a.py"]["generated"] = "vendored"
+    cache_file.write_text(json.dumps(cache))
+    assert filter_component_files(tmp_path, ["svc"]) == {"svc/a.py": "vendored"}
+
+    # ...and recomputed once the file changes
+    (tmp_path / "svc/a.py").write_bytes(SOURCE + b"# edited\n")
+    assert filter_component_files(tmp_path, ["svc"]) == {}
@@ -0,0 +1,85 @@
+"""Ranking component files and packing them into a token budget."""
+
+import subprocess
+from pathlib import Path
+
+from repo_wiki_context import estimate_tokens, number_lines, outline_file, pack_context
+
+MAIN = "from helper import run\n\n\ndef main():\n    run()\n"
+HELPER = "def run():\n    return 1\n"
+TEST = "def test_main():\n    assert True\n"
+# Thirty ten-line functions: too big for a small budget, but with a short outline
+BIG = "".join(f"def f{i}():\n" + "    x = 1\n" * 9 for i in range(30))
+
+
+def make_component(repo: Path) -> None:
+    for rel, text in {
+        "svc/main.py": MAIN,
+        "svc/helper.py": HELPER,
+        "svc/tests/test_main.py": TEST,
+        "svc/big.py": BIG,
+    }.items():
+        (repo / rel).parent.mkdir(parents=True, exist_ok=True)
+        (repo / rel).write_text(text)
+
+
+def full_tokens(text: str) -> int:
+    return estimate_tokens(number_lines(text.splitlines()))
+
+
+def test_entrypoints_and_imported_files_rank_first_and_tests_last(tmp_path):
+    make_component(tmp_path)
+
+    packed = pack_context(tmp_path, "svc", skip={})
+
+    assert [f["path"] for f in packed] == [
+        "svc/main.py",
+        "svc/helper.py",
+        "svc/big.py",
+        "svc/tests/test_main.py",
+    ]
+    assert {f["mode"] for f in packed} == {"full"}
+    assert packed[0]["content"].splitlines()[3] == "   4| def main():"
+
+
+def test_files_that_do_not_fit_fall_back_to_outlines(tmp_path):
+    make_component(tmp_path)
+    outline, numbers = outline_file(BIG.splitlines(), ".py")
+    outline_tokens = estimate_tokens(number_lines(outline, numbers))
+    budget = full_tokens(MAIN) + full_tokens(HELPER) + outline_tokens
+
+    packed = {f["path"]: f for f in pack_context(tmp_path, "svc", budget, skip={})}
+
+    assert list(packed) == ["svc/main.py", "svc/helper.py", "svc/big.py"]
+    big = packed["svc/big.py"]
+    assert big["mode"] == "outline"
+    assert big["line_count"] == 300
+    # Outline lines keep their real line numbers, so citations stay valid
+    assert big["content"].splitlines()[:2] == ["   1| def f0():", "  11| def f1():"]
+    assert sum(f["tokens"] for f in packed.values()) == budget
+
+
+def test_skipped_files_are_never_packed(tmp_path):
+    make_component(tmp_path)
+
+    packed = pack_context(tmp_path, "svc", skip={"svc/big.py": "generated"})
+
+    assert "svc/big.py" not in [f["path"] for f in packed]
+
+
+def test_recently_changed_files_rank_higher(tmp_path):
+    for name in ("a.py", "b.py"):
+        (tmp_path / "svc").mkdir(exist_ok=True)
+        (tmp_path / "svc" / name).write_text("def handler():\n    return 0\n")
+    git = ["git", "-c", "user.name=t", "-c", "user.email=t@t"]
+    subprocess.run(["git", "init", "-q"], cwd=tmp_path, check=True)
+    subprocess.run([*git, "add", "."], cwd=tmp_path, check=True)
+    subprocess.run([*git, "commit", "-qm", "add"], cwd=tmp_path, check=True)
+    for i in range(3):
+        (tmp_path / "svc/b.py").write_text(f"def handler():\n    return {i + 1}\n")
+        subprocess.run([*git, "commit", "-qam", f"change {i}"], cwd=tmp_path, check=True)
+
+    packed = pack_context(tmp_path, "svc", skip={})
+
+    assert [f["path"] for f in packed] == ["svc/b.py", "svc/a.py"]
+    assert packed[0]["score"] > packed[1]["score"]
@@ -0,0 +1,59 @@
+"""The standalone managed-block scanner merges into the index under its lock."""
+
+import json
+from pathlib import Path
+
+import detect_managed_blocks as standalone
+import repo_wiki_blocks
+from detect_managed_blocks import INDEX_PATH, detect_managed_blocks, save_index
+
+PAGE = "docs/a.md"
+BLOCK = "# A\n\n<!-- BEGIN:REPO_WIKI_MANAGED -->\nbody\n<!-- END:REPO_WIKI_MANAGED -->\n"
+
+
+def write_index(pages: dict) -> None:
+    Path(INDEX_PATH).parent.mkdir(parents=True, exist_ok=True)
+    Path(INDEX_PATH).write_text(json.dumps({"schema_version": "1.0", "pages": pages}))
+
+
+def test_scan_records_blocks(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    Path("docs").mkdir()
+    Path(PAGE).write_text(BLOCK)
+
+    assert detect_managed_blocks() == 0
+    entry = json.loads(Path(INDEX_PATH).read_text())["pages"][PAGE]
+    assert [(b["start_line"], b["end_line"]) for b in entry["blocks"]] == [(3, 5)]
+
+
+def test_standalone_scanner_matches_the_cli():
+    # Two blocks, then an unterminated BEGIN marker that must be ignored
+    page = BLOCK + "text\n" + BLOCK.replace("body", "other\nlines") + BLOCK.split("body")[0]
+    data = page.encode()
+
+    assert standalone.scan_blocks(data) == repo_wiki_blocks.scan_blocks(data)
+    assert len(standalone.scan_blocks(data)) == 2
+
+
+def test_concurrent_entries_are_kept(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    Path("docs").mkdir()
+    Path(PAGE).write_text(BLOCK)
+    Path("docs/new.md").write_text("# New\n")
+    st = Path(PAGE).stat()
+    # What generate recorded while the scan was running
+    written = {"size": st.st_size, "mtime_ns": st.st_mtime_ns, "blocks": [{"written_hash": "w"}]}
+    write_index({PAGE: written, "docs/new.md": {"blocks": []}, "docs/gone.md": {"blocks": []}})
+
+    scanned = {"size": st.st_size, "mtime_ns": st.st_mtime_ns, "blocks": [{"written_hash": None}]}
+    pages = save_index({PAGE: scanned})
+
+    assert pages == json.loads(Path(INDEX_PATH).read_text())["pages"]
+    assert pages[PAGE] == written
+    assert "docs/new.md" in pages
+    assert "docs/gone.md" not in pages
+    # The index was replaced through a private temp file, not a fixed .tmp name
+    assert sorted(p.name for p in Path(INDEX_PATH).parent.iterdir()) == [
+        "managed_blocks.json",
+        "managed_blocks.json.lock",
+    ]
@@ -0,0 +1,97 @@
+"""Component discovery and change-to-component mapping."""
+
+import json
+import subprocess
+import sys
+from pathlib import Path
+
+from repo_wiki_context import pack_context, split_into_units
+from repo_wiki_discovery import find_components, owning_component, walk_repository
+
+CLI = Path(__file__).resolve().parent.parent / "scripts/repo_wiki_cli.py"
+
+
+def write(root: Path, rel: str, text: str = "") -> None:
+    path = root / rel
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(text)
+
+
+def git(repo: Path, *args: str) -> None:
+    subprocess.run(
+        ["git", "-c", "user.name=t", "-c", "user.email=t@t", *args],
+        cwd=repo,
+        check=True,
+        capture_output=True,
+    )
+
+
+def make_monorepo(repo: Path) -> None:
+    write(repo, "package.json", json.dumps({"workspaces": ["apps/*", "packages/*"]}))
+    write(repo, "apps/foo/package.json", "{}")
+    write(repo, "apps/foo/index.js", "x\n")
+    write(repo, "packages/foo/package.json", "{}")
+    write(repo, "packages/foo/index.js", "x\n")
+    write(repo, "services/billing/go.mod", "module billing\n")
+    write(repo, "services/billing/main.go", "package main\n")
+    write(repo, "services/billing/webhooks/package.json", "{}")
+
+
+def test_nested_projects_form_a_tree(tmp_path):
+    make_monorepo(tmp_path)
+    components = {c["path"]: c for c in find_components(walk_repository(tmp_path))}
+
+    assert components["services/billing"]["stack"] == {"go": True}
+    assert components["services/billing/webhooks"]["parent"] == "services/billing"
+    assert components["apps/foo"]["workspace"] == "."
+    assert components["services/billing"]["workspace"] is None
+    # Colliding directory names are named by path
+    assert components["apps/foo"]["name"] == "apps-foo"
+    assert components["packages/foo"]["name"] == "packages-foo"
+
+
+def test_nested_component_files_stay_out_of_the_parent_page(tmp_path):
+    make_monorepo(tmp_path)
+    write(tmp_path, "services/billing/webhooks/handler.js", "export function handle() {}\n")
+    components = {c["path"]: c for c in find_components(walk_repository(tmp_path))}
+    billing = components["services/billing"]
+    webhooks = components["services/billing/webhooks"]
+
+    assert billing["children"] == ["services/billing/webhooks"]
+    assert webhooks["children"] == []
+    packed = pack_context(tmp_path, billing["path"], nested=billing["children"])
+    assert [f["path"] for f in packed] == ["services/billing/main.go"]
+    units = split_into_units(tmp_path, billing["path"], 1000, nested=billing["children"])
+    assert {u["path"] for u in units} == {"services/billing/main.go"}
+    # The child still packs its own files
+    packed = pack_context(tmp_path, webhooks["path"], nested=webhooks["children"])
+    assert [f["path"] for f in packed] == ["services/billing/webhooks/handler.js"]
+
+
+def test_owning_component_is_the_deepest_match(tmp_path):
+    make_monorepo(tmp_path)
+    components = find_components(walk_repository(tmp_path))
+
+    assert owning_component(components, "services/billing/main.go")["name"] == "billing"
+    assert owning_component(components, "services/billing/webhooks/a.js")["name"] == "webhooks"
+    assert owning_component(components, "README.md") is None
+
+
+def test_detect_maps_changes_to_indexed_components(tmp_path):
+    make_monorepo(tmp_path)
+    git(tmp_path, "init", "-q")
+    git(tmp_path, "add", "-A")
+    git(tmp_path, "commit", "-qm", "initial")
+    for command in ("init", "index"):
+        subprocess.run([sys.executable, str(CLI), command, str(tmp_path)], check=True, capture_output=True)
+
+    write(tmp_path, "services/billing/main.go", "package main\n// changed\n")
+    write(tmp_path, "apps/foo/index.js", "y\n")
+    git(tmp_path, "commit", "-qam", "change")
+    subprocess.run([sys.executable, str(CLI), "detect", str(tmp_path)], check=True, capture_output=True)
+
+    change_set = json.loads((tmp_path / ".repo_wiki/change_set.json").read_text())
+    assert sorted(change_set["affected_components"]) == ["apps-foo", "billing"]
+    assert "docs/components/billing.md" in change_set["impacted_pages"]
+    assert "docs/components/apps-foo.md" in change_set["impacted_pages"]
+    assert "docs/components/foo.md" not in change_set["impacted_pages"]
@@ -0,0 +1,94 @@
+"""Cost and wall-time estimates built from the real generation prompts."""
+
+import re
+import subprocess
+import sys
+from pathlib import Path
+
+import pytest
+from click.testing import CliRunner
+from repo_wiki_llm import (
+    DEFAULT_OUTPUT_TOKENS,
+    FIRST_TOKEN_LATENCY,
+    OUTPUT_TOKENS_PER_SECOND,
+    RESPONSE_CACHE_DIR,
+    build_component_prompt,
+    build_overview_prompt,
+    estimate,
+    estimate_tokens,
+    load_code_index,
+    load_state,
+    projected_wall_time,
+    response_cache_key,
+)
+
+CLI = Path(__file__).resolve().parent.parent / "scripts/repo_wiki_cli.py"
+
+
+@pytest.fixture
+def repo(tmp_path):
+    """An indexed repository with one `api` component."""
+    (tmp_path / "src/api").mkdir(parents=True)
+    (tmp_path / "src/api/main.py").write_text("def main():\n    return 1\n")
+    for command in ("init", "index"):
+        subprocess.run(
+            [sys.executable, str(CLI), command, str(tmp_path)], check=True, capture_output=True
+        )
+    return tmp_path
+
+
+def prompts(repo: Path) -> dict[str, str]:
+    """The prompts generate would send, by page name."""
+    code_index = load_code_index(repo)
+    state = load_state(repo)
+    (component,) = code_index["components"]
+    return {
+        "overview": build_overview_prompt(repo, code_index, state),
+        "api": build_component_prompt(repo, component, state, skip={}),
+    }
+
+
+def totals(output: str) -> tuple[int, int]:
+    input_tokens = re.search(r"Input tokens: ~([\d,]+)", output).group(1)
+    output_tokens = re.search(r"Output tokens: ~([\d,]+)", output).group(1)
+    return int(input_tokens.replace(",", "")), int(output_tokens.replace(",", ""))
+
+
+def test_totals_count_the_exact_prompts(repo):
+    result = CliRunner().invoke(estimate, [str(repo)])
+
+    assert result.exit_code == 0, result.output
+    expected_input = sum(estimate_tokens(p) for p in prompts(repo).values())
+    assert totals(result.output) == (expected_input, 2 * DEFAULT_OUTPUT_TOKENS)
+    assert "Pages: 2 (0 cached)" in result.output
+
+
+def test_cached_and_partial_responses_reduce_the_totals(repo):
+    pages = prompts(repo)
+    cache_dir = repo / RESPONSE_CACHE_DIR
+    cache_dir.mkdir(parents=True)
+    cached = "word " * 400
+    (cache_dir / f"{response_cache_key(pages['overview'])}.md").write_text(cached)
+    partial = "x" * 400
+    (cache_dir / f"{response_cache_key(pages['api'])}.md.part").write_text(partial)
+
+    result = CliRunner().invoke(estimate, [str(repo)])
+
+    # The output guess is now the size of the cached response
+    guess = estimate_tokens(cached)
+    assert totals(result.output) == (
+        estimate_tokens(pages["api"]) + estimate_tokens(partial),
+        guess - estimate_tokens(partial),
+    )
+    assert re.search(r"overview\s+0\s+0  cached", result.output)
+    assert re.search(r"api\s+[\d,]+\s+[\d,]+  resume", result.output)
+    assert "Pages: 2 (1 cached)" in result.output
+
+
+def test_wall_time_packs_jobs_onto_the_pool():
+    latency = FIRST_TOKEN_LATENCY + DEFAULT_OUTPUT_TOKENS / OUTPUT_TOKENS_PER_SECOND
+
+    assert projected_wall_time([latency] * 3, 2) == 2 * latency
+    assert projected_wall_time([latency] * 3, 4) == latency
+    assert projected_wall_time([30.0, 10.0, 10.0, 10.0], 2) == 30.0
+    assert projected_wall_time([], 4) == 0.0
@@ -0,0 +1,84 @@
+"""Streamed JSON state documents read back lazily, plain and gzipped."""
+
+import gzip
+
+import pytest
+import repo_wiki_store
+import wiki_json
+from repo_wiki_store import (
+    GZIP_MAGIC,
+    iter_json_items,
+    json_path,
+    read_json,
+    read_json_fields,
+    write_json_stream,
+)
+
+PAGES = {
+    "docs/a.md": {"citations": [{"file": "src/a.py", "lines": [1, 12]}], "score": 12.5e3},
+    "docs/ü.md": {"citations": [], "note": "quote \" and \\ backslash"},
+    "docs/empty.md": {},
+}
+FILES = [{"path": f"src/f{i}.py", "size": i * 1001, "ratio": i / 7} for i in range(20)]
+
+
+def write_document(path, compress):
+    # Sections come from generators, as `index` feeds them
+    write_json_stream(
+        path,
+        {"schema_version": "1.0", "generated_at": None},
+        arrays={"files": (f for f in FILES), "empty": iter(())},
+        objects={"pages": ((k, v) for k, v in PAGES.items())},
+        compress=compress,
+    )
+
+
+@pytest.mark.parametrize("compress", [False, True])
+def test_round_trip(tmp_path, monkeypatch, compress):
+    # A tiny read buffer splits strings and numbers across refills
+    monkeypatch.setattr(repo_wiki_store, "READ_CHUNK", 7)
+    path = tmp_path / "manifest.json"
+
+    write_document(path, compress)
+
+    assert read_json(path) == {
+        "schema_version": "1.0",
+        "generated_at": None,
+        "files": FILES,
+        "empty": [],
+        "pages": PAGES,
+    }
+    assert dict(iter_json_items(path, "pages")) == PAGES
+    assert list(iter_json_items(path, "files")) == FILES
+    assert list(iter_json_items(path, "empty")) == []
+    assert list(iter_json_items(path, "missing")) == []
+    assert read_json_fields(path, skip=("files", "pages")) == {
+        "schema_version": "1.0",
+        "generated_at": None,
+        "empty": [],
+    }
+
+
+def test_gzip_mode_replaces_the_plain_file_and_back(tmp_path):
+    path = tmp_path / "code_index.json"
+    write_document(path, compress=False)
+
+    write_document(path, compress=True)
+    assert not path.exists()
+    assert json_path(path) == tmp_path / "code_index.json.gz"
+    assert json_path(path).read_bytes()[:2] == GZIP_MAGIC
+    assert gzip.decompress(json_path(path).read_bytes()).startswith(b'{"schema_version":"1.0"')
+
+    write_document(path, compress=False)
+    assert json_path(path) == path
+    assert not (tmp_path / "code_index.json.gz").exists()
+    assert dict(iter_json_items(path, "pages")) == PAGES
+
+
+@pytest.mark.parametrize("compress", [False, True])
+def test_standalone_reader_reads_the_same_documents(tmp_path, compress):
+    path = tmp_path / "manifest.json"
+    write_document(path, compress)
+
+    assert dict(wiki_json.iter_json_items(str(path), "pages")) == PAGES
+    assert list(wiki_json.iter_json_items(str(path), "files")) == FILES
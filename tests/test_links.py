@@ -0,0 +1,177 @@
+"""External link checking against a local stand-in server."""
+
+import json
+import subprocess
+import sys
+import threading
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+import pytest
+from repo_wiki_links import (
+    FAILED_TTL_SECONDS,
+    LINKS_CACHE,
+    MAX_REDIRECTS,
+    check_links,
+    is_broken,
+    is_unknown,
+    parse_rewrites,
+    rewrite_url,
+)
+
+CLI = Path(__file__).resolve().parent.parent / "scripts/repo_wiki_cli.py"
+
+
+class LinkHandler(BaseHTTPRequestHandler):
+    """/gone is 404, /nohead refuses HEAD, /hop/N redirects N times, /busy is 429."""
+
+    protocol_version = "HTTP/1.1"
+    seen: Counter = Counter()
+
+    def log_message(self, *args):
+        pass
+
+    def reply(self, status: int, location: str | None = None) -> None:
+        self.send_response(status)
+        if location:
+            self.send_header("Location", location)
+        self.send_header("Content-Length", "0")
+        self.end_headers()
+
+    def route(self, method: str) -> None:
+        self.seen[(method, self.path)] += 1
+        if self.path == "/gone":
+            self.reply(404)
+        elif self.path == "/nohead":
+            self.reply(405 if method == "HEAD" else 200)
+        elif self.path == "/busy":
+            self.reply(429)
+        elif self.path.startswith("/hop/"):
+            hops = int(self.path.rsplit("/", 1)[1])
+            if hops:
+                self.reply(302, f"/hop/{hops - 1}")
+            else:
+                self.reply(200)
+        else:
+            self.reply(200)
+
+    def do_HEAD(self):
+        self.route("HEAD")
+
+    def do_GET(self):
+        self.route("GET")
+
+
+@pytest.fixture
+def server():
+    """Base URL of a keep-alive LinkHandler server; its request counts are reset."""
+    LinkHandler.seen = Counter()
+    httpd = ThreadingHTTPServer(("127.0.0.1", 0), LinkHandler)
+    httpd.daemon_threads = True
+    thread = threading.Thread(target=httpd.serve_forever, args=(0.05,), daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{httpd.server_address[1]}"
+    httpd.shutdown()
+    httpd.server_close()
+
+
+def check(repo: Path, *urls: str, ttl_hours: float = 24.0):
+    return check_links(repo, set(urls), ttl_hours=ttl_hours, host_rate=0)
+
+
+def test_statuses(tmp_path, server):
+    results, stats = check(tmp_path, f"{server}/ok", f"{server}/gone")
+
+    assert results[f"{server}/ok"]["status"] == 200
+    assert not is_broken(results[f"{server}/ok"])
+    assert results[f"{server}/gone"]["status"] == 404
+    assert is_broken(results[f"{server}/gone"])
+    assert stats == dict(stats, checked=2, cached=0, requests=2)
+
+
+def test_refused_head_falls_back_to_get(tmp_path, server):
+    results, _ = check(tmp_path, f"{server}/nohead")
+
+    assert results[f"{server}/nohead"]["status"] == 200
+    assert LinkHandler.seen[("HEAD", "/nohead")] == 1
+    assert LinkHandler.seen[("GET", "/nohead")] == 1
+
+
+def test_redirects_are_followed_up_to_the_limit(tmp_path, server):
+    followed = f"{server}/hop/{MAX_REDIRECTS}"
+    too_many = f"{server}/hop/{MAX_REDIRECTS + 1}"
+    results, _ = check(tmp_path, followed, too_many)
+
+    assert results[followed] == dict(results[followed], status=200, error=None)
+    assert results[too_many]["error"] == "too many redirects"
+    assert is_broken(results[too_many])
+
+
+def test_rate_limited_links_are_unknown_and_not_cached(tmp_path, server):
+    results, _ = check(tmp_path, f"{server}/busy")
+
+    assert is_unknown(results[f"{server}/busy"])
+    assert not is_broken(results[f"{server}/busy"])
+    _, stats = check(tmp_path, f"{server}/busy")
+    assert stats == dict(stats, checked=1, cached=0)
+
+
+def test_cached_results_are_reused_until_they_expire(tmp_path, server):
+    urls = (f"{server}/ok", f"{server}/gone")
+    check(tmp_path, *urls)
+
+    _, stats = check(tmp_path, *urls)
+    assert stats == {"checked": 0, "cached": 2, "requests": 0, "connections": 0}
+    assert LinkHandler.seen[("HEAD", "/ok")] == 1
+
+    # Failures expire after FAILED_TTL_SECONDS even under a long TTL
+    cache_file = tmp_path / LINKS_CACHE
+    cache = json.loads(cache_file.read_text())
+    cache[f"{server}/gone"]["checked_at"] -= FAILED_TTL_SECONDS + 1
+    cache_file.write_text(json.dumps(cache))
+    _, stats = check(tmp_path, *urls)
+    assert stats == dict(stats, checked=1, cached=1)
+
+    # A TTL of zero re-checks everything
+    _, stats = check(tmp_path, *urls, ttl_hours=0)
+    assert stats == dict(stats, checked=2, cached=0)
+    assert LinkHandler.seen[("HEAD", "/ok")] == 2
+
+
+def test_rewrites():
+    rewrites = parse_rewrites(("https://example.com/=http://mirror/", "https://example.com/a/=x/"), None)
+
+    assert rewrite_url("https://example.com/b", rewrites) == "http://mirror/b"
+    # The longest matching prefix wins
+    assert rewrite_url("https://example.com/a/1", rewrites) == "x/1"
+    assert rewrite_url("https://other.org/", rewrites) == "https://other.org/"
+    with pytest.raises(ValueError):
+        parse_rewrites(("no-separator",), None)
+
+
+def test_validate_checks_rewritten_links(tmp_path, server):
+    (tmp_path / "docs").mkdir()
+    (tmp_path / "docs/index.md").write_text(
+        "# Index\n\nSee [live](https://example.invalid/ok) and [dead](https://example.invalid/gone#top).\n"
+    )
+    run = subprocess.run(
+        [
+            sys.executable,
+            str(CLI),
+            "validate",
+            str(tmp_path),
+            "--external-links",
+            "--rewrite",
+            f"https://example.invalid={server}",
+            "--host-rate",
+            "0",
+        ],
+        capture_output=True,
+        text=True,
+    )
+
+    assert run.returncode == 0
+    assert "External links: 1/2 reachable" in run.stdout
+    assert f"Broken external link https://example.invalid/gone via {server}/gone (HTTP 404)" in run.stdout
+    assert f"{server}/ok" in json.loads((tmp_path / LINKS_CACHE).read_text())
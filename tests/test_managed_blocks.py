@@ -0,0 +1,90 @@
+"""Splicing generated output into managed blocks."""
+
+import subprocess
+import sys
+from pathlib import Path
+
+import pytest
+import repo_wiki_llm
+from click.testing import CliRunner
+from repo_wiki_llm import (
+    MANAGED_BEGIN,
+    MANAGED_END,
+    OVERVIEW_PAGE,
+    extract_managed_content,
+    write_page,
+)
+from repo_wiki_validate import check_page
+
+CLI = Path(__file__).resolve().parent.parent / "scripts/repo_wiki_cli.py"
+
+EXISTING = f"""# Auth
+
+Human intro.
+
+{MANAGED_BEGIN}
+Old generated text.
+{MANAGED_END}
+
+Human notes.
+"""
+
+
+def test_complete_block_is_spliced(tmp_path):
+    page = tmp_path / "docs/components/auth.md"
+    page.parent.mkdir(parents=True)
+    page.write_text(EXISTING)
+
+    generated = f"# Auth\n{MANAGED_BEGIN}\nNew text.\n{MANAGED_END}\n"
+    action, content = write_page(tmp_path, "docs/components/auth.md", generated)
+
+    assert action == "Updated"
+    assert "New text." in content and "Old generated text." not in content
+    assert content.startswith("# Auth\n\nHuman intro.") and content.endswith("Human notes.\n")
+    assert check_page(tmp_path, page, content)["errors"] == []
+
+
+def test_unterminated_block_is_not_extracted():
+    with pytest.raises(ValueError):
+        extract_managed_content(f"# Auth\n{MANAGED_BEGIN}\nCut off mid-sent")
+
+
+def test_truncated_response_leaves_the_page_unchanged(tmp_path):
+    page = tmp_path / "docs/components/auth.md"
+    page.parent.mkdir(parents=True)
+    page.write_text(EXISTING)
+
+    with pytest.raises(ValueError):
+        write_page(tmp_path, "docs/components/auth.md", f"# Auth\n{MANAGED_BEGIN}\nCut off")
+
+    assert page.read_text() == EXISTING
+
+
+def test_truncated_response_does_not_create_a_page(tmp_path):
+    with pytest.raises(ValueError):
+        write_page(tmp_path, "docs/components/new.md", f"{MANAGED_BEGIN}\nCut off")
+
+    assert not (tmp_path / "docs/components/new.md").exists()
+
+
+def test_non_utf8_page_is_reported_and_left_unchanged(tmp_path, monkeypatch):
+    for command in ("init", "index"):
+        subprocess.run([sys.executable, str(CLI), command, str(tmp_path)], check=True, capture_output=True)
+    page = tmp_path / OVERVIEW_PAGE
+    page.write_bytes(EXISTING.encode("latin-1") + "Café\n".encode("latin-1"))
+    before = page.read_bytes()
+
+    with pytest.raises(UnicodeDecodeError):
+        write_page(tmp_path, OVERVIEW_PAGE, f"{MANAGED_BEGIN}\nNew text.\n{MANAGED_END}\n")
+
+    monkeypatch.setattr(repo_wiki_llm, "get_api_client", lambda: None)
+    monkeypatch.setattr(
+        repo_wiki_llm,
+        "stream_response",
+        lambda *args, **kwargs: f"{MANAGED_BEGIN}\nNew text.\n{MANAGED_END}\n",
+    )
+    result = CliRunner().invoke(repo_wiki_llm.generate, [str(tmp_path), "--overview-only"])
+
+    assert f"{OVERVIEW_PAGE} is not UTF-8; left unchanged" in result.output
+    assert "truncated" not in result.output
+    assert page.read_bytes() == before
@@ -0,0 +1,33 @@
+"""Manifest entries built from a generated page's citations."""
+
+import hashlib
+
+from repo_wiki_llm import build_manifest_entry
+
+
+def page(*citations: str) -> str:
+    notes = "".join(f"[^{n}]: {c}\n" for n, c in enumerate(citations, 1))
+    return f"# Page\n\nText[^1].\n\n{notes}"
+
+
+def test_only_files_inside_the_repo_are_hashed(tmp_path):
+    repo = tmp_path / "repo"
+    (repo / "src").mkdir(parents=True)
+    (repo / "src/a.py").write_text("one\ntwo\n")
+    (tmp_path / "secret.txt").write_text("one\ntwo\n")
+    (repo / "src/link.txt").symlink_to(tmp_path / "secret.txt")
+
+    entry = build_manifest_entry(
+        repo,
+        page(
+            "`src/a.py` L1-L2",
+            "`../secret.txt` L1-L2",
+            f"`{tmp_path / 'secret.txt'}` L1-L2",
+            "`src/link.txt` L1-L2",
+        ),
+        "2026-01-01T00:00:00Z",
+    )
+
+    hashes = {c["filepath"]: c["range_hash"] for c in entry["citations"]}
+    assert hashes.pop("src/a.py") == hashlib.sha256(b"one\ntwo\n").hexdigest()
+    assert len(hashes) == 3 and set(hashes.values()) == {None}
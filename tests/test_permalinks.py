@@ -0,0 +1,37 @@
+"""Per-file commit resolution for permalinks."""
+
+import subprocess
+from pathlib import Path
+
+from generate_permalinks import resolve_file_commits
+
+
+def git(*args: str) -> str:
+    return subprocess.run(
+        ["git", "-c", "user.name=t", "-c", "user.email=t@t", *args],
+        check=True,
+        capture_output=True,
+        text=True,
+    ).stdout.strip()
+
+
+def test_each_file_maps_to_its_last_commit(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    git("init", "-q")
+    Path("src").mkdir()
+    Path("src/a.py").write_text("a\n")
+    Path("src/b c.py").write_text("b\n")
+    git("add", "-A")
+    git("commit", "-qm", "first")
+    first = git("rev-parse", "HEAD")
+    Path("src/a.py").write_text("a2\n")
+    git("commit", "-qam", "second")
+    second = git("rev-parse", "HEAD")
+
+    # Far more path bytes than fit on one command line
+    missing = [f"docs/{'x' * 200}/{n}.py" for n in range(20000)]
+    commits = resolve_file_commits(["src/a.py", "src/b c.py", *missing], "fallback")
+
+    assert commits["src/a.py"] == second
+    assert commits["src/b c.py"] == first
+    assert commits[missing[0]] == "fallback"
@@ -0,0 +1,27 @@
+"""The in-process pipeline command."""
+
+import subprocess
+import sys
+from pathlib import Path
+
+CLI = Path(__file__).resolve().parent.parent / "scripts/repo_wiki_cli.py"
+
+
+def test_permalinks_step_is_skipped_without_a_remote(tmp_path):
+    subprocess.run(["git", "init", "-q", str(tmp_path)], check=True)
+    (tmp_path / "main.py").write_text("print('hi')\n")
+    run = subprocess.run(
+        [
+            sys.executable,
+            str(CLI),
+            "pipeline",
+            str(tmp_path),
+            "--steps",
+            "init,index,validate,permalinks",
+        ],
+        capture_output=True,
+        text=True,
+    )
+
+    assert run.returncode == 0, run.stdout
+    assert "Skipped: no git remote configured" in run.stdout
@@ -0,0 +1,96 @@
+"""Incremental BM25 index: appended shard postings, tombstones and compaction."""
+
+import repo_wiki_retrieval
+from repo_wiki_retrieval import (
+    RETRIEVAL_DIR,
+    search_code,
+    shard_of,
+    tokenize,
+    update_retrieval_index,
+)
+from repo_wiki_store import read_json
+
+FILES = {
+    "billing/refunds.py": "def issueRefund(payment):\n    # Refund a captured payment\n",
+    "auth/session.py": "def createSession(user):\n    # Start a login session\n",
+    **{f"misc/module{i}.py": f"def helper{i}():\n    return {i}\n" for i in range(6)},
+}
+
+
+def make_tree(repo):
+    for rel, text in FILES.items():
+        (repo / rel).parent.mkdir(parents=True, exist_ok=True)
+        (repo / rel).write_text(text)
+
+
+def paths(repo, query):
+    return [hit["path"] for hit in search_code(repo, query)]
+
+
+def test_identifiers_split_into_words_and_keep_the_compound():
+    assert tokenize("def issueRefund(HTTPServer): return parse_config") == [
+        "issue",
+        "refund",
+        "issuerefund",
+        "http",
+        "server",
+        "httpserver",
+        "parse",
+        "config",
+        "parse_config",
+    ]
+
+
+def test_changed_files_only_append_their_own_shards(tmp_path, monkeypatch):
+    make_tree(tmp_path)
+    assert update_retrieval_index(tmp_path) == dict(
+        files=8, chunks=8, indexed=8, removed=0, rebuilt=True
+    )
+    assert paths(tmp_path, "refund payment") == ["billing/refunds.py"]
+
+    written = []
+    write_json = repo_wiki_retrieval.write_json
+
+    def record(path, *args, **kwargs):
+        written.append(path.name)
+        write_json(path, *args, **kwargs)
+
+    monkeypatch.setattr(repo_wiki_retrieval, "write_json", record)
+    (tmp_path / "billing/refunds.py").write_text("def issueChargeback(invoice):\n    pass\n")
+    stats = update_retrieval_index(tmp_path)
+
+    assert stats == dict(files=8, chunks=8, indexed=1, removed=0, rebuilt=False)
+    terms = set(tokenize("issueChargeback(invoice) pass"))
+    expected = {f"shard-{shard_of(term):02d}.json" for term in terms}
+    assert set(written) == expected | {"ids.json", "meta.json"}
+    # The old postings are tombstoned, the new ones found
+    assert paths(tmp_path, "refund payment") == []
+    assert paths(tmp_path, "chargeback invoice") == ["billing/refunds.py"]
+    assert read_json(tmp_path / RETRIEVAL_DIR / "meta.json", None)["dead_chunks"] == 1
+
+
+def test_removed_files_drop_out_of_results(tmp_path):
+    make_tree(tmp_path)
+    update_retrieval_index(tmp_path)
+
+    (tmp_path / "auth/session.py").unlink()
+    stats = update_retrieval_index(tmp_path)
+
+    assert stats == dict(files=7, chunks=7, indexed=0, removed=1, rebuilt=False)
+    assert paths(tmp_path, "login session") == []
+    # With nothing changed since, nothing is re-indexed
+    assert update_retrieval_index(tmp_path)["indexed"] == 0
+
+
+def test_index_is_rebuilt_once_tombstones_pile_up(tmp_path):
+    make_tree(tmp_path)
+    update_retrieval_index(tmp_path)
+
+    for i in range(3):
+        (tmp_path / f"misc/module{i}.py").unlink()
+    stats = update_retrieval_index(tmp_path)
+
+    assert stats == dict(files=5, chunks=5, indexed=5, removed=3, rebuilt=True)
+    meta = read_json(tmp_path / RETRIEVAL_DIR / "meta.json", None)
+    assert meta["dead_chunks"] == 0
+    assert paths(tmp_path, "refund payment") == ["billing/refunds.py"]
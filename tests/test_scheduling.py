@@ -0,0 +1,111 @@
+"""Churn-ordered scheduling and the spend budget for generate."""
+
+import json
+import time
+
+import click
+import pytest
+import repo_wiki_llm
+from repo_wiki_llm import (
+    DEFAULT_OUTPUT_TOKENS,
+    OVERVIEW_PAGE,
+    apply_budget,
+    component_page,
+    parse_budget,
+    schedule_pages,
+)
+from repo_wiki_store import MANIFEST
+
+DAY = 86400
+NOW = 1_750_000_000
+
+
+def component(name: str, score: float, last_changed: int) -> dict:
+    return {
+        "name": name,
+        "path": f"src/{name}",
+        "parent": None,
+        "churn": {"changes": 1, "last_changed": last_changed, "score": score},
+    }
+
+
+def iso(timestamp: int) -> str:
+    return time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime(timestamp))
+
+
+def test_stale_pages_come_first_by_churn_then_lag(tmp_path):
+    hot = component("hot", 5.0, NOW)
+    warm = component("warm", 1.0, NOW)
+    behind = component("behind", 1.0, NOW)
+    fresh = component("fresh", 9.0, NOW - DAY)
+    manifest = {
+        "pages": {
+            component_page(warm): {"generated_at": iso(NOW - DAY)},
+            component_page(behind): {"generated_at": iso(NOW - 10 * DAY)},
+            # Generated after its sources last changed
+            component_page(fresh): {"generated_at": iso(NOW)},
+            OVERVIEW_PAGE: {"generated_at": iso(NOW)},
+        }
+    }
+    (tmp_path / MANIFEST).parent.mkdir(parents=True)
+    (tmp_path / MANIFEST).write_text(json.dumps(manifest))
+    components = [fresh, warm, hot, behind]
+    pages = [(OVERVIEW_PAGE, None)] + [(component_page(c), c) for c in components]
+
+    ordered = schedule_pages(tmp_path, {"components": components}, pages)
+
+    # Stale pages by score; behind and warm tie, and behind has lagged longer.
+    # Among fresh pages the overview carries the churn of every component.
+    assert [c["name"] if c else "overview" for _, c in ordered] == [
+        "hot",
+        "behind",
+        "warm",
+        "overview",
+        "fresh",
+    ]
+
+
+def test_without_churn_data_the_order_is_kept(tmp_path):
+    components = [{"name": n, "path": f"src/{n}"} for n in ("b", "a")]
+    pages = [(component_page(c), c) for c in components]
+
+    assert schedule_pages(tmp_path, {"components": components}, pages) == pages
+
+
+@pytest.mark.parametrize(
+    ("text", "budget"),
+    [
+        ("$5", (5.0, "usd")),
+        ("2.50usd", (2.5, "usd")),
+        ("200k", (200_000.0, "tokens")),
+        ("1.5M", (1_500_000.0, "tokens")),
+        ("12_000 tokens", (12_000.0, "tokens")),
+        (None, None),
+    ],
+)
+def test_parse_budget(text, budget):
+    assert parse_budget(None, None, text) == budget
+
+
+@pytest.mark.parametrize("text", ["five dollars", "$0", "-3k"])
+def test_parse_budget_rejects(text):
+    with pytest.raises(click.BadParameter):
+        parse_budget(None, None, text)
+
+
+def test_pages_over_budget_are_deferred_and_cheaper_ones_still_fit(tmp_path, monkeypatch):
+    sizes = {"small": 100, "large": 3000, "tail": 100}
+    # 4 characters per token, so each prompt costs its size plus the output guess
+    monkeypatch.setattr(
+        repo_wiki_llm,
+        "build_component_prompt",
+        lambda repo, comp, *args: "x" * 4 * sizes[comp["name"]],
+    )
+    pages = [(f"{name}.md", {"name": name}) for name in sizes]
+    limit = 2 * (100 + DEFAULT_OUTPUT_TOKENS) + 1
+
+    admitted, prompts = apply_budget(tmp_path, {}, {}, pages, (limit, "tokens"), 0, False, {})
+
+    assert [page for page, _ in admitted] == ["small.md", "tail.md"]
+    # Prompts built for estimation are handed on to generation
+    assert len(prompts["small.md"]) == 400
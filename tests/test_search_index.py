@@ -0,0 +1,83 @@
+"""search-index output and the mkdocs hook that publishes it."""
+
+import importlib.util
+import json
+import subprocess
+import sys
+from pathlib import Path
+
+from repo_wiki_cli import SEARCH_HOOK, register_search_hook
+
+CLI = Path(__file__).resolve().parent.parent / "scripts/repo_wiki_cli.py"
+
+
+def run(*args: str) -> None:
+    subprocess.run([sys.executable, str(CLI), *args], check=True, capture_output=True)
+
+
+def load_hook(repo: Path):
+    spec = importlib.util.spec_from_file_location("hook", repo / SEARCH_HOOK)
+    hook = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(hook)
+    return hook
+
+
+class SearchPlugin:
+    def on_page_context(self, context, **kwargs):
+        return context
+
+
+class Plugins(dict):
+    """The parts of mkdocs' PluginCollection the hook touches."""
+
+    def __init__(self, **plugins):
+        super().__init__(plugins)
+        self.events = {"page_context": [p.on_page_context for p in plugins.values()]}
+
+
+def make_wiki(repo: Path) -> None:
+    run("init", str(repo))
+    (repo / "docs/index.md").write_text("# Home\n\nIntro.\n\n## Setup\n\nInstall it.\n")
+    run("search-index", str(repo))
+
+
+def test_hook_publishes_the_prebuilt_index(tmp_path):
+    make_wiki(tmp_path)
+    site = tmp_path / "site"
+    (site / "search").mkdir(parents=True)
+    (site / "search/search_index.json").write_text('{"docs": []}')
+    load_hook(tmp_path).on_post_build({"site_dir": str(site)})
+
+    index = json.loads((site / "search/search_index.json").read_text())
+    assert [doc["location"] for doc in index["docs"]] == ["", "#setup"]
+    assert index["suggest"]
+
+
+def test_hook_stops_per_page_indexing(tmp_path):
+    make_wiki(tmp_path)
+    search, other = SearchPlugin(), SearchPlugin()
+    plugins = Plugins(**{"material/search": search, "blog": other})
+    load_hook(tmp_path).on_config({"plugins": plugins})
+
+    assert plugins.events["page_context"] == [other.on_page_context]
+
+    # Without a prebuilt index the search plugin is left alone
+    (tmp_path / ".repo_wiki/search_index.json").unlink()
+    plugins = Plugins(search=search)
+    load_hook(tmp_path).on_config({"plugins": plugins})
+    assert plugins.events["page_context"] == [search.on_page_context]
+
+
+def test_existing_mkdocs_yml_gets_the_hook(tmp_path):
+    mkdocs_file = tmp_path / "mkdocs.yml"
+    mkdocs_file.write_text("site_name: x\nplugins:\n  - search")
+    run("init", str(tmp_path))
+    assert mkdocs_file.read_text() == f"site_name: x\nplugins:\n  - search\n\nhooks:\n  - {SEARCH_HOOK}\n"
+    assert not register_search_hook(mkdocs_file)
+
+    mkdocs_file.write_text("hooks:\n- hooks/a.py\nnav: []\n")
+    assert register_search_hook(mkdocs_file)
+    assert mkdocs_file.read_text() == f"hooks:\n- {SEARCH_HOOK}\n- hooks/a.py\nnav: []\n"
+
+    mkdocs_file.write_text("hooks: [hooks/a.py]\n")
+    assert not register_search_hook(mkdocs_file)
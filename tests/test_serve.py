@@ -0,0 +1,138 @@
+"""The serve daemon's warm citation index, refresh loop and JSON-RPC endpoint."""
+
+import http.client
+import json
+import threading
+import time
+
+import pytest
+import repo_wiki_serve
+from repo_wiki_serve import INTERNAL_ERROR, WikiIndex, handle_request, make_http_server
+
+
+def make_wiki(repo, footnote: str) -> None:
+    (repo / "src/auth").mkdir(parents=True)
+    (repo / "src/auth/service.py").write_text("".join(f"line {n}\n" for n in range(1, 21)))
+    (repo / "docs/components").mkdir(parents=True)
+    (repo / "docs/components/auth.md").write_text(f"# Auth\n\nTokens are checked[^1].\n\n[^1]: {footnote}\n")
+
+
+def test_plain_citations_are_indexed(tmp_path):
+    make_wiki(tmp_path, "`src/auth/service.py` L4-L9")
+    index = WikiIndex(tmp_path)
+
+    assert index.pages_citing("src/auth/service.py") == [
+        {"page": "docs/components/auth.md", "ranges": [[4, 9]]}
+    ]
+
+
+def test_permalinked_citations_are_indexed(tmp_path):
+    make_wiki(
+        tmp_path,
+        "[src/auth/service.py#L4-L9](https://github.com/o/r/blob/abc123/src/auth/service.py#L4-L9)",
+    )
+    index = WikiIndex(tmp_path)
+
+    assert index.status()["cited_files"] == 1
+    assert index.pages_citing("src/auth/service.py") == [
+        {"page": "docs/components/auth.md", "ranges": [[4, 9]]}
+    ]
+    result = index.validate_page("docs/components/auth.md")
+    assert result["ok"] and result["valid_citations"] == 1
+
+
+def wait_for(condition, timeout: float = 5.0) -> bool:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if condition():
+            return True
+        time.sleep(0.02)
+    return False
+
+
+@pytest.fixture
+def watching(tmp_path):
+    """A WikiIndex over a small wiki, with its watch loop running."""
+    make_wiki(tmp_path, "`src/auth/service.py` L4-L9")
+    index = WikiIndex(tmp_path)
+    stop = threading.Event()
+    thread = threading.Thread(target=index.watch, args=(0.05, stop), daemon=True)
+    thread.start()
+    yield index
+    stop.set()
+    thread.join()
+
+
+def test_filesystem_events_refresh_only_named_files(tmp_path, watching, monkeypatch):
+    pytest.importorskip("watchdog")
+    time.sleep(0.2)  # let the observer register its watches
+    refreshed = []
+    refresh_paths = watching.refresh_paths
+
+    def spy(paths):
+        refreshed.append(paths)
+        return refresh_paths(paths)
+
+    monkeypatch.setattr(watching, "refresh_paths", spy)
+
+    (tmp_path / "src/auth/service.py").write_text("short\n")
+    (tmp_path / "docs/components/new.md").write_text("# New\n\n[^1]: `src/auth/service.py` L1-L1\n")
+
+    assert wait_for(lambda: len(watching.pages_citing("src/auth/service.py")) == 2)
+    assert wait_for(lambda: watching.validate_page("docs/components/auth.md")["errors"])
+    assert set().union(*refreshed) == {"src/auth/service.py", "docs/components/new.md"}
+
+
+def test_polling_fallback(tmp_path, monkeypatch):
+    monkeypatch.setattr(repo_wiki_serve, "WATCHES_EVENTS", False)
+    make_wiki(tmp_path, "`src/auth/service.py` L4-L9")
+    index = WikiIndex(tmp_path)
+    stop = threading.Event()
+    threading.Thread(target=index.watch, args=(0.05, stop), daemon=True).start()
+    try:
+        (tmp_path / "src/auth/service.py").write_text("short\n")
+        assert wait_for(lambda: index.validate_page("docs/components/auth.md")["errors"])
+    finally:
+        stop.set()
+
+
+def test_unexpected_errors_are_internal_errors(tmp_path, monkeypatch):
+    make_wiki(tmp_path, "`src/auth/service.py` L4-L9")
+    index = WikiIndex(tmp_path)
+
+    def fail():
+        raise OSError("page vanished")
+
+    monkeypatch.setattr(index, "status", fail)
+    response = handle_request(index, {"jsonrpc": "2.0", "id": 7, "method": "status"})
+
+    assert response["id"] == 7
+    assert response["error"]["code"] == INTERNAL_ERROR
+
+
+def test_http_listener_answers_loopback_hosts_only(tmp_path):
+    make_wiki(tmp_path, "`src/auth/service.py` L4-L9")
+    server = make_http_server(WikiIndex(tmp_path), 0)
+    threading.Thread(target=server.serve_forever, args=(0.05,), daemon=True).start()
+    port = server.server_address[1]
+    body = json.dumps({"jsonrpc": "2.0", "id": 1, "method": "status"})
+
+    def post(**headers) -> int:
+        conn = http.client.HTTPConnection("127.0.0.1", port)
+        conn.putrequest("POST", "/", skip_host=True)
+        for name, value in headers.items():
+            conn.putheader(name, value)
+        conn.putheader("Content-Length", str(len(body)))
+        conn.endheaders(body.encode())
+        status = conn.getresponse().status
+        conn.close()
+        return status
+
+    try:
+        assert post(Host=f"127.0.0.1:{port}") == 200
+        assert post(Host=f"localhost:{port}", Origin=f"http://localhost:{port}") == 200
+        assert post(Host=f"attacker.example:{port}") == 403
+        assert post(Host=f"127.0.0.1:{port}", Origin="https://attacker.example") == 403
+    finally:
+        server.shutdown()
+        server.server_close()
@@ -0,0 +1,101 @@
+"""Streaming responses into the response cache."""
+
+import threading
+import time
+from types import SimpleNamespace
+
+from repo_wiki_llm import RESPONSE_CACHE_DIR, response_cache_key, stream_response
+
+
+class FakeStream:
+    def __init__(self, chunks, stop_reason):
+        self.chunks = chunks
+        self.stop_reason = stop_reason
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    @property
+    def text_stream(self):
+        yield from self.chunks
+
+    def get_final_message(self):
+        usage = SimpleNamespace(input_tokens=10, output_tokens=len(self.chunks))
+        return SimpleNamespace(usage=usage, stop_reason=self.stop_reason)
+
+
+class FakeClient:
+    """Answers each request with the next scripted (chunks, stop_reason)."""
+
+    def __init__(self, *answers):
+        self.answers = list(answers)
+        self.requests = []
+        self.messages = self
+
+    def stream(self, model, max_tokens, messages):
+        self.requests.append(messages)
+        return FakeStream(*self.answers.pop(0))
+
+    def queue_wait(self):
+        return 0.0
+
+
+def test_truncated_stream_stays_partial_and_resumes(tmp_path):
+    cache_dir = tmp_path / RESPONSE_CACHE_DIR
+    key = response_cache_key("prompt")
+    client = FakeClient((["Hello ", "wor"], "max_tokens"), (["ld."], "end_turn"))
+
+    assert stream_response(client, tmp_path, "prompt", "page") is None
+    assert not (cache_dir / f"{key}.md").exists()
+    assert (cache_dir / f"{key}.md.part").read_text() == "Hello wor"
+
+    assert stream_response(client, tmp_path, "prompt", "page") == "Hello world."
+    # The second request carried the partial answer as an assistant prefill
+    assert client.requests[1][-1] == {"role": "assistant", "content": "Hello wor"}
+    assert (cache_dir / f"{key}.md").read_text() == "Hello world."
+    assert not (cache_dir / f"{key}.md.part").exists()
+
+
+def test_complete_stream_is_cached(tmp_path):
+    client = FakeClient((["Done."], "end_turn"))
+
+    assert stream_response(client, tmp_path, "prompt", "page") == "Done."
+    assert stream_response(client, tmp_path, "prompt", "page") == "Done."
+    assert len(client.requests) == 1
+
+
+def test_concurrent_streams_of_one_prompt_do_not_interleave(tmp_path):
+    release = threading.Event()
+
+    class SlowChunks(list):
+        def __iter__(self):
+            yield "First "
+            release.wait(5)
+            yield "answer."
+
+    first = FakeClient((SlowChunks(["First ", "answer."]), "end_turn"))
+    second = FakeClient((["Second answer."], "end_turn"))
+    results = {}
+
+    def run(name, client):
+        results[name] = stream_response(client, tmp_path, "prompt", name)
+
+    threads = [
+        threading.Thread(target=run, args=("first", first)),
+        threading.Thread(target=run, args=("second", second)),
+    ]
+    threads[0].start()
+    while not first.requests:
+        time.sleep(0.01)
+    threads[1].start()
+    # The second caller waits on the partial file's lock instead of writing into it
+    time.sleep(0.2)
+    release.set()
+    for thread in threads:
+        thread.join(5)
+
+    assert results == {"first": "First answer.", "second": "First answer."}
+    assert second.requests == []
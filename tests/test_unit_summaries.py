@@ -0,0 +1,86 @@
+"""Map-phase unit summaries are cached per file fingerprint."""
+
+import re
+
+import pytest
+import repo_wiki_llm
+from repo_wiki_context import split_into_units
+from repo_wiki_llm import summarize_units, unit_label
+
+COMPONENT = {"name": "svc", "path": "svc"}
+
+
+class Mapper:
+    """Stands in for stream_response: summarizes every FILE section of a map prompt."""
+
+    def __init__(self):
+        self.prompts = []
+        self.drop = set()
+
+    def __call__(self, client, repo, prompt, label):
+        self.prompts.append(prompt)
+        labels = re.findall(r"^### FILE: (.+)$", prompt, flags=re.MULTILINE)
+        return "\n\n".join(
+            f"### FILE: {name}\nSummary of {name}." for name in labels if name not in self.drop
+        )
+
+    def files(self) -> list[list[str]]:
+        """File paths summarized by each recorded prompt."""
+        return [sorted(set(re.findall(r"^### FILE: (\S+)", p, re.MULTILINE))) for p in self.prompts]
+
+
+@pytest.fixture
+def mapper(monkeypatch):
+    fake = Mapper()
+    monkeypatch.setattr(repo_wiki_llm, "stream_response", fake)
+    return fake
+
+
+@pytest.fixture
+def repo(tmp_path):
+    """A component of two small files."""
+    (tmp_path / "svc").mkdir()
+    (tmp_path / "svc/a.py").write_text("def a():\n    return 1\n")
+    (tmp_path / "svc/b.py").write_text("def b():\n    return 2\n")
+    return tmp_path
+
+
+def summarize(repo):
+    units = split_into_units(repo, "svc", 1000, skip={})
+    return units, summarize_units(None, repo, COMPONENT, units, concurrency=2)
+
+
+def test_units_are_summarized_once_and_then_reused(repo, mapper):
+    units, summaries = summarize(repo)
+    assert [(unit_label(u), s) for u, s in summaries] == [
+        (unit_label(u), f"Summary of {unit_label(u)}.") for u in units
+    ]
+    # Both small files share one map prompt
+    assert mapper.files() == [["svc/a.py", "svc/b.py"]]
+
+    _, again = summarize(repo)
+    assert again == summaries
+    assert len(mapper.prompts) == 1
+
+
+def test_only_changed_files_are_summarized_again(repo, mapper):
+    summarize(repo)
+
+    (repo / "svc/b.py").write_text("def b():\n    return 3\n")
+    _, summaries = summarize(repo)
+
+    assert mapper.files()[1:] == [["svc/b.py"]]
+    assert len(summaries) == 2
+
+
+def test_missing_summaries_are_not_cached(repo, mapper):
+    units = split_into_units(repo, "svc", 1000, skip={})
+    mapper.drop = {unit_label(u) for u in units if u["path"] == "svc/b.py"}
+
+    _, summaries = summarize(repo)
+    assert [u["path"] for u, _ in summaries] == ["svc/a.py"]
+
+    mapper.drop = set()
+    _, summaries = summarize(repo)
+    assert [u["path"] for u, _ in summaries] == ["svc/a.py", "svc/b.py"]
+    assert mapper.files()[1:] == [["svc/b.py"]]
@@ -0,0 +1,67 @@
+"""Writes that would only change date stamps are skipped."""
+
+import json
+
+from repo_wiki_store import write_json_if_changed, write_text_if_changed
+
+PAGE = """---
+title: Auth
+last_updated: "{date}"
+---
+
+# Auth
+
+**Last updated**: {date}
+
+Sessions are stored in Redis.
+"""
+
+
+def test_only_date_stamps_changed(tmp_path):
+    page = tmp_path / "docs/auth.md"
+    assert write_text_if_changed(page, PAGE.format(date="2026-01-01"))
+    before = page.stat().st_mtime_ns
+
+    assert not write_text_if_changed(page, PAGE.format(date="2026-02-02"))
+    assert page.read_text() == PAGE.format(date="2026-01-01")
+    assert page.stat().st_mtime_ns == before
+
+
+def test_any_other_change_is_written(tmp_path):
+    page = tmp_path / "docs/auth.md"
+    write_text_if_changed(page, PAGE.format(date="2026-01-01"))
+
+    edited = PAGE.format(date="2026-02-02").replace("Redis", "Postgres")
+    assert write_text_if_changed(page, edited)
+    assert page.read_text() == edited
+
+
+def test_stamps_are_only_ignored_at_the_start_of_a_line(tmp_path):
+    page = tmp_path / "docs/auth.md"
+    body = PAGE.format(date="2026-01-01") + "The field `last_updated: {date}` is set on save.\n"
+    write_text_if_changed(page, body.format(date="2026-01-01"))
+
+    assert write_text_if_changed(page, body.format(date="2026-02-02"))
+    assert page.read_text().endswith("`last_updated: 2026-02-02` is set on save.\n")
+
+
+def test_a_non_utf8_file_is_replaced(tmp_path):
+    page = tmp_path / "docs/auth.md"
+    page.parent.mkdir()
+    page.write_bytes(PAGE.format(date="2026-01-01").encode("utf-16"))
+
+    assert write_text_if_changed(page, PAGE.format(date="2026-01-01"))
+    assert page.read_text() == PAGE.format(date="2026-01-01")
+
+
+def test_json_ignores_only_the_volatile_keys(tmp_path):
+    path = tmp_path / "state.json"
+    volatile = ("updated_at",)
+    write_json_if_changed(path, {"version": 1, "updated_at": "a"}, volatile)
+
+    assert not write_json_if_changed(path, {"version": 1, "updated_at": "b"}, volatile)
+    assert json.loads(path.read_text())["updated_at"] == "a"
+    assert write_json_if_changed(path, {"version": 2, "updated_at": "b"}, volatile)
+    # Switching to gzip rewrites even identical content
+    assert write_json_if_changed(path, {"version": 2, "updated_at": "b"}, volatile, compress=True)
+    assert not path.exists()